@@ -1,6 +1,20 @@
 
 # This is the Python script for your project
 
+import array
+import concurrent.futures
+import functools
+import itertools
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+
 def eh_tabuleiro(tab):
     """ Verifica se o/os tuplos passados podem descrever um tabuleiro.
     
@@ -14,6 +28,10 @@ def eh_tabuleiro(tab):
     
     """
     
+    # Um tabuleiro já validado por cria_tabuleiro_confiavel não volta a ser percorrido
+    if TABULEIROS_CONFIAVEIS.get(id(tab)) is tab:
+        return True
+    
     # Verifica se o argumento recebido é um tuplo
     if not isinstance(tab, tuple):
         return False
@@ -35,6 +53,59 @@ def eh_tabuleiro(tab):
     
     return True
     
+# Tabuleiros confiáveis: como os tabuleiros são tuplos imutáveis, um tabuleiro validado uma vez continua válido.
+# Os tabuleiros validados ficam registados pela sua identidade (guardando uma referência, para que a identidade
+# não seja reutilizada por outro objeto) e eh_tabuleiro aceita-os sem voltar a percorrer todas as posições.
+# Os tabuleiros obtidos com marca_posicao a partir de um tabuleiro confiável são também confiáveis.
+# O registo é limitado pelo número total de posições dos tabuleiros registados, e não pelo número de tabuleiros, para
+# que os tabuleiros grandes de um processo longo não fiquem todos em memória, e é limpo no início de cada jogo.
+
+TABULEIROS_CONFIAVEIS = {}
+MAX_POSICOES_CONFIAVEIS = 100000
+POSICOES_CONFIAVEIS = 0
+
+def cria_tabuleiro_confiavel(tab):
+    """ Valida um tabuleiro uma única vez e regista-o como confiável
+    
+        Args:
+            tab (tuplo): Tabuleiro a validar
+            
+        Returns:
+            tab (tuplo): O próprio tabuleiro, que passa a ser aceite por todas as funções sem nova validação
+        
+    
+    """
+    if eh_tabuleiro(tab):
+        regista_tabuleiro_confiavel(tab)
+        return tab
+    raise ValueError("cria_tabuleiro_confiavel: argumentos invalidos")
+
+# Função auxiliar às funções cria_tabuleiro_confiavel e marca_posicao, regista um tabuleiro já validado,
+# descartando os registos mais antigos enquanto o limite de posições registadas for ultrapassado
+def regista_tabuleiro_confiavel(tab):
+    global POSICOES_CONFIAVEIS
+    # Enquanto está registado, o tabuleiro não é libertado, por isso a sua identidade não pode ser de outro objeto
+    if id(tab) in TABULEIROS_CONFIAVEIS:
+        return
+    size = len(tab) * len(tab[0])
+    while TABULEIROS_CONFIAVEIS and POSICOES_CONFIAVEIS + size > MAX_POSICOES_CONFIAVEIS:
+        oldest = TABULEIROS_CONFIAVEIS.pop(next(iter(TABULEIROS_CONFIAVEIS)))
+        POSICOES_CONFIAVEIS -= len(oldest) * len(oldest[0])
+    TABULEIROS_CONFIAVEIS[id(tab)] = tab
+    POSICOES_CONFIAVEIS += size
+
+def limpa_tabuleiros_confiaveis():
+    """ Esquece todos os tabuleiros confiáveis, que voltam a ser validados na próxima utilização
+    
+        Returns:
+            None
+        
+    
+    """
+    global POSICOES_CONFIAVEIS
+    TABULEIROS_CONFIAVEIS.clear()
+    POSICOES_CONFIAVEIS = 0
+
 def eh_posicao(arg):
     """ Recebe um argumento universal e verifica se este pode ser uma posição em um tabuleiro
 
@@ -97,18 +168,177 @@ def obtem_valor(tab, pos):
     if eh_tabuleiro(tab) and eh_posicao(pos):
         row_size = obtem_dimensao(tab)[1]
         
-        row = 0
-        while pos not in range(1, row_size + 1):
-            pos -= row_size
-            row += 1
+        # A linha e a coluna obtêm-se diretamente da posição, sem percorrer as linhas anteriores
+        row, column = divmod(pos - 1, row_size)
         
-        value = tab[row][pos - 1]
+        value = tab[row][column]
         return value
     
     else:
         # Levanta um erro caso o argumento passado não corresponda a um tabuleiro
         raise ValueError("parâmetros errados")
 
+# Geometria do tabuleiro: as linhas, colunas, diagonais, posições adjacentes e janelas de k posições dependem
+# apenas das dimensões do tabuleiro, por isso são calculadas uma única vez por dimensão e partilhadas por todas
+# as chamadas. Apenas as dimensões usadas mais recentemente são guardadas.
+
+@functools.lru_cache(maxsize=8)
+def obtem_geometria(lines, columns):
+    """ Obtem as tabelas de geometria de um tabuleiro com as dimensões recebidas
+    
+        Args:
+            lines (int): Número de linhas do tabuleiro
+            columns (int): Número de colunas do tabuleiro
+            
+        Returns:
+            geometria (dict): Dicionário em que "linha", "coluna", "diagonal", "antidiagonal" e "adjacentes" são tuplos
+            indexados pela posição (o índice 0 não é usado) com os tuplos de posições correspondentes a cada posição
+        
+    
+    """
+    size = lines * columns
+    rows_tuples = tuple(tuple(range(row * columns + 1, (row + 1) * columns + 1)) for row in range(lines))
+    columns_tuples = tuple(tuple(range(column + 1, size + 1, columns)) for column in range(columns))
+    
+    # As diagonais são indexadas por coluna - linha e as antidiagonais por linha + coluna
+    diagonals = [[] for index in range(lines + columns - 1)]
+    antidiagonals = [[] for index in range(lines + columns - 1)]
+    for pos in range(1, size + 1):
+        row = (pos - 1) // columns
+        column = (pos - 1) % columns
+        diagonals[column - row + lines - 1].append(pos)
+        antidiagonals[row + column].append(pos)
+    
+    # Tal como em obtem_diagonais, a diagonal fica por ordem crescente e a antidiagonal por ordem decrescente
+    diagonals = [tuple(tup) for tup in diagonals]
+    antidiagonals = [tuple(reversed(tup)) for tup in antidiagonals]
+    
+    line = [None]
+    column_of = [None]
+    diagonal = [None]
+    antidiagonal = [None]
+    adjacent = [None]
+    for pos in range(1, size + 1):
+        row = (pos - 1) // columns
+        column = (pos - 1) % columns
+        line.append(rows_tuples[row])
+        column_of.append(columns_tuples[column])
+        diagonal.append(diagonals[column - row + lines - 1])
+        antidiagonal.append(antidiagonals[row + column])
+        neighbours = ()
+        for drow in (-1, 0, 1):
+            for dcol in (-1, 0, 1):
+                if (drow, dcol) != (0, 0) and 0 <= row + drow < lines and 0 <= column + dcol < columns:
+                    neighbours += ((row + drow) * columns + column + dcol + 1,)
+        adjacent.append(neighbours)
+    
+    return {"linhas": lines, "colunas": columns, "linha": tuple(line), "coluna": tuple(column_of),
+            "diagonal": tuple(diagonal), "antidiagonal": tuple(antidiagonal), "adjacentes": tuple(adjacent)}
+
+@functools.lru_cache(maxsize=16)
+def obtem_janelas(lines, columns, k):
+    """ Obtem todas as janelas de k posições seguidas de um tabuleiro com as dimensões recebidas
+    
+        Args:
+            lines (int): Número de linhas do tabuleiro
+            columns (int): Número de colunas do tabuleiro
+            k (int): Comprimento das janelas
+            
+        Returns:
+            janelas (dict): Dicionário em que "janelas" é o tuplo de todas as janelas (tuplos de k posições) em linhas,
+            colunas, diagonais e antidiagonais, e "por_posicao" é um tuplo indexado pela posição com os índices
+            das janelas que contêm cada posição
+        
+    
+    """
+    geometry = obtem_geometria(lines, columns)
+    windows = []
+    by_position = [[] for pos in range(lines * columns + 1)]
+    for key in ("linha", "coluna", "diagonal", "antidiagonal"):
+        # Cada linha é partilhada pelas suas posições, por isso percorre-se cada uma apenas uma vez
+        seen = set()
+        for tup in geometry[key][1:]:
+            if id(tup) in seen:
+                continue
+            seen.add(id(tup))
+            for start in range(len(tup) - k + 1):
+                window = tup[start:start + k]
+                for pos in window:
+                    by_position[pos].append(len(windows))
+                windows.append(window)
+    return {"janelas": tuple(windows), "por_posicao": tuple(tuple(indexes) for indexes in by_position)}
+
+# Ordem das posições pela distância ao centro: a distância de Chebyshev de cada posição à posição central e a ordem
+# de todas as posições (por distância e, em caso de empate, pela posição) são calculadas uma vez por dimensão. Ordenar
+# um conjunto de posições passa a ser filtrar a ordem já calculada, ou ordenar pelo posto de cada posição.
+
+@functools.lru_cache(maxsize=8)
+def obtem_ordem_centro(lines, columns):
+    """ Obtem a ordem das posições pela distância ao centro de um tabuleiro com as dimensões recebidas
+    
+        Args:
+            lines (int): Número de linhas do tabuleiro
+            columns (int): Número de colunas do tabuleiro
+            
+        Returns:
+            ordem (dict): Dicionário com a distância ao centro de cada posição ("distancia"), todas as posições por
+            ordem de distância e depois de posição ("ordem") e o posto de cada posição nessa ordem ("posto"), tuplos
+            indexados pela posição quando são por posição
+        
+    
+    """
+    center_row = lines // 2
+    center_column = columns // 2
+    distance = (0,) + tuple(max(abs(pos // columns - center_row), abs(pos % columns - center_column))
+                            for pos in range(lines * columns))
+    order = tuple(sorted(range(1, lines * columns + 1), key=lambda pos: (distance[pos], pos)))
+    rank = [0] * (lines * columns + 1)
+    for index in range(len(order)):
+        rank[order[index]] = index
+    return {"distancia": distance, "ordem": order, "posto": tuple(rank)}
+
+def ordena_posicoes(lines, columns, tup):
+    """ Ordena posições pela distância ao centro do tabuleiro, tal como ordena_posicoes_tabuleiro, sem precisar de
+    um tabuleiro em formato de tuplo
+    
+        Args:
+            lines (int): Número de linhas do tabuleiro
+            columns (int): Número de colunas do tabuleiro
+            tup (tuplo): Posições a ordenar (ou qualquer sequência ou conjunto), todas do tabuleiro
+            
+        Returns:
+            positions (tuplo): Posições recebidas, sem repetições, pela ordem da distância ao centro
+        
+    
+    """
+    index = obtem_ordem_centro(lines, columns)
+    order = index["ordem"]
+    # Com muitas posições é percorrida a ordem completa, com poucas ordenam-se só as recebidas pelo seu posto
+    if 8 * len(tup) >= len(order):
+        chosen = bytearray(len(order) + 1)
+        for pos in tup:
+            chosen[pos] = 1
+        return tuple(itertools.compress(order, [chosen[pos] for pos in order]))
+    return tuple(sorted(set(tup), key=index["posto"].__getitem__))
+
+def gera_posicoes_centro(lines, columns, posicoes=None):
+    """ Gera as posições pela distância ao centro do tabuleiro, uma de cada vez, para que se possa parar na primeira
+    que interessa
+    
+        Args:
+            lines (int): Número de linhas do tabuleiro
+            columns (int): Número de colunas do tabuleiro
+            posicoes (set): Posições a gerar (qualquer objeto que permita usar in), ou None para todas
+            
+        Returns:
+            posicoes (generator): Gerador das posições pela ordem da distância ao centro
+        
+    
+    """
+    for pos in obtem_ordem_centro(lines, columns)["ordem"]:
+        if posicoes is None or pos in posicoes:
+            yield pos
+
 def obtem_coluna(tab, pos):
     """ Recebe um tabuleiro e uma posição e obtém a coluna que contém esta posição
     
@@ -122,28 +352,9 @@ def obtem_coluna(tab, pos):
     
     """
 
-    # Define o tuplo que será retornado pela função
-    column_positions = ()
-    
-    # Obtem o tamanho de cada linha
+    # Obtem o número de colunas, a coluna da posição é lida da geometria do tabuleiro
     row_size = len(tab[0])
-    
-    # Utiliza um while loop para reduzir a posição recebida para uma que esteja na mesma coluna mas na primeira linha
-    while pos > row_size:
-        pos -= row_size
-    
-    # Como a posição reduzida à primeira linha não corresponde ao seu index mas sim à sua posição no tabuleiro, para corresponder 
-    # à um index deve-se retirar 1 desta coluna, valor que é então atribuido à variável column
-    column = pos - 1
-    
-    # Define multiplier, que é utilizado para adicionar à posição o número de posições contidos em cada linha, de modo que seja possível
-    # obter o valor contido na mesma coluna porém na linha seguinte, em relação à posição anterior ou incial
-    multiplier = 0
-    
-    # Utiliza um for loop para obter posições da coluna, passando para a linha seguinte a cada loop
-    for row in tab:
-        column_positions = column_positions + (pos + multiplier*row_size,)
-        multiplier += 1
+    column_positions = obtem_geometria(len(tab), row_size)["coluna"][(pos - 1) % row_size + 1]
         
     return column_positions
 
@@ -160,24 +371,8 @@ def obtem_linha(tab, pos):
     
     """
         
-    # Define a variável row_size que contem o número de elementos de cada linha do tabuleiro
-    row_size = len(tab[0])
-    
-    # Obtem um float, cuja parte inteira corresponde às linhas completas, as quais a posição não pertence
-    row_number = (pos - 1) // row_size
-    
-    column_index = 1
-    row_positions = ()
-    
-    # For loop para obter a posição de cada elemento da linha em que se encontra a posição recebida
-    for element in tab[row_number]:
-        posicao = column_index +  row_number * row_size
-        
-        #Adiciona a posição no tuplo que será retornado
-        row_positions += (posicao,)
-        
-        # Adiciona um à coluna (ou indice) para a próxima posição poder ser obtida
-        column_index += 1
+    # Obtem a linha da posição a partir da geometria do tabuleiro
+    row_positions = obtem_geometria(len(tab), len(tab[0]))["linha"][pos]
         
     return row_positions
 
@@ -196,59 +391,30 @@ def obtem_diagonais(tab, pos):
     
     """
     
-    # Obtem tamanho da linha
-    row_size = obtem_dimensao(tab)[1]
-    diagonal = ()
-    antidiagonal = ()
-        
-    row = 0
-    # Obtem o index da posição
-    while pos not in range(1, row_size + 1):
-        pos -= row_size
-        row += 1
-    
-    index = pos - 1
-    
-    # Obtem qual é a menor distancia para as bordas do tabuleiro (começo da linha ou começo da coluna)
-    minimum = min(index, row)
-    
-    # Obtem o index e a linha da primeira posição do tuplo da diagonal
-    diagonal_index_start = index - minimum
-    diagonal_row_start = row - minimum
-    
-    # Obtem a posicao em que começa a diagonal
-    pos = diagonal_row_start * row_size + diagonal_index_start + 1
-    
-    # Obtem todas as posições na diagonal
-    while diagonal_row_start < len(tab):
-        if diagonal_index_start <= row_size - 1:
-            diagonal += (pos,)
-            pos += row_size + 1
-            diagonal_index_start += 1
-        diagonal_row_start += 1
-    
-    # Obtem qual é a menor distancia para as bordas do tabuleiro (começo da linha ou começo da coluna)
-    minimum = min(row_size - 1 - index, (row))
-    
-    # Obtem o index e a linha da primeira posição do tuplo da antidiagonal
-    antidiagonal_index_start = index + minimum
-    antidiagonal_row_start = row - minimum
-    
-    # Obtem a posicao em que começa a diagonal
-    pos = antidiagonal_row_start * row_size + antidiagonal_index_start + 1
-
-    # Obtem todas as posições na diagonal
-    while antidiagonal_row_start < len(tab):
-        if antidiagonal_index_start >= 0:
-            antidiagonal += (pos,)
-            pos += row_size - 1
-            antidiagonal_index_start -= 1
-        antidiagonal_row_start += 1
+    # Obtem as dimensões do tabuleiro, a diagonal e a antidiagonal são lidas da geometria do tabuleiro
+    lines, row_size = obtem_dimensao(tab)
+    geometry = obtem_geometria(lines, row_size)
         
-    diagonais = (tuple(sorted(diagonal)), tuple(sorted(antidiagonal, reverse=True)))
+    diagonais = (geometry["diagonal"][pos], geometry["antidiagonal"][pos])
         
     return diagonais 
 
+# Desenho do tabuleiro: cada linha é desenhada juntando os símbolos das posições com "---", e as linhas são juntadas
+# com o separador da largura do tabuleiro ("|" por baixo de cada posição). Os separadores são calculados uma vez por
+# largura e o texto de cada linha é guardado, porque a maior parte das linhas não muda de uma jogada para a seguinte.
+
+SIMBOLOS = {-1: "O", 0: "+"}
+
+# Função auxiliar à função tabuleiro_para_str, obtém o separador entre duas linhas de um tabuleiro com a largura dada
+@functools.lru_cache(maxsize=16)
+def obtem_separador(columns):
+    return "\n" + "   ".join("|" * columns) + "\n"
+
+# Função auxiliar à função tabuleiro_para_str, obtém o texto de uma linha do tabuleiro
+@functools.lru_cache(maxsize=4096)
+def linha_para_str(row):
+    return "---".join([SIMBOLOS.get(element, "X") for element in row])
+
 def tabuleiro_para_str(tab):
     """ Retorna uma representação de um tabuleiro a partir de um tuplo.
     
@@ -260,42 +426,73 @@ def tabuleiro_para_str(tab):
         
     
     """
+    if tab == ():
+        return ""
+    # As linhas que não são tuplos não podem ser guardadas, são desenhadas diretamente
+    rows = [linha_para_str(row) if type(row) == tuple else linha_para_str.__wrapped__(row) for row in tab]
+    return obtem_separador(len(tab[-1])).join(rows)
+
+def cria_desenho(tab):
+    """ Cria o desenho de um tabuleiro, que pode depois ser atualizado jogada a jogada
+    
+        Args:
+            tab (tuplo): Tabuleiro a desenhar
+            
+        Returns:
+            desenho (dict): Desenho com o tabuleiro desenhado ("tab"), o número de colunas e o texto igual a
+            tabuleiro_para_str(tab) ("texto")
+        
+    
+    """
+    return {"tab": tab, "colunas": len(tab[0]), "texto": tabuleiro_para_str(tab)}
+
+def desenho_marca_posicao(desenho, pos, jog):
+    """ Atualiza o desenho de um tabuleiro depois de marcada uma posição, alterando apenas o símbolo dessa posição
+    
+        Args:
+            desenho (dict): Desenho a atualizar
+            pos (int): Posição marcada
+            jog (int): Valor da posição marcada
+            
+        Returns:
+            texto (string): Novo texto do desenho
+        
     
-    tab_str = ""
-    # x é um contador das linhas
-    x = 0
+    """
+    columns = desenho["colunas"]
+    # Cada linha tem 4 * colunas - 3 carateres e o separador tem 4 * colunas - 1
+    index = (pos - 1) // columns * (8 * columns - 4) + (pos - 1) % columns * 4
+    text = desenho["texto"]
+    desenho["texto"] = text[:index] + SIMBOLOS.get(jog, "X") + text[index + 1:]
+    desenho["tab"] = None
+    return desenho["texto"]
+
+def desenho_atualiza(desenho, tab):
+    """ Atualiza o desenho para um novo tabuleiro, voltando a desenhar só as linhas diferentes (ou o tabuleiro todo se
+        as dimensões mudaram)
     
-    # Cria o tabuleiro
-    for row in tab:
-        # i é um contador de elementos por linha do tabuleiro
-        i = 0
-        for element in row:
-            # Pra cada elemento do tabuleiro cujo valor é -1 adiciona um O ao tabuleiro
-            if element == -1:
-                tab_str += "O"
-                
-            # Pra cada elemento do tabuleiro cujo valor é 0 adiciona um + ao tabuleiro
-            elif element == 0: 
-                tab_str += "+"
-            else:
-            # Pra cada elemento do tabuleiro cujo valor é 1 adiciona um X ao tabuleiro
-                tab_str += "X"
-            # Caso não seja o último elemento da linha, adiciona o "---"
-            if i < len(row) - 1:
-                tab_str += "---"
-            i += 1
-            
-        # Caso não seja a ultima linha adiciona os espaços embaixo das posições
-        if x < len(tab) - 1:
-            tab_str += "\n"
-            for num in range(1, i + 1):
-                tab_str += "|"
-                if num < i:
-                    tab_str += "   "
-            tab_str += "\n"
-        x += 1
-        
-    return tab_str
+        Args:
+            desenho (dict): Desenho a atualizar
+            tab (tuplo): Novo tabuleiro
+            
+        Returns:
+            texto (string): Novo texto do desenho, igual a tabuleiro_para_str(tab)
+        
+    
+    """
+    old = desenho["tab"]
+    if old is None or len(old) != len(tab) or len(tab[0]) != desenho["colunas"]:
+        desenho.update(cria_desenho(tab))
+        return desenho["texto"]
+    columns = desenho["colunas"]
+    size = 8 * columns - 4
+    text = desenho["texto"]
+    for num in range(len(tab)):
+        if tab[num] is not old[num] and tab[num] != old[num]:
+            text = text[:num * size] + linha_para_str(tab[num]) + text[num * size + 4 * columns - 3:]
+    desenho["tab"] = tab
+    desenho["texto"] = text
+    return text
 
 def eh_posicao_valida(tab, pos):
     """ Verifica se a posição recebida é válida para o argumento recebido.
@@ -314,12 +511,13 @@ def eh_posicao_valida(tab, pos):
         return pos in range(1, len(tab) * row_size + 1)
     raise ValueError("eh_posicao_valida: argumentos invalidos")
         
-def eh_posicao_livre(tab, pos):
+def eh_posicao_livre(tab, pos, estado=None):
     """ Verifica se a posição recebida é livre.
     
         Args:
             tab (tuplo): Tabuleiro para verificar se a posição é livre
             pos (int): Inteiro que corresponde a posição a ser verificada
+            estado (dict): Estado de jogo do tabuleiro, cujo conjunto de posições livres é consultado, ou None
             
         Returns:
             Booleano(boolean): True se a posição for livre no tabuleiro, False se não for
@@ -328,14 +526,17 @@ def eh_posicao_livre(tab, pos):
     """
     if eh_tabuleiro(tab) and eh_posicao(pos):
         if eh_posicao_valida(tab, pos):
+            if estado is not None:
+                return conjunto_contem(estado_conjunto(estado, 0), pos)
             return obtem_valor(tab, pos) == 0
     raise ValueError("eh_posicao_livre: argumentos invalidos")
 
-def obtem_posicoes_livres(tab):
+def obtem_posicoes_livres(tab, estado=None):
     """ Obtem tuplo com todas as posições livres do tabuleiro
     
         Args:
             tab (tuplo): Tabuleiro para verificar as posições livres
+            estado (dict): Estado de jogo do tabuleiro, cujo conjunto de posições livres é usado, ou None
             
         Returns:
             posicoes_livres(tuplo): Tuplo com todas posições livres do tabuleiro
@@ -343,21 +544,29 @@ def obtem_posicoes_livres(tab):
     
     """
     if eh_tabuleiro(tab):
-        row_size = len(tab[0])
-        posicoes_livres = ()
-        # Para cada posição do tabuleiro, se o valor da posição for zero adiciona no posicoes_livres
-        for pos in range(1, row_size * len(tab) + 1):
-            if obtem_valor(tab, pos) == 0:
-                posicoes_livres += (pos,)
-        return posicoes_livres
+        if estado is not None:
+            return conjunto_posicoes(estado_conjunto(estado, 0))
+        return posicoes_valor(tab, 0)
     raise ValueError("obtem_posicoes_livres: argumentos invalidos")
+
+# Função auxiliar às funções obtem_posicoes_livres e obtem_posicoes_jogador, obtém por ordem as posições do
+# tabuleiro com o valor recebido, percorrendo cada linha uma única vez
+def posicoes_valor(tab, value):
+    row_size = len(tab[0])
+    positions = []
+    start = 1
+    for row in tab:
+        positions.extend(start + index for index in range(row_size) if row[index] == value)
+        start += row_size
+    return tuple(positions)
             
-def obtem_posicoes_jogador(tab, jog):
+def obtem_posicoes_jogador(tab, jog, estado=None):
     """ Obtem tuplo com todas as posições do jogador do tabuleiro
     
         Args:
             tab (tuplo): Tabuleiro para verificar as posições do jogador
             jog (int): Jogador a verificar posições
+            estado (dict): Estado de jogo do tabuleiro, cujo conjunto de posições do jogador é usado, ou None
             
         Returns:
             jog_positions(tuplo): Tuplo com todas posições do jogador do tabuleiro
@@ -365,25 +574,11 @@ def obtem_posicoes_jogador(tab, jog):
     
     """
     if eh_tabuleiro(tab) and (jog == 1 or jog == -1):
-        row_size = len(tab[0])
-        jog_positions = ()
-        for pos in range(1, row_size * len(tab) + 1):
-            if obtem_valor(tab, pos) == jog:
-                jog_positions += (pos, )
-        return jog_positions
+        if estado is not None:
+            return conjunto_posicoes(estado_conjunto(estado, jog))
+        return posicoes_valor(tab, jog)
     raise ValueError("obtem_posicoes_jogador: argumentos invalidos")
 
-# Função auxiliar para a função obtem_posicoes_adjacentes
-def retorna_adjacentes(tup, pos):
-    posicoes_adjacentes = ()
-    if pos in tup:
-                index = tup.index(pos)
-                if index > 0:
-                    posicoes_adjacentes += (tup[index - 1],)
-                if index < len(tup) - 1:
-                    posicoes_adjacentes += (tup[index + 1],)
-    return posicoes_adjacentes
-
 def obtem_posicoes_adjacentes(tab, pos):
     """ Obtem tuplo com todas as posições adjacentes à posição recebida
     
@@ -398,18 +593,9 @@ def obtem_posicoes_adjacentes(tab, pos):
     """
     if eh_tabuleiro(tab) and eh_posicao(pos):
         if eh_posicao_valida(tab, pos):
-            diagonal = obtem_diagonais(tab, pos)[0]
-            antidiagonal = obtem_diagonais(tab, pos)[1]
-            linha = obtem_linha(tab, pos)
-            coluna = obtem_coluna(tab, pos)
+            posicoes_adjacentes = obtem_geometria(len(tab), len(tab[0]))["adjacentes"][pos]
             
-            posicoes_adjacentes = ()
-            posicoes_adjacentes += retorna_adjacentes(diagonal, pos)
-            posicoes_adjacentes += retorna_adjacentes(antidiagonal, pos)
-            posicoes_adjacentes += retorna_adjacentes(linha, pos)
-            posicoes_adjacentes += retorna_adjacentes(coluna, pos)
-            
-            return tuple(sorted(posicoes_adjacentes))
+            return posicoes_adjacentes
 
         else:
             raise ValueError("obtem_posicoes_adjacentes: argumentos invalidos")
@@ -434,53 +620,9 @@ def ordena_posicoes_tabuleiro(tab, tup):
             if not eh_posicao(pos):
                 if not eh_posicao_valida(tab, pos):
                     raise ValueError("ordena_posicoes_tabuleiro: argumentos invalidos")
-        row_size = len(tab[0])
-        lines = obtem_dimensao(tab)[0]
-        columns = obtem_dimensao(tab)[1]
-        coordenates = ()
-        final_coordenates = ()
-        distance_coordenates = ()
-        positions = ()
-        
-        center = (lines // 2) *  columns + columns // 2 + 1
-        
-        row = 0
-        pos = 1
-        for positions_row in tab:
-            for element in obtem_linha(tab, pos):
-                if element in tup:
-                    coordenates += ((element, row,),)
-            row += 1
-            pos += row_size
-            
-        column = 0
-        pos = 1
-        index = 0
-        
-        for pos in range(1, row_size * len(tab) + 1):
-            row = (pos - 1) // row_size
-            column = pos - row * row_size - 1
-            if pos in tup:
-                final_coordenates += ((coordenates[index] + (column,),))
-                index += 1
-            column += 1
-            pos += 1
-         
-        center_coordenates = (center, lines // 2, columns // 2)
-        
-        for coordenate in final_coordenates:
-            distance = max(abs(coordenate[1] - center_coordenates[1]), abs(coordenate[2] - center_coordenates[2]))
-            if coordenate[0] in tup:
-                distance_coordenates += (coordenate + (distance, ), )
-        
-        distance = 0
-        for num in range(1, max(center_coordenates[0], center_coordenates[1])):
-            for coordenate in distance_coordenates:
-                if coordenate[3] == distance:
-                    positions += (coordenate[0], )
-            distance += 1
-            
-        return positions
+        lines, columns = obtem_dimensao(tab)
+        # As posições fora do tabuleiro são ignoradas
+        return ordena_posicoes(lines, columns, [pos for pos in tup if pos <= lines * columns])
     raise ValueError("ordena_posicoes_tabuleiro: argumentos invalidos")
 
 def marca_posicao(tab, pos, jog):
@@ -496,7 +638,8 @@ def marca_posicao(tab, pos, jog):
         
     
     """
-    if eh_tabuleiro(tab) and eh_posicao(pos) and pos in obtem_posicoes_livres(tab) and jog in [-1, 1]:
+    if eh_tabuleiro(tab) and eh_posicao(pos) and pos <= len(tab) * len(tab[0]) and obtem_valor(tab, pos) == 0 \
+            and jog in [-1, 1]:
         row_size = len(tab[0])
         row = (pos - 1) // row_size
         index = pos - (row * row_size + 1 )
@@ -520,15 +663,19 @@ def marca_posicao(tab, pos, jog):
             else:
                 final_tab += (tab[tab_line],)
             tab_line += 1
+        
+        # Um tabuleiro válido com uma posição livre marcada continua a ser válido
+        if TABULEIROS_CONFIAVEIS.get(id(tab)) is tab:
+            regista_tabuleiro_confiavel(final_tab)
         return final_tab
     
     raise ValueError("marca_posicao: argumentos invalidos")
 
-#Função auxiliar à função verifica_k_linhas
-def obtem_tup(tab, pos, jog, k, tup):
+#Função auxiliar à função verifica_k_linhas, lê as posições de tup diretamente do tabuleiro, já validado
+def obtem_tup(tab, columns, jog, k, tup):
     count = 0
     for num in tup:
-        if obtem_valor(tab, num) == jog:
+        if tab[(num - 1) // columns][(num - 1) % columns] == jog:
             count += 1
             if count == k:
                 return True
@@ -536,6 +683,73 @@ def obtem_tup(tab, pos, jog, k, tup):
             count = 0
     return False
 
+# Sequências de uma posição: para cada direção (linha, coluna, diagonal e antidiagonal) obtém-se o comprimento da
+# sequência de peças de um jogador que passa pela posição e se cada extremo está aberto (a posição a seguir à última
+# peça existe e está livre). Só são lidas as posições a distância até k da posição, por isso o comprimento é no máximo
+# 2k - 1 e um extremo com mais peças do jogador para lá desse limite conta como fechado. É a verificação usada depois
+# de cada jogada, em que a última peça faz necessariamente parte de qualquer sequência nova.
+
+DIRECOES_SEQUENCIAS = ((0, 1), (1, 0), (1, 1), (-1, 1))
+
+# Função auxiliar às funções de sequências de uma posição, obtém as sequências a partir das posições em cells,
+# indexado pela posição como as células de um tabuleiro mutável
+def sequencias_celulas(cells, lines, columns, pos, jog, k):
+    row, col = (pos - 1) // columns, (pos - 1) % columns
+    sequences = []
+    for drow, dcol in DIRECOES_SEQUENCIAS:
+        # O número de posições até ao limite do tabuleiro em cada sentido, limitado a k, evita verificar as margens
+        # a cada passo
+        before = min(k, row if drow == 1 else lines - 1 - row if drow == -1 else k,
+                     col if dcol == 1 else k)
+        after = min(k, lines - 1 - row if drow == 1 else row if drow == -1 else k,
+                    columns - 1 - col if dcol == 1 else k)
+        step = drow * columns + dcol
+        index = pos - step
+        count = 0
+        while count < before and count < k - 1 and cells[index] == jog:
+            count += 1
+            index -= step
+        open_before = count < before and cells[index] == 0
+        length = count + 1
+        index = pos + step
+        count = 0
+        while count < after and count < k - 1 and cells[index] == jog:
+            count += 1
+            index += step
+        sequences.append((length + count, open_before, count < after and cells[index] == 0))
+    return tuple(sequences)
+
+def obtem_sequencias(tab, pos, jog, k):
+    """ Obtem as sequências de peças de jog que passam por uma posição, em cada direção
+    
+        Args:
+            tab (tuplo): Tabuleiro
+            pos (int): Posição, que conta como peça de jog se estiver livre (para avaliar a jogada)
+            jog (int): Jogador
+            k (int): Número de peças seguidas para ganhar, que limita as posições lidas
+            
+        Returns:
+            sequencias (tuplo): Um tuplo (comprimento, extremo anterior aberto, extremo seguinte aberto) para a linha,
+            a coluna, a diagonal e a antidiagonal (de baixo à esquerda para cima à direita); se pos tem uma peça do
+            outro jogador, nenhuma sequência de jog passa por ela e todos os comprimentos são 0
+        
+    
+    """
+    if eh_tabuleiro(tab) and eh_posicao(pos) and jog in (-1, 1) and type(k) == int and k > 0:
+        if eh_posicao_valida(tab, pos):
+            if obtem_valor(tab, pos) == -jog:
+                return ((0, False, False),) * len(DIRECOES_SEQUENCIAS)
+            lines, columns = len(tab), len(tab[0])
+            row, col = (pos - 1) // columns, (pos - 1) % columns
+            # Só são copiadas as posições a distância até k de pos nas quatro direções
+            cells = {}
+            for drow, dcol in DIRECOES_SEQUENCIAS:
+                for num in range(-k, k + 1):
+                    if 0 <= row + num * drow < lines and 0 <= col + num * dcol < columns:
+                        cells[(row + num * drow) * columns + col + num * dcol + 1] = tab[row + num * drow][col + num * dcol]
+            return sequencias_celulas(cells, lines, columns, pos, jog, k)
+    raise ValueError("obtem_sequencias: argumentos invalidos")
+
 def verifica_k_linhas(tab, pos, jog, k):
     """ Retorna True se o jogador jog obteve k posições em sequencia, sequencia a qual contem a posicao pos
     
@@ -551,9 +765,12 @@ def verifica_k_linhas(tab, pos, jog, k):
     
     """
     if eh_tabuleiro(tab) and eh_posicao(pos) and k > 0:
-        if eh_posicao_valida(tab, pos):
-            if obtem_valor(tab, pos) == jog:
-                return obtem_tup(tab, pos, jog, k, obtem_linha(tab, pos)) or obtem_tup(tab, pos, jog, k, obtem_coluna(tab, pos)) or obtem_tup(tab, pos, jog, k, obtem_diagonais(tab, pos)[0]) or obtem_tup(tab, pos, jog, k, obtem_diagonais(tab, pos)[1])
+        # O tabuleiro é validado uma única vez, as quatro linhas da posição vêm das tabelas de geometria
+        lines, columns = len(tab), len(tab[0])
+        if pos <= lines * columns:
+            if tab[(pos - 1) // columns][(pos - 1) % columns] == jog:
+                geometry = obtem_geometria(lines, columns)
+                return obtem_tup(tab, columns, jog, k, geometry["linha"][pos]) or obtem_tup(tab, columns, jog, k, geometry["coluna"][pos]) or obtem_tup(tab, columns, jog, k, geometry["diagonal"][pos]) or obtem_tup(tab, columns, jog, k, geometry["antidiagonal"][pos])
             return False
     raise ValueError("verifica_k_linhas: argumentos invalidos")
 
@@ -570,263 +787,3654 @@ def eh_fim_jogo(tab, k):
     
     """
     if eh_tabuleiro(tab) and type(k) == int and k > 0:
-        for position in range(1, len(tab) * len(tab[0]) + 1):
-            if obtem_posicoes_livres(tab) == ():
-                return True
-            for number in [-1, 1]:
-                if verifica_k_linhas(tab, position, number, k):
-                    return True
-        
-        return False
+        # Basta procurar as sequências de k peças no bitboard do tabuleiro, sem criar um estado de jogo
+        return bitboard_eh_fim_jogo(obtem_bitboard(tab), k)
     raise ValueError("eh_fim_jogo: argumentos invalidos")
 
-def escolhe_posicao_manual(tab):
-    """ Retorna posição escolhida pelo jogador
+# Motor bitboard: cada jogador é guardado como um inteiro em que cada bit corresponde a uma posição.
+# Cada linha do tabuleiro ocupa colunas + 1 bits, o bit extra fica sempre a 0 e impede que os
+# deslocamentos horizontais e diagonais passem de uma linha para a seguinte.
+
+MOTORES = ("tuplo", "bitboard")
+
+def tabuleiro_para_bitboard(tab):
+    """ Converte um tabuleiro em formato de tuplo para um bitboard
     
         Args:
-            tab (tuplo): Tabuleiro para marcar a posicao
+            tab (tuplo): Tabuleiro a converter
             
         Returns:
-            pos(int): posição escolhida pelo jogador
+            bitboard (tuplo): Tuplo (linhas, colunas, bits_x, bits_o) em que bits_x e bits_o marcam as posições
+            dos jogadores 1 e -1
         
     
     """
-    #SE DER ERRO EH PRA DAR ERRO OU REPETIR QUANDO EH LETRA E NUMERO
     if eh_tabuleiro(tab):
-        chosen_position = input("Turno do jogador. Escolha uma posicao livre: ")
-        if chosen_position.isdigit():
-            pos = int(chosen_position)
-            if eh_posicao(pos):
-                if eh_posicao_valida(tab, pos):
-                    if obtem_valor(tab, pos) == 0:
-                        return pos
-            else:
-                raise ValueError("escolhe_posicao_manual: argumento invalido")
-        else:
-            raise ValueError("escolhe_posicao_manual: argumento invalido")
-        pos = escolhe_posicao_manual(tab)
-        return pos
-    
-    raise ValueError("escolhe_posicao_manual: argumento invalido")
+        return obtem_bitboard(tab)
+    raise ValueError("tabuleiro_para_bitboard: argumentos invalidos")
 
+# Função auxiliar à função tabuleiro_para_bitboard, guarda as conversões mais recentes para que o mesmo
+# tabuleiro não seja convertido várias vezes durante uma jogada do computador
+@functools.lru_cache(maxsize=64)
+def obtem_bitboard(tab):
+    lines = len(tab)
+    columns = len(tab[0])
+    width = columns + 1
+    bits_x = 0
+    bits_o = 0
+    for row in range(lines):
+        for column in range(columns):
+            if tab[row][column] == 1:
+                bits_x |= 1 << (row * width + column)
+            elif tab[row][column] == -1:
+                bits_o |= 1 << (row * width + column)
+    return (lines, columns, bits_x, bits_o)
 
-        
-
-def escolhe_posicao_auto(tab, jog, k, lvl):
-    """ Retorna posição escolhida pelo pc
+def bitboard_para_tabuleiro(bb):
+    """ Converte um bitboard para um tabuleiro em formato de tuplo
     
         Args:
-            tab (tuplo): Tabuleiro para marcar a posicao
-            jog(int): jogador do pc
-            k(int): quantos em sequencia pra ganhar
-            lvl(string): nivel de dificuldade
+            bb (tuplo): Bitboard a converter
             
         Returns:
-            pos(int): posição escolhida pelo pc
+            tab (tuplo): Tabuleiro em formato de tuplo com as mesmas posições marcadas
         
     
     """
-    if eh_tabuleiro(tab) and not eh_fim_jogo(tab, k) and jog in [-1, 1] and type(k) == int and k > 0:
-        posicoes_livres = obtem_posicoes_livres(tab)
-        
-        if lvl == "facil":
-            if obtem_posicoes_jogador(tab, jog) != ():
-                for pos in ordena_posicoes_tabuleiro(tab, posicoes_livres):
-                    for num in obtem_posicoes_jogador(tab, jog):
-                        posicoes_adjacentes = obtem_posicoes_adjacentes(tab, num)
-                        if pos in posicoes_adjacentes:
-                            return pos                   
+    lines, columns, bits_x, bits_o = bb
+    width = columns + 1
+    tab = ()
+    for row in range(lines):
+        tab_row = ()
+        for column in range(columns):
+            bit = 1 << (row * width + column)
+            if bits_x & bit:
+                tab_row += (1,)
+            elif bits_o & bit:
+                tab_row += (-1,)
             else:
-                
-                posicoes = ordena_posicoes_tabuleiro(tab, posicoes_livres)
-                pos = posicoes[0]
-                return pos
-                
+                tab_row += (0,)
+        tab += (tab_row,)
+    return tab
+
+# Função auxiliar às funções do motor bitboard, obtém o índice do bit correspondente a uma posição
+def bitboard_indice(bb, pos):
+    lines, columns = bb[0], bb[1]
+    if not (type(pos) == int and 1 <= pos <= lines * columns):
+        raise ValueError("bitboard: argumentos invalidos")
+    return (pos - 1) // columns * (columns + 1) + (pos - 1) % columns
+
+# Função auxiliar às funções do motor bitboard, obtém a máscara com todas as posições do tabuleiro
+@functools.lru_cache(maxsize=32)
+def bitboard_mascara_cheia(lines, columns):
+    mask = 0
+    for row in range(lines):
+        mask |= ((1 << columns) - 1) << (row * (columns + 1))
+    return mask
+
+# Função auxiliar às funções do motor bitboard, obtém para cada direção (linha, coluna, diagonal e antidiagonal)
+# a máscara das posições que pertencem a pelo menos uma sequência de k posições do jogador
+@functools.lru_cache(maxsize=1024)
+def bitboard_sequencias(bits, columns, k):
+    width = columns + 1
+    sequences = ()
+    for shift in (1, width, width + 1, width - 1):
+        # Cada bit de starts marca o início de uma sequência de k posições nesta direção
+        starts = bits
+        for i in range(1, k):
+            starts &= bits >> (i * shift)
+        cover = 0
+        for i in range(k):
+            cover |= starts << (i * shift)
+        sequences += (cover,)
+    return sequences
+
+def bitboard_obtem_valor(bb, pos):
+    """ Recebe um bitboard e uma posição e devolve o valor contido nesta posição
+    
+        Args:
+            bb (tuplo): Bitboard do tabuleiro
+            pos (int): Posição escolhida
+            
+        Returns:
+            value (int): 1, -1 ou 0 consoante a posição pertença a um dos jogadores ou esteja livre
         
-        elif lvl == "normal":
-            possible_jogs = [jog, -jog]
-            possible_in_row = ()
-            
-            for chosen_jog in possible_jogs:
-                L = k
-                for pos in range(1, len(tab[0]) * len(tab) + 1):
-                    if obtem_valor(tab, pos) == chosen_jog and pos not in obtem_posicoes_livres(tab):
-                        while L > 0:
-                            if verifica_k_linhas(tab, pos, chosen_jog, L):
-                                L += 1
-                                if (chosen_jog, L) not in possible_in_row:
-                                    possible_in_row += ((chosen_jog, L),)
-                                break
-                            L -= 1
-                            
-            if possible_in_row != ():
-                chosen_1 = ()
-                chosen_minus_1 = ()
-                
-                for possibility in possible_in_row:
-                    if possibility[0] == 1:
-                        chosen_1 += (possibility[1],)
-                    elif possibility[0] == -1:
-                        chosen_minus_1 += (possibility[1],)
-                        
-                possible_in_row = ((1, max(chosen_1)), (-1, max(chosen_minus_1)))
-            
-                if possible_in_row != ((1, ),(-1 )):
-                    max_L = max(possible_in_row[0][1], possible_in_row[1][1])
-            
-                    for possibility in possible_in_row:
-                        if possible_in_row[0][1] == possible_in_row[0][1]:
-                            best_play = jog
-                        if possibility[1] == max_L:
-                            best_play = possibility[0]
-                
-                    for pos in range(1, len(tab[0]) * len(tab) + 1):
-                        if verifica_k_linhas(tab, pos, best_play, L - 1):
-                            
-                            for num in obtem_linha(tab, pos):
-                                if num in obtem_posicoes_livres(tab):
-                                    tentativa = marca_posicao(tab, num, jog)
-                                    if verifica_k_linhas(tentativa, num, 1, L) or verifica_k_linhas(tentativa, num, 1, k) or verifica_k_linhas(tentativa, num, -1, L) or verifica_k_linhas(tentativa, num, -1, k):
-                                        if best_play == jog:
-                                            return num
-                                        else:
-                                            tentativa = marca_posicao(tab, num, jog)
-                                            return num
-                                        
-                            for num in obtem_coluna(tab, pos):
-                                if num in obtem_posicoes_livres(tab):
-                                    tentativa = marca_posicao(tab, num, best_play)
-                                    if verifica_k_linhas(tentativa, num, best_play, L):
-                                        if best_play == jog:
-                                            return num
-                                        else:
-                                            tentativa = marca_posicao(tab, num, jog)
-                                            return num
-                            
-                            for num in obtem_diagonais(tab, pos)[0]:
-                                if num in obtem_posicoes_livres(tab):
-                                    tentativa = marca_posicao(tab, num, best_play)
-                                    if verifica_k_linhas(tentativa, num, best_play, L):
-                                        if best_play == jog:
-                                            return num
-                                        else:
-                                            tentativa = marca_posicao(tab, num, jog)
-                                            return num
-                                
-                            for num in obtem_diagonais(tab, pos)[1]:
-                                if num in obtem_posicoes_livres(tab):
-                                    tentativa = marca_posicao(tab, num, best_play)
-                                    if verifica_k_linhas(tentativa, num, best_play, L):
-                                        if best_play == jog:
-                                            return num
-                                        else:
-                                            tentativa = marca_posicao(tab, num, jog)
-                                            return num
-            else:
-                pos_livre = obtem_posicoes_livres(tab)
-                pos_livre_ordenadas = ordena_posicoes_tabuleiro(tab, pos_livre)
-                return pos_livre_ordenadas[0]
-            
-                    
-        elif lvl == "dificil":
-            player = jog
-            tabuleiro1= tab
-            player = jog
-            pos_livres = obtem_posicoes_livres(tab)
-            posicoes_checadas = 0
-            for pos in pos_livres:
-                posicoes_checadas += 1
-                tabuleiro1 = marca_posicao(tab, pos, jog)
-                while not eh_fim_jogo(tabuleiro1, k):
-                    posicao = escolhe_posicao_auto(tabuleiro1, -player, k, "normal")
-                    tabuleiro_novo1 = marca_posicao(tabuleiro1, posicao, -player)
-                    tabuleiro1 = tabuleiro_novo1
-                    play = -player
-                    player = play
-                
-                for pos_tab1 in range(1, obtem_dimensao(tabuleiro1)[0] * obtem_dimensao(tabuleiro1)[1] + 1):
-                    if verifica_k_linhas(tabuleiro1, pos_tab1, jog, k):
-                        return pos
-                for pos_tab1 in range(1, obtem_dimensao(tabuleiro1)[0] * obtem_dimensao(tabuleiro1)[1] + 1):
-                    if eh_fim_jogo(tabuleiro1, k) and not verifica_k_linhas(tabuleiro1, pos_tab1, -jog, k):
-                        return pos
-            return pos_livres[0]
+    
+    """
+    bit = 1 << bitboard_indice(bb, pos)
+    if bb[2] & bit:
+        return 1
+    if bb[3] & bit:
+        return -1
+    return 0
 
-def jogo_mnk(cfg, jog, lvl):
-    """ Retorna posição escolhida pelo pc
+def bitboard_marca_posicao(bb, pos, jog):
+    """ Obtem bitboard com a posição escolhida marcada
     
         Args:
-            cfg (tuplo): tamanho do tabuleiro, k pra ganhar
-            jog(int): jogador 
-            lvl(string): nivel de dificuldade
+            bb (tuplo): Bitboard do tabuleiro
+            pos (int): Posição para marcar
+            jog (int): Jogador a marcar
             
         Returns:
-            winner (int): vencedor
+            bitboard (tuplo): Novo bitboard com a posição marcada com o jogador recebido
         
     
     """
-    if len(cfg) == 3 and type(cfg[0]) == int and type(cfg[1]) == int and type(cfg[2]) == int and jog in [-1, 1]:
-        if lvl == "facil" or lvl == "normal" or lvl == "dificil":
-            print("Bem-vindo ao JOGO MNK.")
-            rows = cfg[0]
-            columns = cfg[1]
-            k = cfg[2]
+    if jog in [-1, 1] and bitboard_obtem_valor(bb, pos) == 0:
+        bit = 1 << bitboard_indice(bb, pos)
+        if jog == 1:
+            return (bb[0], bb[1], bb[2] | bit, bb[3])
+        return (bb[0], bb[1], bb[2], bb[3] | bit)
+    raise ValueError("bitboard_marca_posicao: argumentos invalidos")
+
+# Função auxiliar às funções bitboard_posicoes_livres e bitboard_posicoes_jogador, converte os bits
+# ligados de uma máscara para as posições correspondentes, por ordem crescente
+def bitboard_posicoes(bits, columns):
+    width = columns + 1
+    positions = ()
+    while bits:
+        lowest = bits & -bits
+        index = lowest.bit_length() - 1
+        positions += (index // width * columns + index % width + 1,)
+        bits ^= lowest
+    return positions
+
+def bitboard_posicoes_livres(bb):
+    """ Obtem tuplo com todas as posições livres do bitboard
+    
+        Args:
+            bb (tuplo): Bitboard do tabuleiro
             
-            if jog == 1:
-                jogador = "X"
+        Returns:
+            posicoes_livres (tuplo): Tuplo com todas as posições livres, por ordem crescente
+        
+    
+    """
+    free = bitboard_mascara_cheia(bb[0], bb[1]) & ~(bb[2] | bb[3])
+    return bitboard_posicoes(free, bb[1])
+
+def bitboard_posicoes_jogador(bb, jog):
+    """ Obtem tuplo com todas as posições do jogador no bitboard
+    
+        Args:
+            bb (tuplo): Bitboard do tabuleiro
+            jog (int): Jogador a verificar posições
             
-            else:
-                jogador = "0"
-                
-            print(f"O jogador joga com '{jogador}'.")
+        Returns:
+            jog_positions (tuplo): Tuplo com todas as posições do jogador, por ordem crescente
+        
+    
+    """
+    if jog in [-1, 1]:
+        return bitboard_posicoes(bb[2] if jog == 1 else bb[3], bb[1])
+    raise ValueError("bitboard_posicoes_jogador: argumentos invalidos")
+
+def bitboard_verifica_k_linhas(bb, pos, jog, k):
+    """ Versão bitboard da função verifica_k_linhas
+    
+        Args:
+            bb (tuplo): Bitboard do tabuleiro
+            pos (int): Posição a verificar
+            jog (int): Jogador a verificar
+            k (int): Número de peças seguidas para ganhar
             
-            # Define o tab
-            tab = ()
-            row = ()
-            for num in range(1, columns + 1):
-                row += (0,)
-            for num in range(1, rows + 1):
-                tab += (row,)
+        Returns:
+            Booleano (boolean): O mesmo resultado que verifica_k_linhas para o tabuleiro correspondente
+        
+    
+    """
+    if type(k) == int and k > 0 and jog in [-1, 1]:
+        if bitboard_obtem_valor(bb, pos) != jog:
+            return False
+        sequences = bitboard_sequencias(bb[2] if jog == 1 else bb[3], bb[1], k)
+        geometry = obtem_geometria(bb[0], bb[1])
+        # Tal como verifica_k_linhas, procura uma sequência em qualquer uma das linhas que passam pela posição
+        for sequence, key in zip(sequences, ("linha", "coluna", "diagonal", "antidiagonal")):
+            if sequence:
+                for num in geometry[key][pos]:
+                    if sequence >> bitboard_indice(bb, num) & 1:
+                        return True
+        return False
+    raise ValueError("bitboard_verifica_k_linhas: argumentos invalidos")
+
+def bitboard_eh_fim_jogo(bb, k):
+    """ Versão bitboard da função eh_fim_jogo
+    
+        Args:
+            bb (tuplo): Bitboard do tabuleiro
+            k (int): Número de posições seguidas para ganhar o jogo
             
-            while not eh_fim_jogo(tab, k):
-                print(tabuleiro_para_str(tab))
-                if jog == 1:
-                    player_pos = escolhe_posicao_manual(tab)
-                    tab = marca_posicao(tab, player_pos, jog)
-                    print(tabuleiro_para_str(tab))
-                    if not eh_fim_jogo(tab, k):
-                        print(f"Turno do computador ({lvl}):")
-                        pc_choice = escolhe_posicao_auto(tab, -jog, k, lvl)
-                        tab = marca_posicao(tab, pc_choice, -jog)
-                else:
-                    print(f"Turno do computador ({lvl}):")
-                    pc_choice = escolhe_posicao_auto(tab, -jog, k, lvl)
-                    tab = marca_posicao(tab, pc_choice, -jog)
-                    if not eh_fim_jogo(tab, k):
-                        print(tabuleiro_para_str(tab))
-                        player_pos = escolhe_posicao_manual(tab)
-                        tab = marca_posicao(tab, player_pos, jog)
-                        print(tabuleiro_para_str(tab))
-                    
-                if eh_fim_jogo(tab, k):
-                    end = 0
-                    print(tabuleiro_para_str(tab))
-                    count = 0
-                    for player in [-1, 1]:
-                        for pos in range(1, len(tab) * len(tab[0]) + 1):
-                            count += 1
-                            if verifica_k_linhas(tab, pos, player, k):
-                                if player == jog:
-                                    print("VITORIA")
-                                    return player
-                                elif player == -jog:
-                                    print("DERROTA")
-                                    return player
-                    if end == 0:
-                        print("EMPATE") 
-                        return player
+        Returns:
+            Booleano (boolean): True se já acabou o jogo, False caso contrário
+        
+    
+    """
+    if type(k) == int and k > 0:
+        lines, columns, bits_x, bits_o = bb
+        if bits_x | bits_o == bitboard_mascara_cheia(lines, columns):
+            return True
+        for bits in (bits_x, bits_o):
+            for cover in bitboard_sequencias(bits, columns, k):
+                if cover:
+                    return True
+        return False
+    raise ValueError("bitboard_eh_fim_jogo: argumentos invalidos")
 
-        else:                
+# Verificação em lote: muitos tabuleiros com as mesmas dimensões são guardados num único array do numpy com forma
+# (tabuleiros, linhas, colunas), e as sequências de k peças são procuradas em todos ao mesmo tempo, somando para cada
+# direção as k fatias do array deslocadas ao longo dessa direção. O numpy só é importado quando estas funções são
+# usadas, o resto do módulo não depende dele.
+
+DIRECOES_LOTE = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# Função auxiliar às funções de verificação em lote, importa o numpy
+def importa_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("as funções de verificação em lote precisam do numpy") from None
+    return numpy
+
+def tabuleiros_para_lote(tabs):
+    """ Converte uma sequência de tabuleiros com as mesmas dimensões num array do numpy
+    
+        Args:
+            tabs (list): Sequência de tabuleiros em formato de tuplo, ou um array do numpy com forma
+            (tabuleiros, linhas, colunas), que é apenas validado. Os tabuleiros em formato de tuplo têm os limites de
+            eh_tabuleiro (até 100 linhas e colunas); um array pode ter quaisquer dimensões a partir de 2 x 2
+            
+        Returns:
+            lote (numpy.ndarray): Array de int8 com forma (tabuleiros, linhas, colunas)
+        
+    
+    """
+    numpy = importa_numpy()
+    if isinstance(tabs, numpy.ndarray):
+        lote = tabs
+    else:
+        tabs = list(tabs)
+        if tabs == [] or not all(eh_tabuleiro(tab) for tab in tabs) \
+                or len(set(obtem_dimensao(tab) for tab in tabs)) != 1:
+            raise ValueError("tabuleiros_para_lote: argumentos invalidos")
+        lote = numpy.array(tabs, dtype=numpy.int8)
+    if lote.ndim != 3 or lote.shape[0] == 0 or not (lote.shape[1] >= 2 and lote.shape[2] >= 2) \
+            or not numpy.isin(lote, (-1, 0, 1)).all():
+        raise ValueError("tabuleiros_para_lote: argumentos invalidos")
+    return lote.astype(numpy.int8, copy=False)
+
+# Função auxiliar às funções de verificação em lote, obtém para a direção (drow, dcol) o array booleano das posições
+# onde começa uma sequência de k posições com o valor jog (a primeira posição da sequência) e a linha e coluna da
+# primeira dessas posições, ou None se a direção não tem sequências de k posições
+def inicios_sequencias_lote(numpy, lote, jog, k, drow, dcol):
+    lines, columns = lote.shape[1], lote.shape[2]
+    rows = lines - drow * (k - 1)
+    cols = columns - abs(dcol) * (k - 1)
+    if rows <= 0 or cols <= 0:
+        return None
+    first_col = k - 1 if dcol == -1 else 0
+    cells = (lote == jog).astype(numpy.int16 if k < 2 ** 15 else numpy.int32)
+    total = numpy.zeros((lote.shape[0], rows, cols), dtype=cells.dtype)
+    for num in range(k):
+        row = num * drow
+        col = first_col + num * dcol
+        total += cells[:, row:row + rows, col:col + cols]
+    return total == k, first_col
+
+def eh_fim_jogo_lote(tabs, k):
+    """ Verifica o fim de jogo de vários tabuleiros com as mesmas dimensões
+    
+        Args:
+            tabs (list): Tabuleiros a verificar (ver tabuleiros_para_lote)
+            k (int): Número de posições seguidas para ganhar o jogo
+            
+        Returns:
+            resultado (dict): Dicionário de arrays do numpy com um valor por tabuleiro: o vencedor ("vencedor", 0 se não
+            há), se o tabuleiro está cheio ("cheio"), se o jogo acabou empatado ("empate") e se acabou ("fim"), iguais
+            a eh_fim_jogo e ao vencedor de cria_estado_jogo
+        
+    
+    """
+    numpy = importa_numpy()
+    lote = tabuleiros_para_lote(tabs)
+    if not (type(k) == int and k > 0):
+        raise ValueError("eh_fim_jogo_lote: argumentos invalidos")
+    count, lines, columns = lote.shape
+    
+    # Marca, para cada jogador, as peças que fazem parte de uma sequência de k peças
+    first = {}
+    for jog in (1, -1):
+        in_sequence = numpy.zeros(lote.shape, dtype=bool)
+        for drow, dcol in DIRECOES_LOTE:
+            result = inicios_sequencias_lote(numpy, lote, jog, k, drow, dcol)
+            if result is not None:
+                starts, first_col = result
+                rows, cols = starts.shape[1], starts.shape[2]
+                for num in range(k):
+                    row = num * drow
+                    col = first_col + num * dcol
+                    in_sequence[:, row:row + rows, col:col + cols] |= starts
+        flat = in_sequence.reshape(count, lines * columns)
+        first[jog] = numpy.where(flat.any(axis=1), flat.argmax(axis=1), lines * columns)
+    
+    # Tal como cria_estado_jogo, o vencedor é o dono da primeira peça (por ordem das posições) numa sequência
+    winner = numpy.where(first[1] < first[-1], 1, numpy.where(first[-1] < first[1], -1, 0)).astype(numpy.int8)
+    full = ~(lote == 0).reshape(count, lines * columns).any(axis=1)
+    return {"vencedor": winner, "cheio": full, "empate": full & (winner == 0), "fim": full | (winner != 0)}
+
+def verifica_k_linhas_lote(tabs, pos, jog, k):
+    """ Verifica as k linhas de uma posição em vários tabuleiros com as mesmas dimensões
+    
+        Args:
+            tabs (list): Tabuleiros a verificar (ver tabuleiros_para_lote)
+            pos (int): Posição a verificar, a mesma em todos os tabuleiros, ou sequência com uma posição por tabuleiro
+            jog (int): Jogador a verificar, o mesmo em todos os tabuleiros, ou sequência com um jogador por tabuleiro
+            k (int): Número de peças seguidas para ganhar
+            
+        Returns:
+            resultado (numpy.ndarray): Array booleano com o resultado de verifica_k_linhas em cada tabuleiro
+        
+    
+    """
+    numpy = importa_numpy()
+    lote = tabuleiros_para_lote(tabs)
+    count, lines, columns = lote.shape
+    positions = numpy.broadcast_to(numpy.asarray(pos), (count,))
+    players = numpy.broadcast_to(numpy.asarray(jog), (count,))
+    if not (type(k) == int and k > 0) or positions.dtype.kind not in "iu" or players.dtype.kind not in "iu" \
+            or not ((positions >= 1) & (positions <= lines * columns)).all():
+        raise ValueError("verifica_k_linhas_lote: argumentos invalidos")
+    
+    boards = numpy.arange(count)
+    rows = (positions - 1) // columns
+    cols = (positions - 1) % columns
+    result = lote[boards, rows, cols] == players
+    found = numpy.zeros(count, dtype=bool)
+    # A linha, coluna, diagonal ou antidiagonal de cada posição é identificada por um número, para cada direção
+    line_ids = ((lambda row, col: row, lines), (lambda row, col: col, columns),
+                (lambda row, col: row - col + columns - 1, lines + columns - 1),
+                (lambda row, col: row + col, lines + columns - 1))
+    for value in numpy.unique(players):
+        selected = players == value
+        for (drow, dcol), (line_id, size) in zip(DIRECOES_LOTE, line_ids):
+            sequences = inicios_sequencias_lote(numpy, lote[selected], int(value), k, drow, dcol)
+            if sequences is not None:
+                starts, first_col = sequences
+                board, row, col = numpy.nonzero(starts)
+                has_sequence = numpy.zeros((int(selected.sum()), size), dtype=bool)
+                has_sequence[board, line_id(row, col + first_col)] = True
+                found[selected] |= has_sequence[numpy.arange(int(selected.sum())),
+                                                line_id(rows[selected], cols[selected])]
+    return result & found
+
+# Tabuleiro mutável: as posições são guardadas num array de bytes indexado pela posição (o índice 0 não é usado),
+# juntamente com as máscaras de bits de cada jogador, e as jogadas são feitas e desfeitas no próprio tabuleiro.
+# Deste modo a procura do computador pode explorar muitas posições sem criar um tabuleiro novo por jogada.
+
+def cria_tabuleiro_mutavel(tab):
+    """ Cria um tabuleiro mutável a partir de um tabuleiro em formato de tuplo
+    
+        Args:
+            tab (tuplo): Tabuleiro inicial
+            
+        Returns:
+            tm (dict): Tabuleiro mutável com as dimensões, as posições, as máscaras de bits e o histórico de jogadas
+        
+    
+    """
+    if eh_tabuleiro(tab):
+        cells = array.array("b", [0])
+        for row in tab:
+            cells.extend(row)
+        bb = obtem_bitboard(tab)
+        return {"linhas": len(tab), "colunas": len(tab[0]), "celulas": cells, "bits_x": bb[2], "bits_o": bb[3],
+                "historico": []}
+    raise ValueError("cria_tabuleiro_mutavel: argumentos invalidos")
+
+def copia_tabuleiro_mutavel(tm):
+    """ Obtem uma cópia independente de um tabuleiro mutável
+    
+        Args:
+            tm (dict): Tabuleiro mutável a copiar
+            
+        Returns:
+            copia (dict): Novo tabuleiro mutável igual ao recebido
+        
+    
+    """
+    copy = dict(tm)
+    copy["celulas"] = array.array("b", tm["celulas"])
+    copy["historico"] = list(tm["historico"])
+    return copy
+
+def tabuleiro_mutavel_dimensao(tm):
+    """ Obtem as dimensões de um tabuleiro mutável
+    
+        Args:
+            tm (dict): Tabuleiro mutável
+            
+        Returns:
+            dimensions (tuple): Tuplo com o número de linhas e de colunas
+        
+    
+    """
+    return (tm["linhas"], tm["colunas"])
+
+def tabuleiro_mutavel_valor(tm, pos):
+    """ Obtem o valor contido numa posição de um tabuleiro mutável
+    
+        Args:
+            tm (dict): Tabuleiro mutável
+            pos (int): Posição escolhida
+            
+        Returns:
+            value (int): 1, -1 ou 0 consoante a posição pertença a um dos jogadores ou esteja livre
+        
+    
+    """
+    return tm["celulas"][pos]
+
+def tabuleiro_mutavel_joga(tm, pos, jog):
+    """ Marca uma posição livre no próprio tabuleiro mutável
+    
+        Args:
+            tm (dict): Tabuleiro mutável a alterar
+            pos (int): Posição para marcar
+            jog (int): Jogador a marcar
+            
+        Returns:
+            tm (dict): O próprio tabuleiro recebido, alterado
+        
+    
+    """
+    columns = tm["colunas"]
+    if type(pos) == int and 1 <= pos < len(tm["celulas"]) and tm["celulas"][pos] == 0 and jog in [-1, 1]:
+        tm["celulas"][pos] = jog
+        bit = 1 << ((pos - 1) // columns * (columns + 1) + (pos - 1) % columns)
+        if jog == 1:
+            tm["bits_x"] |= bit
+        else:
+            tm["bits_o"] |= bit
+        tm["historico"].append(pos)
+        return tm
+    raise ValueError("tabuleiro_mutavel_joga: argumentos invalidos")
+
+def tabuleiro_mutavel_desfaz(tm):
+    """ Desfaz a última jogada feita num tabuleiro mutável
+    
+        Args:
+            tm (dict): Tabuleiro mutável a alterar
+            
+        Returns:
+            pos (int): Posição que voltou a ficar livre
+        
+    
+    """
+    if tm["historico"] == []:
+        raise ValueError("tabuleiro_mutavel_desfaz: argumentos invalidos")
+    columns = tm["colunas"]
+    pos = tm["historico"].pop()
+    bit = 1 << ((pos - 1) // columns * (columns + 1) + (pos - 1) % columns)
+    if tm["celulas"][pos] == 1:
+        tm["bits_x"] ^= bit
+    else:
+        tm["bits_o"] ^= bit
+    tm["celulas"][pos] = 0
+    return pos
+
+def tabuleiro_mutavel_posicoes_livres(tm):
+    """ Obtem tuplo com todas as posições livres de um tabuleiro mutável
+    
+        Args:
+            tm (dict): Tabuleiro mutável
+            
+        Returns:
+            posicoes_livres (tuplo): Tuplo com todas as posições livres, por ordem crescente
+        
+    
+    """
+    return tabuleiro_mutavel_posicoes_jogador(tm, 0)
+
+def tabuleiro_mutavel_posicoes_jogador(tm, jog):
+    """ Obtem tuplo com todas as posições com o valor jog num tabuleiro mutável
+    
+        Args:
+            tm (dict): Tabuleiro mutável
+            jog (int): Jogador a verificar posições (0 para as posições livres)
+            
+        Returns:
+            jog_positions (tuplo): Tuplo com as posições, por ordem crescente
+        
+    
+    """
+    cells = tm["celulas"]
+    return tuple(pos for pos in range(1, len(cells)) if cells[pos] == jog)
+
+def tabuleiro_mutavel_para_tuplo(tm):
+    """ Converte um tabuleiro mutável para um tabuleiro em formato de tuplo
+    
+        Args:
+            tm (dict): Tabuleiro mutável
+            
+        Returns:
+            tab (tuplo): Tabuleiro em formato de tuplo, já registado como confiável
+        
+    
+    """
+    columns = tm["colunas"]
+    cells = tm["celulas"]
+    tab = tuple(tuple(cells[start:start + columns]) for start in range(1, len(cells), columns))
+    regista_tabuleiro_confiavel(tab)
+    return tab
+
+def tabuleiro_mutavel_bitboard(tm):
+    """ Obtem o bitboard correspondente a um tabuleiro mutável
+    
+        Args:
+            tm (dict): Tabuleiro mutável
+            
+        Returns:
+            bitboard (tuplo): Tuplo (linhas, colunas, bits_x, bits_o), como em tabuleiro_para_bitboard
+        
+    
+    """
+    return (tm["linhas"], tm["colunas"], tm["bits_x"], tm["bits_o"])
+
+# Conjuntos de posições: as posições livres e as de cada jogador de um estado de jogo são guardadas num array de
+# bytes indexado pela posição (1 se a posição pertence ao conjunto), juntamente com o número de posições. Pertencer,
+# acrescentar e retirar são operações de tempo constante, e as posições são percorridas por ordem crescente.
+
+def cria_conjunto_posicoes(size, posicoes=()):
+    """ Cria um conjunto de posições de um tabuleiro
+    
+        Args:
+            size (int): Número de posições do tabuleiro
+            posicoes (tuplo): Posições iniciais do conjunto
+            
+        Returns:
+            conjunto (dict): Conjunto com o array de pertença ("membros") e o número de posições ("tamanho")
+        
+    
+    """
+    members = bytearray(size + 1)
+    for pos in posicoes:
+        members[pos] = 1
+    return {"membros": members, "tamanho": members.count(1)}
+
+def copia_conjunto_posicoes(conjunto):
+    """ Obtem uma cópia independente de um conjunto de posições
+    
+        Args:
+            conjunto (dict): Conjunto a copiar
+            
+        Returns:
+            copia (dict): Novo conjunto igual ao recebido
+        
+    
+    """
+    return {"membros": bytearray(conjunto["membros"]), "tamanho": conjunto["tamanho"]}
+
+def conjunto_acrescenta(conjunto, pos):
+    """ Acrescenta uma posição a um conjunto de posições
+    
+        Args:
+            conjunto (dict): Conjunto a alterar
+            pos (int): Posição a acrescentar
+            
+        Returns:
+            None
+        
+    
+    """
+    if not conjunto["membros"][pos]:
+        conjunto["membros"][pos] = 1
+        conjunto["tamanho"] += 1
+
+def conjunto_retira(conjunto, pos):
+    """ Retira uma posição de um conjunto de posições
+    
+        Args:
+            conjunto (dict): Conjunto a alterar
+            pos (int): Posição a retirar
+            
+        Returns:
+            None
+        
+    
+    """
+    if conjunto["membros"][pos]:
+        conjunto["membros"][pos] = 0
+        conjunto["tamanho"] -= 1
+
+def conjunto_contem(conjunto, pos):
+    """ Verifica se uma posição pertence a um conjunto de posições
+    
+        Args:
+            conjunto (dict): Conjunto de posições
+            pos (int): Posição a verificar
+            
+        Returns:
+            Booleano (boolean): True se a posição pertence ao conjunto, False caso contrário
+        
+    
+    """
+    return 0 < pos < len(conjunto["membros"]) and conjunto["membros"][pos] == 1
+
+def conjunto_tamanho(conjunto):
+    """ Obtem o número de posições de um conjunto de posições
+    
+        Args:
+            conjunto (dict): Conjunto de posições
+            
+        Returns:
+            tamanho (int): Número de posições do conjunto
+        
+    
+    """
+    return conjunto["tamanho"]
+
+def conjunto_posicoes(conjunto):
+    """ Obtem as posições de um conjunto de posições, por ordem crescente
+    
+        Args:
+            conjunto (dict): Conjunto de posições
+            
+        Returns:
+            posicoes (tuplo): Posições do conjunto por ordem crescente
+        
+    
+    """
+    members = conjunto["membros"]
+    return tuple(itertools.compress(range(len(members)), members))
+
+# Estado de jogo: guarda o tabuleiro mutável, a última jogada, o número de posições livres e o vencedor,
+# de modo que o fim de jogo seja decidido verificando apenas as linhas que passam pela última peça colocada.
+# As jogadas podem ser desfeitas, repondo o estado anterior.
+
+def tabuleiro_mutavel_sequencias(tm, pos, jog, k):
+    """ Versão da função obtem_sequencias para tabuleiros mutáveis
+    
+        Args:
+            tm (dict): Tabuleiro mutável
+            pos (int): Posição, que conta como peça de jog
+            jog (int): Jogador
+            k (int): Número de peças seguidas para ganhar, que limita as posições lidas
+            
+        Returns:
+            sequencias (tuplo): O mesmo resultado que obtem_sequencias para o tabuleiro correspondente
+        
+    
+    """
+    return sequencias_celulas(tm["celulas"], tm["linhas"], tm["colunas"], pos, jog, k)
+
+# Função auxiliar às funções do estado de jogo, verifica se a peça em pos faz parte de uma sequência
+# de k peças do jogador jog, olhando apenas para as k - 1 posições de cada lado em cada direção
+def verifica_sequencia_posicao(tm, pos, jog, k):
+    for sequence in sequencias_celulas(tm["celulas"], tm["linhas"], tm["colunas"], pos, jog, k):
+        if sequence[0] >= k:
+            return True
+    return False
+
+@functools.lru_cache(maxsize=8)
+def obtem_zobrist(lines, columns):
+    """ Obtem as tabelas de Zobrist de um tabuleiro com as dimensões recebidas
+    
+        Args:
+            lines (int): Número de linhas do tabuleiro
+            columns (int): Número de colunas do tabuleiro
+            
+        Returns:
+            zobrist (dict): Dicionário em que 1 e -1 são tuplos indexados pela posição com um inteiro aleatório de 64 bits
+            por posição e jogador, e "lado" é o inteiro usado para distinguir o jogador a jogar
+        
+    
+    """
+    # A semente depende só das dimensões, para que as chaves sejam iguais em todos os processos e execuções
+    generator = random.Random("zobrist-%dx%d" % (lines, columns))
+    size = lines * columns
+    return {1: (0,) + tuple(generator.getrandbits(64) for pos in range(size)),
+            -1: (0,) + tuple(generator.getrandbits(64) for pos in range(size)),
+            "lado": generator.getrandbits(64)}
+
+def cria_estado_jogo(tab, k, motor="tuplo", avaliacao=False, fronteira=True):
+    """ Cria um estado de jogo a partir de um tabuleiro
+    
+        Args:
+            tab (tuplo): Tabuleiro inicial
+            k (int): Número de posições seguidas para ganhar o jogo
+            motor (string): "tuplo" ou "bitboard", implementação usada para procurar um vencedor no tabuleiro inicial
+            (as jogadas seguintes são sempre verificadas a partir da última peça, com qualquer motor)
+            avaliacao (boolean): True para manter as contagens de peças em cada janela de k posições, usadas pelo
+            nível "dificil" (o nível "normal" só as cria quando precisa delas)
+            fronteira (boolean): True para manter as posições livres adjacentes às peças (ver estado_fronteira)
+            
+        Returns:
+            estado (dict): Estado de jogo com o tabuleiro mutável, k, a última jogada, o número de posições livres,
+            o vencedor e o histórico necessário para desfazer jogadas
+        
+    
+    """
+    if eh_tabuleiro(tab) and type(k) == int and k > 0 and motor in MOTORES:
+        tm = cria_tabuleiro_mutavel(tab)
+        free = tm["celulas"].count(0) - 1
+        
+        # O tabuleiro inicial é verificado por inteiro uma única vez, as jogadas seguintes só verificam a última peça.
+        # Se os dois jogadores tiverem k peças seguidas, ganha o dono da primeira posição numa sequência, com os dois
+        # motores
+        winner = 0
+        if motor == "bitboard":
+            bb = tabuleiro_mutavel_bitboard(tm)
+            first = None
+            for jog, bits in ((1, bb[2]), (-1, bb[3])):
+                cover = 0
+                for sequence in bitboard_sequencias(bits, bb[1], k):
+                    cover |= sequence
+                # Os bits estão pela mesma ordem que as posições, o bit mais baixo é a primeira posição
+                if cover and (first is None or (cover & -cover) < first):
+                    first = cover & -cover
+                    winner = jog
+        else:
+            for pos in range(1, len(tm["celulas"])):
+                value = tm["celulas"][pos]
+                if winner == 0 and value != 0 and verifica_sequencia_posicao(tm, pos, value, k):
+                    winner = value
+        
+        # A chave de Zobrist do tabuleiro é calculada uma vez e depois atualizada a cada jogada
+        zobrist = obtem_zobrist(tm["linhas"], tm["colunas"])
+        key = 0
+        for pos in range(1, len(tm["celulas"])):
+            if tm["celulas"][pos] != 0:
+                key ^= zobrist[tm["celulas"][pos]][pos]
+        
+        # As posições livres e as de cada jogador são mantidas em conjuntos, atualizados a cada jogada
+        cells = tm["celulas"]
+        size = len(cells) - 1
+        sets = {}
+        for value in (0, 1, -1):
+            sets[value] = cria_conjunto_posicoes(size, (pos for pos in range(1, size + 1) if cells[pos] == value))
+        
+        estado = {"tabuleiro": tm, "tab": tab, "k": k, "ultima": None, "livres": free, "vencedor": winner,
+                  "historico": [], "zobrist": zobrist, "chave": key, "contagens": None, "niveis": None,
+                  "conjuntos": sets, "fronteira": None}
+        if avaliacao:
+            inicia_janelas(estado)
+        if fronteira:
+            inicia_fronteira(estado)
+        return estado
+    raise ValueError("cria_estado_jogo: argumentos invalidos")
+
+def copia_estado(estado):
+    """ Obtem uma cópia independente de um estado de jogo
+    
+        Args:
+            estado (dict): Estado de jogo a copiar
+            
+        Returns:
+            copia (dict): Novo estado de jogo igual ao recebido
+        
+    
+    """
+    copy = dict(estado)
+    copy["tabuleiro"] = copia_tabuleiro_mutavel(estado["tabuleiro"])
+    copy["historico"] = list(estado["historico"])
+    copy["conjuntos"] = {value: copia_conjunto_posicoes(estado["conjuntos"][value]) for value in (0, 1, -1)}
+    if estado["contagens"] is not None:
+        copy["contagens"] = {1: list(estado["contagens"][1]), -1: list(estado["contagens"][-1])}
+        copy["niveis"] = {1: [set(level) for level in estado["niveis"][1]],
+                          -1: [set(level) for level in estado["niveis"][-1]]}
+    if estado["fronteira"] is not None:
+        copy["fronteira"] = {"vizinhas": {1: bytearray(estado["fronteira"]["vizinhas"][1]),
+                                          -1: bytearray(estado["fronteira"]["vizinhas"][-1])},
+                             0: set(estado["fronteira"][0]), 1: set(estado["fronteira"][1]),
+                             -1: set(estado["fronteira"][-1])}
+    return copy
+
+def estado_marca_posicao(estado, pos, jog):
+    """ Marca a posição no estado de jogo e atualiza o vencedor a partir das linhas que passam por ela
+    
+        Args:
+            estado (dict): Estado de jogo a alterar
+            pos (int): Posição para marcar
+            jog (int): Jogador a marcar
+            
+        Returns:
+            estado (dict): O próprio estado recebido, alterado
+        
+    
+    """
+    tabuleiro_mutavel_joga(estado["tabuleiro"], pos, jog)
+    estado["historico"].append((estado["ultima"], estado["vencedor"]))
+    estado["tab"] = None
+    estado["ultima"] = pos
+    estado["livres"] -= 1
+    estado["chave"] ^= estado["zobrist"][jog][pos]
+    conjunto_retira(estado["conjuntos"][0], pos)
+    conjunto_acrescenta(estado["conjuntos"][jog], pos)
+    if estado["contagens"] is not None:
+        atualiza_janelas(estado, pos, jog, 1)
+    if estado["fronteira"] is not None:
+        atualiza_fronteira(estado, pos, jog, 1)
+    if estado["vencedor"] == 0 and verifica_sequencia_posicao(estado["tabuleiro"], pos, jog, estado["k"]):
+        estado["vencedor"] = jog
+    return estado
+
+def estado_desfaz_jogada(estado):
+    """ Desfaz a última jogada marcada no estado de jogo, repondo a última jogada e o vencedor anteriores
+    
+        Args:
+            estado (dict): Estado de jogo a alterar
+            
+        Returns:
+            pos (int): Posição que voltou a ficar livre
+        
+    
+    """
+    if estado["historico"] == []:
+        raise ValueError("estado_desfaz_jogada: argumentos invalidos")
+    jog = tabuleiro_mutavel_valor(estado["tabuleiro"], estado["tabuleiro"]["historico"][-1])
+    pos = tabuleiro_mutavel_desfaz(estado["tabuleiro"])
+    estado["ultima"], estado["vencedor"] = estado["historico"].pop()
+    estado["chave"] ^= estado["zobrist"][jog][pos]
+    conjunto_retira(estado["conjuntos"][jog], pos)
+    conjunto_acrescenta(estado["conjuntos"][0], pos)
+    if estado["contagens"] is not None:
+        atualiza_janelas(estado, pos, jog, -1)
+    if estado["fronteira"] is not None:
+        atualiza_fronteira(estado, pos, jog, -1)
+    estado["tab"] = None
+    estado["livres"] += 1
+    return pos
+
+# Contagens por janela: para cada janela de k posições guarda-se quantas peças de cada jogador tem, e para cada
+# jogador e cada número de peças c o conjunto das janelas com c peças desse jogador e nenhuma do adversário.
+# Encontrar uma ameaça (uma janela a que falta uma peça, ou duas, ...) é assim uma consulta a um conjunto.
+
+# Função auxiliar à função cria_estado_jogo, conta as peças de cada janela do tabuleiro inicial
+def inicia_janelas(estado):
+    tm = estado_tabuleiro_mutavel(estado)
+    cells = tm["celulas"]
+    k = estado["k"]
+    windows = obtem_janelas(tm["linhas"], tm["colunas"], k)["janelas"]
+    counts = {1: [0] * len(windows), -1: [0] * len(windows)}
+    levels = {1: [set() for c in range(k + 1)], -1: [set() for c in range(k + 1)]}
+    for index in range(len(windows)):
+        for pos in windows[index]:
+            if cells[pos] != 0:
+                counts[cells[pos]][index] += 1
+        for jog in (1, -1):
+            if counts[-jog][index] == 0:
+                levels[jog][counts[jog][index]].add(index)
+    estado["contagens"] = counts
+    estado["niveis"] = levels
+
+# Função auxiliar às funções estado_marca_posicao e estado_desfaz_jogada, atualiza as contagens das janelas que
+# contêm pos quando uma peça de jog é colocada (delta 1) ou retirada (delta -1)
+def atualiza_janelas(estado, pos, jog, delta):
+    tm = estado_tabuleiro_mutavel(estado)
+    mine = estado["contagens"][jog]
+    theirs = estado["contagens"][-jog]
+    my_levels = estado["niveis"][jog]
+    their_levels = estado["niveis"][-jog]
+    for index in obtem_janelas(tm["linhas"], tm["colunas"], estado["k"])["por_posicao"][pos]:
+        before = mine[index]
+        mine[index] = before + delta
+        if theirs[index] == 0:
+            my_levels[before].discard(index)
+            my_levels[before + delta].add(index)
+        # A janela deixa de estar (ou volta a estar) disponível para o adversário
+        if before == 0:
+            their_levels[theirs[index]].discard(index)
+        elif before + delta == 0:
+            their_levels[theirs[index]].add(index)
+
+# Fronteira: as posições livres adjacentes a pelo menos uma peça de cada jogador, e a pelo menos uma peça de qualquer
+# jogador, são as jogadas que interessam aos níveis do computador. Para cada posição guarda-se quantas peças de cada
+# jogador lhe são adjacentes, e a fronteira é atualizada olhando apenas para as vizinhas da posição jogada.
+
+# Função auxiliar à função cria_estado_jogo, calcula a fronteira do tabuleiro inicial
+def inicia_fronteira(estado):
+    tm = estado["tabuleiro"]
+    cells = tm["celulas"]
+    estado["fronteira"] = {"vizinhas": {1: bytearray(len(cells)), -1: bytearray(len(cells))},
+                           0: set(), 1: set(), -1: set()}
+    for pos in range(1, len(cells)):
+        if cells[pos] != 0:
+            atualiza_fronteira(estado, pos, cells[pos], 1)
+
+# Função auxiliar às funções estado_marca_posicao e estado_desfaz_jogada, atualiza a fronteira quando uma peça de jog
+# é colocada (delta 1) ou retirada (delta -1) em pos
+def atualiza_fronteira(estado, pos, jog, delta):
+    tm = estado["tabuleiro"]
+    cells = tm["celulas"]
+    frontier = estado["fronteira"]
+    neighbours = frontier["vizinhas"]
+    own = neighbours[jog]
+    for num in obtem_geometria(tm["linhas"], tm["colunas"])["adjacentes"][pos]:
+        own[num] += delta
+        if cells[num] == 0:
+            if delta == 1:
+                frontier[jog].add(num)
+                frontier[0].add(num)
+            elif own[num] == 0:
+                frontier[jog].discard(num)
+                if neighbours[-jog][num] == 0:
+                    frontier[0].discard(num)
+    if delta == 1:
+        for value in (0, 1, -1):
+            frontier[value].discard(pos)
+    else:
+        for value in (1, -1):
+            if neighbours[value][pos]:
+                frontier[value].add(pos)
+                frontier[0].add(pos)
+
+def estado_fronteira(estado, jog):
+    """ Obtem as posições livres adjacentes às peças de um jogador, ou às peças de qualquer jogador
+    
+        Args:
+            estado (dict): Estado de jogo criado com fronteira=True
+            jog (int): Jogador (0 para as peças de qualquer jogador)
+            
+        Returns:
+            fronteira (set): Conjunto das posições, mantido pelo estado (não deve ser alterado)
+        
+    
+    """
+    return estado["fronteira"][jog]
+
+def estado_janelas_nivel(estado, jog, c):
+    """ Obtem as janelas de k posições com exatamente c peças do jogador e nenhuma do adversário
+    
+        Args:
+            estado (dict): Estado de jogo criado com avaliacao=True
+            jog (int): Jogador
+            c (int): Número de peças do jogador na janela
+            
+        Returns:
+            janelas (set): Conjunto dos índices das janelas (ver obtem_janelas), que não deve ser alterado
+        
+    
+    """
+    return estado["niveis"][jog][c]
+
+def estado_posicoes_nivel(estado, jog, c):
+    """ Obtem as posições livres que dão ao jogador c + 1 peças numa janela de k posições sem peças do adversário
+    
+        Args:
+            estado (dict): Estado de jogo criado com avaliacao=True
+            jog (int): Jogador
+            c (int): Número de peças do jogador na janela antes da jogada
+            
+        Returns:
+            posicoes (set): Conjunto das posições livres nessas janelas
+        
+    
+    """
+    tm = estado_tabuleiro_mutavel(estado)
+    cells = tm["celulas"]
+    windows = obtem_janelas(tm["linhas"], tm["colunas"], estado["k"])["janelas"]
+    positions = set()
+    for index in estado["niveis"][jog][c]:
+        for pos in windows[index]:
+            if cells[pos] == 0:
+                positions.add(pos)
+    return positions
+
+def estado_tabuleiro(estado):
+    """ Obtem o tabuleiro atual de um estado de jogo
+    
+        Args:
+            estado (dict): Estado de jogo
+            
+        Returns:
+            tab (tuplo): Tabuleiro atual em formato de tuplo, guardado até à jogada seguinte
+        
+    
+    """
+    if estado["tab"] is None:
+        estado["tab"] = tabuleiro_mutavel_para_tuplo(estado["tabuleiro"])
+    return estado["tab"]
+
+def estado_tabuleiro_mutavel(estado):
+    """ Obtem o tabuleiro mutável de um estado de jogo
+    
+        Args:
+            estado (dict): Estado de jogo
+            
+        Returns:
+            tm (dict): Tabuleiro mutável usado pelo estado, que não deve ser alterado fora das funções do estado
+        
+    
+    """
+    return estado["tabuleiro"]
+
+def estado_ultima_jogada(estado):
+    """ Obtem a última posição marcada num estado de jogo
+    
+        Args:
+            estado (dict): Estado de jogo
+            
+        Returns:
+            pos (int): Última posição marcada, ou None se ainda não foi marcada nenhuma
+        
+    
+    """
+    return estado["ultima"]
+
+def estado_numero_livres(estado):
+    """ Obtem o número de posições livres de um estado de jogo
+    
+        Args:
+            estado (dict): Estado de jogo
+            
+        Returns:
+            livres (int): Número de posições livres
+        
+    
+    """
+    return estado["livres"]
+
+def estado_conjunto(estado, jog):
+    """ Obtem o conjunto das posições livres ou das posições de um jogador de um estado de jogo
+    
+        Args:
+            estado (dict): Estado de jogo
+            jog (int): Jogador (0 para as posições livres)
+            
+        Returns:
+            conjunto (dict): Conjunto de posições, mantido pelo estado (ver cria_conjunto_posicoes)
+        
+    
+    """
+    return estado["conjuntos"][jog]
+
+def estado_vencedor(estado):
+    """ Obtem o vencedor de um estado de jogo
+    
+        Args:
+            estado (dict): Estado de jogo
+            
+        Returns:
+            vencedor (int): 1 ou -1 se um dos jogadores tem k peças seguidas, 0 caso contrário
+        
+    
+    """
+    return estado["vencedor"]
+
+def estado_chave(estado):
+    """ Obtem a chave de Zobrist do tabuleiro de um estado de jogo
+    
+        Args:
+            estado (dict): Estado de jogo
+            
+        Returns:
+            chave (int): Inteiro de 64 bits que identifica as posições marcadas no tabuleiro
+        
+    
+    """
+    return estado["chave"]
+
+def estado_eh_fim_jogo(estado):
+    """ Verifica se um estado de jogo chegou ao fim
+    
+        Args:
+            estado (dict): Estado de jogo
+            
+        Returns:
+            Booleano (boolean): True se há um vencedor ou não há posições livres, False caso contrário
+        
+    
+    """
+    return estado["vencedor"] != 0 or estado["livres"] == 0
+
+def escolhe_posicao_manual(tab):
+    """ Retorna posição escolhida pelo jogador
+    
+        Args:
+            tab (tuplo): Tabuleiro para marcar a posicao
+            
+        Returns:
+            pos(int): posição escolhida pelo jogador
+        
+    
+    """
+    #SE DER ERRO EH PRA DAR ERRO OU REPETIR QUANDO EH LETRA E NUMERO
+    if eh_tabuleiro(tab):
+        chosen_position = input("Turno do jogador. Escolha uma posicao livre: ")
+        if chosen_position.isdigit():
+            pos = int(chosen_position)
+            if eh_posicao(pos):
+                if eh_posicao_valida(tab, pos):
+                    if obtem_valor(tab, pos) == 0:
+                        return pos
+            else:
+                raise ValueError("escolhe_posicao_manual: argumento invalido")
+        else:
+            raise ValueError("escolhe_posicao_manual: argumento invalido")
+        pos = escolhe_posicao_manual(tab)
+        return pos
+    
+    raise ValueError("escolhe_posicao_manual: argumento invalido")
+
+
+        
+
+def escolhe_posicao_facil(estado, jog):
+    """ Escolhe a posição do nível "facil": a posição livre mais próxima do centro adjacente a uma peça do jogador
+    
+        Args:
+            estado (dict): Estado de jogo
+            jog (int): Jogador do computador
+            
+        Returns:
+            pos (int): Posição escolhida
+        
+    
+    """
+    tm = estado_tabuleiro_mutavel(estado)
+    cells = tm["celulas"]
+    lines, columns = tabuleiro_mutavel_dimensao(tm)
+    
+    # As candidatas são as posições da fronteira do jogador, a escolhida é a mais próxima do centro
+    if conjunto_tamanho(estado_conjunto(estado, jog)) > 0:
+        if estado_fronteira(estado, jog):
+            return min(estado_fronteira(estado, jog), key=obtem_ordem_centro(lines, columns)["posto"].__getitem__)
+    else:
+        for pos in obtem_ordem_centro(lines, columns)["ordem"]:
+            if cells[pos] == 0:
+                return pos
+
+# Função auxiliar à função escolhe_posicao_normal, obtém o comprimento da maior sequência de peças de jog em qualquer
+# uma das linhas (linha, coluna, diagonal e antidiagonal) que passam por pos, como em verifica_k_linhas. Cada linha é
+# percorrida uma única vez por jogada, os comprimentos ficam guardados em maximos
+def maior_sequencia_linhas(cells, geometry, pos, jog, maximos):
+    best = 0
+    for key in ("linha", "coluna", "diagonal", "antidiagonal"):
+        line = geometry[key][pos]
+        if (id(line), jog) not in maximos:
+            longest = 0
+            count = 0
+            for num in line:
+                if cells[num] == jog:
+                    count += 1
+                    if count > longest:
+                        longest = count
+                else:
+                    count = 0
+            maximos[(id(line), jog)] = longest
+        if maximos[(id(line), jog)] > best:
+            best = maximos[(id(line), jog)]
+    return best
+
+def escolhe_posicao_normal(estado, jog):
+    """ Escolhe a posição do nível "normal", procurando a maior sequência de cada jogador para a completar ou bloquear
+    
+        Cada peça de um jogador, por ordem das posições, dá o comprimento L da maior sequência nas suas linhas, limitado
+        pelo da peça anterior mais um. O jogador com a maior sequência (o -1 em caso de empate) é completado ou
+        bloqueado numa das linhas de uma peça sua, na primeira posição livre que faz uma sequência de L peças, com o L
+        da última peça do adversário. A procura usa apenas as linhas que passam pelas peças. Se um dos jogadores não
+        tem peças, ou nenhuma posição serve, fica a posição que dá ao computador, ou tira ao adversário, mais peças
+        numa janela de k posições; só neste caso são criadas as contagens das janelas, se o estado ainda não as tem.
+    
+        Args:
+            estado (dict): Estado de jogo
+            jog (int): Jogador do computador
+            
+        Returns:
+            pos (int): Posição escolhida
+        
+    
+    """
+    tm = estado_tabuleiro_mutavel(estado)
+    cells = tm["celulas"]
+    k = estado["k"]
+    lines, columns = tabuleiro_mutavel_dimensao(tm)
+    geometry = obtem_geometria(lines, columns)
+    maximos = {}
+    
+    # As peças de cada jogador são percorridas por ordem no conjunto de posições do estado
+    best = {}
+    for player in (jog, -jog):
+        L = k
+        for pos in conjunto_posicoes(estado_conjunto(estado, player)):
+            L = min(L, maior_sequencia_linhas(cells, geometry, pos, player, maximos)) + 1
+            best[player] = max(best.get(player, 0), L)
+    
+    if len(best) == 2:
+        best_play = -1 if best[-1] >= best[1] else jog
+        for pos in conjunto_posicoes(estado_conjunto(estado, best_play)):
+            if maior_sequencia_linhas(cells, geometry, pos, best_play, maximos) >= L - 1:
+                # Na linha da peça a sequência procurada é a do computador, nas outras direções a de best_play
+                for key, player in (("linha", jog), ("coluna", best_play), ("diagonal", best_play),
+                                    ("antidiagonal", best_play)):
+                    for num in geometry[key][pos]:
+                        if cells[num] == 0:
+                            # Depois de jogar em num, as novas sequências passam todas por num
+                            if maior_sequencia_linhas(cells, geometry, num, player, maximos) >= L:
+                                return num
+                            for sequence in sequencias_celulas(cells, lines, columns, num, player, L):
+                                if sequence[0] >= L:
+                                    return num
+    
+    if estado["contagens"] is None:
+        inicia_janelas(estado)
+    order = obtem_ordem_centro(lines, columns)
+    for L in range(k, 0, -1):
+        for player in (jog, -jog):
+            if estado_janelas_nivel(estado, player, L - 1):
+                return min(estado_posicoes_nivel(estado, player, L - 1), key=order["posto"].__getitem__)
+    
+    # Todas as janelas têm peças dos dois jogadores, fica a posição livre mais próxima do centro
+    for pos in order["ordem"]:
+        if cells[pos] == 0:
+            return pos
+
+# Motor de procura do nível "dificil": negamax com cortes alfa-beta sobre o estado de jogo, com uma tabela de
+# transposição indexada pela chave de Zobrist do estado. As pontuações de vitória dependem apenas do número de
+# peças no tabuleiro (vitórias mais rápidas valem mais), por isso a mesma tabela pode ser usada em várias jogadas.
+
+VITORIA = 10 ** 9
+EXATO = 0
+LIMITE_INFERIOR = 1
+LIMITE_SUPERIOR = 2
+
+def cria_tabela_transposicao(bits=16):
+    """ Cria uma tabela de transposição com 2 ** bits entradas
+    
+        Args:
+            bits (int): Número de bits da chave usados para escolher a entrada da tabela
+            
+        Returns:
+            tabela (dict): Tabela de transposição com tamanho fixo e contadores de consultas, acertos e escritas
+        
+    
+    """
+    if type(bits) == int and 1 <= bits <= 26:
+        return {"mascara": (1 << bits) - 1, "entradas": [None] * (1 << bits), "geracao": 0,
+                "consultas": 0, "acertos": 0, "escritas": 0}
+    raise ValueError("cria_tabela_transposicao: argumentos invalidos")
+
+# Função auxiliar à função negamax, obtém a entrada da tabela guardada para a chave, ou None
+def consulta_tabela(tabela, key):
+    tabela["consultas"] += 1
+    entry = tabela["entradas"][key & tabela["mascara"]]
+    if entry is not None and entry[0] == key:
+        tabela["acertos"] += 1
+        return entry
+    return None
+
+# Função auxiliar à função negamax, guarda uma entrada (chave, profundidade, valor, tipo, melhor jogada, geração).
+# Uma entrada de outra chave só é substituída se for de uma procura anterior ou se tiver profundidade menor ou igual
+def guarda_tabela(tabela, key, depth, value, flag, best):
+    index = key & tabela["mascara"]
+    entry = tabela["entradas"][index]
+    if entry is None or entry[0] == key or entry[5] != tabela["geracao"] or depth >= entry[1]:
+        tabela["entradas"][index] = (key, depth, value, flag, best, tabela["geracao"])
+        tabela["escritas"] += 1
+
+# Função auxiliar à função negamax, avalia o estado do ponto de vista do jogador jog somando, para cada janela de
+# k posições que só tem peças de um dos jogadores, um peso que cresce com o número de peças nessa janela
+def avalia_estado(estado, jog):
+    value = 0
+    mine = estado["niveis"][jog]
+    theirs = estado["niveis"][-jog]
+    for c in range(1, estado["k"] + 1):
+        value += (len(mine[c]) - len(theirs[c])) * 10 ** c
+    return value
+
+# Função auxiliar à função negamax, obtém as jogadas a explorar: as posições da fronteira do estado, ou todas as
+# posições livres se não há nenhuma, pela ordem de exploração do contexto e com a jogada first primeiro
+def gera_jogadas(estado, contexto, first):
+    moves = estado_fronteira(estado, 0)
+    if not moves:
+        moves = conjunto_posicoes(estado_conjunto(estado, 0))
+    ordered = sorted(moves, key=contexto["ordem"].__getitem__)
+    if first in moves:
+        ordered.remove(first)
+        ordered.insert(0, first)
+    return ordered
+
+def negamax(contexto, estado, jog, depth, alpha, beta):
+    """ Obtem o valor negamax do estado para o jogador jog, com cortes alfa-beta e tabela de transposição
+    
+        Args:
+            contexto (dict): Contexto da procura com a tabela de transposição, o índice de ordenação e os contadores
+            estado (dict): Estado de jogo, que fica igual no fim
+            jog (int): Jogador a jogar
+            depth (int): Profundidade restante
+            alpha (int): Limite inferior da janela de procura
+            beta (int): Limite superior da janela de procura
+            
+        Returns:
+            value (int): Valor do estado do ponto de vista de jog
+        
+    
+    """
+    contexto["nos"] += 1
+    if contexto["limites"] is not None and verifica_limites(contexto):
+        return 0
+    size = len(estado_tabuleiro_mutavel(estado)["celulas"]) - 1
+    
+    # O vencedor só pode ser o jogador que acabou de jogar
+    if estado_vencedor(estado) != 0:
+        return -(VITORIA - (size - estado_numero_livres(estado)))
+    if estado_numero_livres(estado) == 0:
+        return 0
+    if depth == 0:
+        return avalia_estado(estado, jog)
+    
+    key = estado_chave(estado) ^ (estado["zobrist"]["lado"] if jog == -1 else 0)
+    tabela = contexto["tabela"]
+    entry = consulta_tabela(tabela, key)
+    first = None
+    if entry is not None:
+        first = entry[4]
+        # Só são usados valores guardados à mesma profundidade, para que o resultado seja sempre o valor
+        # negamax a esta profundidade, independentemente do que já está na tabela
+        if entry[1] == depth:
+            if entry[3] == EXATO:
+                return entry[2]
+            if entry[3] == LIMITE_INFERIOR and entry[2] >= beta:
+                return entry[2]
+            if entry[3] == LIMITE_SUPERIOR and entry[2] <= alpha:
+                return entry[2]
+    
+    alpha_start = alpha
+    best = -VITORIA - 1
+    best_move = None
+    for pos in gera_jogadas(estado, contexto, first):
+        estado_marca_posicao(estado, pos, jog)
+        value = -negamax(contexto, estado, -jog, depth - 1, -beta, -alpha)
+        estado_desfaz_jogada(estado)
+        # Uma procura interrompida não guarda nada na tabela
+        if contexto["parar"]:
+            return 0
+        if value > best:
+            best = value
+            best_move = pos
+        if best > alpha:
+            alpha = best
+        if alpha >= beta:
+            break
+    
+    if best <= alpha_start:
+        flag = LIMITE_SUPERIOR
+    elif best >= beta:
+        flag = LIMITE_INFERIOR
+    else:
+        flag = EXATO
+    guarda_tabela(tabela, key, depth, best, flag, best_move)
+    return best
+
+# Função auxiliar à função negamax, verifica se a procura deve parar por ter esgotado os nós ou o tempo, ou por ter
+# sido cancelada. O tempo e o cancelamento só são consultados de 256 em 256 nós
+def verifica_limites(contexto):
+    limites = contexto["limites"]
+    if limites["nos"] is not None and limites["usados"] + contexto["nos"] > limites["nos"]:
+        contexto["parar"] = True
+    elif contexto["nos"] & 255 == 0:
+        if limites["prazo"] is not None and time.perf_counter() >= limites["prazo"]:
+            contexto["parar"] = True
+        elif limites["cancelar"] is not None and limites["cancelar"].is_set():
+            contexto["parar"] = True
+    return contexto["parar"]
+
+def procura_negamax(estado, jog, depth, tabela=None, ordem=None, limites=None):
+    """ Procura a melhor jogada de jog até à profundidade recebida
+    
+        Args:
+            estado (dict): Estado de jogo, que fica igual no fim
+            jog (int): Jogador a jogar
+            depth (int): Profundidade da procura
+            tabela (dict): Tabela de transposição a usar, ou None para criar uma nova
+            ordem (tuplo): Posições pela ordem em que devem ser exploradas, ou None para a distância ao centro
+            limites (dict): Dicionário com o prazo ("prazo", em time.perf_counter), o número máximo de nós ("nos"), os nós
+            já usados ("usados") e um objeto com is_set ("cancelar"), cada um podendo ser None, ou None para não parar
+            
+        Returns:
+            resultado (dict): Dicionário com a melhor jogada ("jogada"), o seu valor ("valor"), o número de nós ("nos")
+            e se a procura chegou ao fim sem ser interrompida ("completa")
+        
+    
+    """
+    if tabela is None:
+        tabela = cria_tabela_transposicao()
+    tabela["geracao"] += 1
+    if ordem is None:
+        rank = obtem_ordem_centro(*tabuleiro_mutavel_dimensao(estado_tabuleiro_mutavel(estado)))["posto"]
+    else:
+        rank = [0] * (len(ordem) + 1)
+        for index in range(len(ordem)):
+            rank[ordem[index]] = index
+    contexto = {"tabela": tabela, "ordem": rank, "nos": 1, "limites": limites, "parar": False}
+    
+    key = estado_chave(estado) ^ (estado["zobrist"]["lado"] if jog == -1 else 0)
+    entry = consulta_tabela(tabela, key)
+    alpha = -VITORIA - 1
+    best_move = None
+    for pos in gera_jogadas(estado, contexto, entry[4] if entry is not None else None):
+        estado_marca_posicao(estado, pos, jog)
+        value = -negamax(contexto, estado, -jog, depth - 1, -VITORIA - 1, -alpha)
+        estado_desfaz_jogada(estado)
+        if contexto["parar"]:
+            return {"jogada": best_move, "valor": alpha, "nos": contexto["nos"], "completa": False}
+        # Em caso de empate fica a primeira jogada, pela ordem de exploração
+        if value > alpha:
+            alpha = value
+            best_move = pos
+    guarda_tabela(tabela, key, depth, alpha, EXATO, best_move)
+    return {"jogada": best_move, "valor": alpha, "nos": contexto["nos"], "completa": True}
+
+def procura_iterativa(estado, jog, profundidade_maxima=None, tempo=None, nos=None, cancelar=None, tabela=None,
+                      iteracoes=None):
+    """ Procura a melhor jogada de jog com aprofundamento iterativo, até esgotar o tempo ou os nós, ou ser cancelada
+    
+        Args:
+            estado (dict): Estado de jogo, que fica igual no fim
+            jog (int): Jogador a jogar
+            profundidade_maxima (int): Profundidade máxima, ou None para procurar até ao fim do jogo
+            tempo (float): Tempo máximo em segundos, ou None
+            nos (int): Número máximo de nós, ou None
+            cancelar (threading.Event): Objeto cujo método is_set indica que a procura deve parar (por exemplo a pedido
+            de outra thread), ou None
+            tabela (dict): Tabela de transposição a usar, ou None para criar uma nova
+            iteracoes (list): Lista onde é acrescentado um dicionário por iteração completa, com a profundidade, o valor,
+            a jogada, os nós e o tempo acumulado, ou None
+            
+        Returns:
+            resultado (dict): Resultado da última iteração completa (ver procura_negamax), com a profundidade atingida
+            ("profundidade") e o total de nós de todas as iterações ("nos")
+        
+    
+    """
+    start = time.perf_counter()
+    if tabela is None:
+        tabela = cria_tabela_transposicao()
+    tab = estado_tabuleiro(estado)
+    limites = {"prazo": start + tempo if tempo is not None else None, "nos": nos, "cancelar": cancelar, "usados": 0}
+    size = len(tab) * len(tab[0])
+    maximum = estado_numero_livres(estado)
+    if profundidade_maxima is not None:
+        maximum = min(maximum, profundidade_maxima)
+    
+    best = None
+    for depth in range(1, maximum + 1):
+        # A primeira iteração é sempre completa, para que exista sempre uma jogada
+        result = procura_negamax(estado, jog, depth, tabela, None, limites if depth > 1 else None)
+        limites["usados"] += result["nos"]
+        if not result["completa"]:
+            break
+        best = result
+        best["profundidade"] = depth
+        if iteracoes is not None:
+            iteracoes.append({"profundidade": depth, "valor": result["valor"], "jogada": result["jogada"],
+                              "nos": result["nos"], "tempo": time.perf_counter() - start})
+        # Uma vitória ou derrota forçada não muda com mais profundidade
+        if abs(result["valor"]) > VITORIA - size - 1:
+            break
+        if (limites["prazo"] is not None and time.perf_counter() >= limites["prazo"]) or \
+                (cancelar is not None and cancelar.is_set()) or (nos is not None and limites["usados"] >= nos):
+            break
+    best["nos"] = limites["usados"]
+    return best
+
+# Procura negamax em paralelo: as jogadas da raiz são procuradas cada uma num processo, com a janela completa, e
+# fica a primeira jogada de maior valor pela ordem de exploração, a mesma da procura sequencial. O tabuleiro é
+# enviado aos processos com um byte por posição (ver codifica_tabuleiro). Uma vitória imediata é procurada antes
+# de enviar trabalho; sem ela nenhuma jogada vale mais do que uma vitória à terceira jogada, por isso quando a
+# primeira jogada (pela ordem) ainda em aberto tem esse valor a procura termina, cancelando as jogadas por começar e
+# interrompendo as que estão a ser procuradas, se os processos tiverem o evento de cancelamento.
+
+CANCELAR_RAIZ = None
+
+# Função auxiliar à função procura_negamax_paralela, guarda em cada processo o evento de cancelamento partilhado
+def inicia_processo_raiz(evento):
+    global CANCELAR_RAIZ
+    CANCELAR_RAIZ = evento
+
+def procura_raiz(dados):
+    """ Obtem o valor de uma jogada da raiz da procura negamax, procurada com a janela completa
+    
+        Args:
+            dados (tuplo): Tuplo (codigo, linhas, colunas, k, jog, profundidade, pos) com o tabuleiro codificado por
+            codifica_tabuleiro, as dimensões, k, o jogador a jogar na raiz, a profundidade da raiz e a jogada
+            
+        Returns:
+            resultado (tuplo): Tuplo com o valor da jogada do ponto de vista de jog e o número de nós explorados
+        
+    
+    """
+    code, lines, columns, k, jog, depth, pos = dados
+    estado = cria_estado_jogo(descodifica_tabuleiro(code, lines, columns), k, avaliacao=True)
+    limites = None
+    if CANCELAR_RAIZ is not None:
+        limites = {"prazo": None, "nos": None, "usados": 0, "cancelar": CANCELAR_RAIZ}
+    contexto = {"tabela": cria_tabela_transposicao(), "ordem": obtem_ordem_centro(lines, columns)["posto"], "nos": 0,
+                "limites": limites, "parar": False}
+    estado_marca_posicao(estado, pos, jog)
+    return -negamax(contexto, estado, -jog, depth - 1, -VITORIA - 1, VITORIA + 1), contexto["nos"]
+
+def procura_negamax_paralela(estado, jog, depth, tabela=None, processos=None, executor=None, evento=None):
+    """ Procura a melhor jogada de jog até à profundidade recebida, com as jogadas da raiz distribuídas por processos
+    
+        Args:
+            estado (dict): Estado de jogo, que fica igual no fim
+            jog (int): Jogador a jogar
+            depth (int): Profundidade da procura
+            tabela (dict): Tabela de transposição da raiz, ou None para criar uma nova
+            processos (int): Número de processos, ou None para usar todos os processadores
+            executor (concurrent.futures.Executor): Conjunto de processos já criado, ou None para criar um
+            evento (multiprocessing.Event): Evento de cancelamento dos processos do executor (ver inicia_processo_raiz),
+            ou None se só as jogadas por começar podem ser canceladas
+            
+        Returns:
+            resultado (dict): Resultado igual ao de procura_negamax, com a mesma jogada e o mesmo valor
+        
+    
+    """
+    if processos is None:
+        processos = os.cpu_count() or 1
+    if executor is None and processos > 1 and depth > 1:
+        evento = multiprocessing.Event()
+        with concurrent.futures.ProcessPoolExecutor(processos, initializer=inicia_processo_raiz,
+                                                    initargs=(evento,)) as executor:
+            return procura_negamax_paralela(estado, jog, depth, tabela, processos, executor, evento)
+    if executor is None or depth <= 1:
+        return procura_negamax(estado, jog, depth, tabela)
+    
+    if tabela is None:
+        tabela = cria_tabela_transposicao()
+    tabela["geracao"] += 1
+    tm = estado_tabuleiro_mutavel(estado)
+    lines, columns = tabuleiro_mutavel_dimensao(tm)
+    contexto = {"tabela": tabela, "ordem": obtem_ordem_centro(lines, columns)["posto"], "nos": 1, "limites": None,
+                "parar": False}
+    key = estado_chave(estado) ^ (estado["zobrist"]["lado"] if jog == -1 else 0)
+    entry = consulta_tabela(tabela, key)
+    moves = gera_jogadas(estado, contexto, entry[4] if entry is not None else None)
+    stones = lines * columns - estado_numero_livres(estado)
+    
+    # Uma vitória imediata tem o maior valor possível, por isso a primeira pela ordem é a da procura sequencial
+    for pos in moves:
+        estado_marca_posicao(estado, pos, jog)
+        winner = estado_vencedor(estado)
+        estado_desfaz_jogada(estado)
+        contexto["nos"] += 1
+        if winner == jog:
+            guarda_tabela(tabela, key, depth, VITORIA - (stones + 1), EXATO, pos)
+            return {"jogada": pos, "valor": VITORIA - (stones + 1), "nos": contexto["nos"], "completa": True}
+    
+    if evento is not None:
+        evento.clear()
+    code = codifica_tabuleiro(tm)
+    futures = [executor.submit(procura_raiz, (code, lines, columns, estado["k"], jog, depth, pos)) for pos in moves]
+    indices = {future: index for index, future in enumerate(futures)}
+    values = [None] * len(moves)
+    unbeatable = VITORIA - (stones + 3)
+    first = 0
+    remaining = set(futures)
+    while remaining:
+        done, remaining = concurrent.futures.wait(remaining, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            values[indices[future]], nodes = future.result()
+            contexto["nos"] += nodes
+        # Avança até à primeira jogada ainda sem valor, parando se alguma antes dela já não pode ser ultrapassada
+        while first < len(moves) and values[first] is not None and values[first] < unbeatable:
+            first += 1
+        if first < len(moves) and values[first] is not None:
+            for future in remaining:
+                future.cancel()
+            if evento is not None:
+                evento.set()
+            break
+    
+    # Em caso de empate fica a primeira jogada, pela ordem de exploração
+    best = 0
+    for index in range(min(first + 1, len(moves))):
+        if values[index] > values[best]:
+            best = index
+    guarda_tabela(tabela, key, depth, values[best], EXATO, moves[best])
+    return {"jogada": moves[best], "valor": values[best], "nos": contexto["nos"], "completa": True}
+
+# Profundidade da procura do nível "dificil" quando não é indicada, os tabuleiros com poucas posições livres
+# são procurados até ao fim
+PROFUNDIDADE_DIFICIL = 4
+PROCURA_COMPLETA_DIFICIL = 10
+
+NIVEIS = ("facil", "normal", "dificil", "mcts")
+
+def escolhe_posicao_dificil(estado, jog, profundidade=None, tabela=None, estatisticas=None, tempo=None, nos=None,
+                            cancelar=None, processos=None, executor=None):
+    """ Escolhe a posição do nível "dificil" com o motor de procura negamax
+    
+        Args:
+            estado (dict): Estado de jogo, que fica igual no fim
+            jog (int): Jogador do computador
+            profundidade (int): Profundidade da procura, ou None para a profundidade por omissão
+            tabela (dict): Tabela de transposição a usar, ou None para criar uma nova
+            estatisticas (dict): Dicionário onde são guardados os nós explorados, o tempo e os acertos na tabela, ou None
+            tempo (float): Tempo máximo em segundos, ou None
+            nos (int): Número máximo de nós, ou None
+            cancelar (threading.Event): Objeto cujo método is_set indica que a procura deve parar, ou None
+            processos (int): Número de processos pelos quais as jogadas da raiz são distribuídas quando não há
+            limites (ver procura_negamax_paralela), ou None para um só
+            executor (concurrent.futures.Executor): Conjunto de processos já criado para as jogadas da raiz, ou None
+            
+        Returns:
+            pos (int): Posição escolhida, da última iteração completa quando há limites de tempo, nós ou cancelamento
+        
+    
+    """
+    start = time.perf_counter()
+    if tempo is not None or nos is not None or cancelar is not None:
+        # Com limites, a procura é feita por aprofundamento iterativo (profundidade passa a ser a máxima)
+        if tabela is None:
+            tabela = cria_tabela_transposicao()
+        queries = tabela["consultas"]
+        hits = tabela["acertos"]
+        iteracoes = []
+        result = procura_iterativa(estado, jog, profundidade, tempo, nos, cancelar, tabela, iteracoes)
+        if estatisticas is not None:
+            estatisticas["nos"] = result["nos"]
+            estatisticas["profundidade"] = result["profundidade"]
+            estatisticas["valor"] = result["valor"]
+            estatisticas["iteracoes"] = iteracoes
+            estatisticas["tempo"] = time.perf_counter() - start
+            estatisticas["consultas_tabela"] = tabela["consultas"] - queries
+            estatisticas["acertos_tabela"] = tabela["acertos"] - hits
+        return result["jogada"]
+    
+    if profundidade is None:
+        profundidade = PROFUNDIDADE_DIFICIL
+        if estado_numero_livres(estado) <= PROCURA_COMPLETA_DIFICIL:
+            profundidade = estado_numero_livres(estado)
+    if tabela is None:
+        tabela = cria_tabela_transposicao()
+    queries = tabela["consultas"]
+    hits = tabela["acertos"]
+    
+    if (processos is not None and processos > 1) or executor is not None:
+        result = procura_negamax_paralela(estado, jog, profundidade, tabela, processos, executor)
+    else:
+        result = procura_negamax(estado, jog, profundidade, tabela)
+    
+    if estatisticas is not None:
+        estatisticas["nos"] = result["nos"]
+        estatisticas["profundidade"] = profundidade
+        estatisticas["valor"] = result["valor"]
+        estatisticas["tempo"] = time.perf_counter() - start
+        estatisticas["consultas_tabela"] = tabela["consultas"] - queries
+        estatisticas["acertos_tabela"] = tabela["acertos"] - hits
+    return result["jogada"]
+
+# Nível "mcts": procura em árvore de Monte Carlo (UCT). A árvore é mantida no processo principal e as simulações
+# aleatórias são feitas em lotes, distribuídos por um conjunto de processos. Cada folha escolhida para um lote recebe
+# logo a visita (perda virtual), para que as seleções seguintes do mesmo lote explorem outros ramos. A árvore pode
+# ser guardada entre jogadas num dicionário "arvore", sendo reaproveitada a sub-árvore da posição atual.
+
+SIMULACOES_MCTS = 500
+EXPLORACAO_MCTS = 1.4
+LOTE_MCTS = 4
+
+# Função auxiliar ao nível "mcts", cria um nó da árvore para a jogada pos feita pelo jogador jog
+def cria_no_mcts(pos, jog):
+    return {"jogada": pos, "jogador": jog, "visitas": 0, "vitorias": 0.0, "filhos": {}, "por_expandir": None}
+
+# Função auxiliar aos níveis "dificil" e "mcts", codifica as posições de um tabuleiro mutável com um byte por
+# posição (0 livre, 1 e 2 para os jogadores 1 e -1), para serem enviadas aos processos das procuras e das simulações
+def codifica_tabuleiro(tm):
+    return bytes(value % 3 for value in tm["celulas"][1:])
+
+# Função auxiliar aos níveis "dificil" e "mcts", obtém o tabuleiro em formato de tuplo correspondente a uma
+# codificação
+def descodifica_tabuleiro(code, lines, columns):
+    values = (0, 1, -1)
+    return tuple(tuple(values[value] for value in code[start:start + columns]) for start in range(0, lines * columns, columns))
+
+def simula_partida(dados):
+    """ Joga uma partida aleatória até ao fim, a partir de um tabuleiro codificado
+    
+        Args:
+            dados (tuplo): Tuplo (codigo, linhas, colunas, k, jog, semente) com o tabuleiro codificado por
+            codifica_tabuleiro, as dimensões, k, o jogador a jogar e a semente do gerador aleatório
+            
+        Returns:
+            vencedor (int): 1 ou -1 consoante o vencedor da partida, 0 em caso de empate
+        
+    
+    """
+    code, lines, columns, k, jog, seed = dados
+    estado = cria_estado_jogo(descodifica_tabuleiro(code, lines, columns), k, fronteira=False)
+    
+    # Baralhar as posições livres uma vez e jogá-las por ordem é o mesmo que escolher cada jogada ao acaso
+    free = list(conjunto_posicoes(estado_conjunto(estado, 0)))
+    random.Random(seed).shuffle(free)
+    for pos in free:
+        if estado_eh_fim_jogo(estado):
+            break
+        estado_marca_posicao(estado, pos, jog)
+        jog = -jog
+    return estado_vencedor(estado)
+
+# Função auxiliar ao nível "mcts", obtém as jogadas a expandir num nó: as posições livres adjacentes a alguma peça,
+# ou a posição mais próxima do centro num tabuleiro vazio, por uma ordem aleatória
+def jogadas_mcts(estado, generator):
+    tm = estado_tabuleiro_mutavel(estado)
+    lines, columns = tabuleiro_mutavel_dimensao(tm)
+    moves = list(estado_fronteira(estado, 0))
+    if moves == []:
+        free = estado_conjunto(estado, 0)
+        moves = [next(pos for pos in obtem_ordem_centro(lines, columns)["ordem"] if conjunto_contem(free, pos))]
+    moves.sort()
+    generator.shuffle(moves)
+    return moves
+
+# Função auxiliar ao nível "mcts", desce na árvore escolhendo em cada nó o filho com maior valor UCT, até um nó com
+# jogadas por expandir ou terminal, e expande uma jogada. As jogadas são marcadas no estado e a visita é logo contada
+def seleciona_mcts(raiz, estado, generator):
+    path = [raiz]
+    node = raiz
+    node["visitas"] += 1
+    while not estado_eh_fim_jogo(estado):
+        if node["por_expandir"] is None:
+            node["por_expandir"] = jogadas_mcts(estado, generator)
+        if node["por_expandir"] != []:
+            pos = node["por_expandir"].pop()
+            child = cria_no_mcts(pos, -node["jogador"])
+            node["filhos"][pos] = child
+            estado_marca_posicao(estado, pos, child["jogador"])
+            child["visitas"] += 1
+            path.append(child)
+            return path
+        
+        log_visits = math.log(node["visitas"])
+        best = None
+        best_value = None
+        for child in node["filhos"].values():
+            value = child["vitorias"] / child["visitas"] + EXPLORACAO_MCTS * math.sqrt(log_visits / child["visitas"])
+            if best is None or value > best_value:
+                best = child
+                best_value = value
+        node = best
+        estado_marca_posicao(estado, node["jogada"], node["jogador"])
+        node["visitas"] += 1
+        path.append(node)
+    return path
+
+# Função auxiliar ao nível "mcts", soma o resultado de uma simulação aos nós do caminho (as visitas já foram contadas)
+def propaga_mcts(path, winner):
+    for node in path:
+        if winner == node["jogador"]:
+            node["vitorias"] += 1
+        elif winner == 0:
+            node["vitorias"] += 0.5
+
+# Função auxiliar ao nível "mcts", obtém o nó da árvore guardada que corresponde ao tabuleiro atual, seguindo
+# as jogadas feitas desde a raiz guardada, ou None se o tabuleiro não descende dela
+def reaproveita_arvore_mcts(arvore, tab, k, jog):
+    if arvore.get("raiz") is None or arvore.get("k") != k:
+        return None
+    old = arvore["tab"]
+    if len(old) != len(tab) or len(old[0]) != len(tab[0]):
+        return None
+    columns = len(tab[0])
+    new_stones = {}
+    for pos in range(1, len(tab) * columns + 1):
+        before = old[(pos - 1) // columns][(pos - 1) % columns]
+        after = tab[(pos - 1) // columns][(pos - 1) % columns]
+        if before != after:
+            if before != 0:
+                return None
+            new_stones[pos] = after
+    node = arvore["raiz"]
+    while new_stones:
+        child = None
+        for pos in new_stones:
+            if pos in node["filhos"] and node["filhos"][pos]["jogador"] == new_stones[pos]:
+                child = node["filhos"][pos]
+        if child is None:
+            return None
+        del new_stones[child["jogada"]]
+        node = child
+    if node["jogador"] != -jog:
+        return None
+    return node
+
+def escolhe_posicao_mcts(estado, jog, simulacoes=None, tempo=None, processos=1, executor=None, arvore=None,
+                         estatisticas=None, semente=None, cancelar=None):
+    """ Escolhe a posição do nível "mcts" com uma procura em árvore de Monte Carlo
+    
+        Args:
+            estado (dict): Estado de jogo, que fica igual no fim
+            jog (int): Jogador do computador
+            simulacoes (int): Número máximo de simulações, ou None
+            tempo (float): Tempo máximo em segundos, ou None (sem nenhum dos limites são feitas SIMULACOES_MCTS simulações)
+            processos (int): Número de processos pelos quais as simulações são distribuídas
+            executor (concurrent.futures.Executor): Conjunto de processos já criado, ou None para criar um quando
+            processos é maior que 1
+            arvore (dict): Dicionário onde a árvore é guardada entre jogadas, ou None
+            estatisticas (dict): Dicionário onde são guardadas as simulações, as visitas reaproveitadas e o tempo, ou None
+            semente (int): Semente do gerador aleatório, ou None
+            cancelar (threading.Event): Objeto cujo método is_set indica que a procura deve parar, ou None
+            
+        Returns:
+            pos (int): Posição escolhida (a jogada mais visitada)
+        
+    
+    """
+    if executor is None and processos > 1:
+        with concurrent.futures.ProcessPoolExecutor(processos) as executor:
+            return escolhe_posicao_mcts(estado, jog, simulacoes, tempo, processos, executor, arvore, estatisticas,
+                                        semente, cancelar)
+    
+    start = time.perf_counter()
+    if simulacoes is None and tempo is None:
+        simulacoes = SIMULACOES_MCTS
+    generator = random.Random(semente)
+    tab = estado_tabuleiro(estado)
+    tm = estado_tabuleiro_mutavel(estado)
+    lines, columns = tabuleiro_mutavel_dimensao(tm)
+    
+    raiz = None
+    if arvore is not None:
+        raiz = reaproveita_arvore_mcts(arvore, tab, estado["k"], jog)
+    if raiz is None:
+        raiz = cria_no_mcts(None, -jog)
+    reused = raiz["visitas"]
+    
+    batch = LOTE_MCTS * processos
+    done = 0
+    while (simulacoes is None or done < simulacoes) and (tempo is None or time.perf_counter() - start < tempo) and \
+            (cancelar is None or not cancelar.is_set() or done == 0):
+        size = batch if simulacoes is None else min(batch, simulacoes - done)
+        paths = []
+        jobs = []
+        for index in range(size):
+            path = seleciona_mcts(raiz, estado, generator)
+            if estado_eh_fim_jogo(estado):
+                propaga_mcts(path, estado_vencedor(estado))
+            else:
+                paths.append(path)
+                jobs.append((codifica_tabuleiro(tm), lines, columns, estado["k"], -path[-1]["jogador"],
+                             generator.getrandbits(32)))
+            for move in range(len(path) - 1):
+                estado_desfaz_jogada(estado)
+        
+        if executor is not None and processos > 1 and len(jobs) > 1:
+            results = list(executor.map(simula_partida, jobs))
+        else:
+            results = [simula_partida(job) for job in jobs]
+        for index in range(len(paths)):
+            propaga_mcts(paths[index], results[index])
+        done += size
+    
+    best = None
+    for pos in sorted(raiz["filhos"]):
+        if best is None or raiz["filhos"][pos]["visitas"] > best["visitas"]:
+            best = raiz["filhos"][pos]
+    
+    # A sub-árvore da jogada escolhida fica guardada para a jogada seguinte
+    if arvore is not None:
+        arvore["raiz"] = best
+        arvore["tab"] = marca_posicao(tab, best["jogada"], jog)
+        arvore["k"] = estado["k"]
+    if estatisticas is not None:
+        estatisticas["simulacoes"] = done
+        estatisticas["visitas_reaproveitadas"] = reused
+        estatisticas["visitas_raiz"] = raiz["visitas"]
+        estatisticas["tempo"] = time.perf_counter() - start
+    return best["jogada"]
+
+# Livro de aberturas: as primeiras jogadas do computador são as mais caras e repetem-se de jogo para jogo, por isso
+# podem ser calculadas uma vez e guardadas num ficheiro. Cada posição é identificada pela sua chave canónica, a menor
+# das chaves de Zobrist do tabuleiro transformado pelas simetrias (8 nos tabuleiros quadrados, 4 nos restantes), e a
+# jogada é guardada já transformada pela simetria dessa chave. O ficheiro é uma tabela de dispersão com endereçamento
+# aberto (chave de 64 bits e jogada de 16 bits por entrada) lida diretamente do disco com mmap.
+
+FORMATO_LIVRO = struct.Struct("<4sHHHHHII")
+ENTRADA_LIVRO = struct.Struct("<QH")
+ASSINATURA_LIVRO = b"MNKL"
+VERSAO_LIVRO = 1
+
+@functools.lru_cache(maxsize=64)
+def obtem_simetrias(lines, columns):
+    """ Obtem as simetrias de um tabuleiro com as dimensões recebidas
+    
+        Args:
+            lines (int): Número de linhas do tabuleiro
+            columns (int): Número de colunas do tabuleiro
+            
+        Returns:
+            simetrias (tuplo): Tuplo de simetrias, cada uma um tuplo indexado pela posição com a posição transformada
+            (a primeira é a identidade)
+        
+    
+    """
+    transforms = [lambda row, col: (row, col), lambda row, col: (row, columns - 1 - col),
+                  lambda row, col: (lines - 1 - row, col), lambda row, col: (lines - 1 - row, columns - 1 - col)]
+    if lines == columns:
+        transforms += [lambda row, col: (col, row), lambda row, col: (col, lines - 1 - row),
+                       lambda row, col: (columns - 1 - col, row), lambda row, col: (columns - 1 - col, lines - 1 - row)]
+    
+    symmetries = []
+    for transform in transforms:
+        symmetry = [0]
+        for pos in range(1, lines * columns + 1):
+            row, col = transform((pos - 1) // columns, (pos - 1) % columns)
+            symmetry.append(row * columns + col + 1)
+        symmetries.append(tuple(symmetry))
+    return tuple(symmetries)
+
+@functools.lru_cache(maxsize=64)
+def obtem_simetrias_inversas(lines, columns):
+    """ Obtem as inversas das simetrias de um tabuleiro com as dimensões recebidas
+    
+        Args:
+            lines (int): Número de linhas do tabuleiro
+            columns (int): Número de colunas do tabuleiro
+            
+        Returns:
+            inversas (tuplo): Tuplo com a inversa de cada simetria de obtem_simetrias, pela mesma ordem, que leva cada
+            posição transformada de volta à posição original
+        
+    
+    """
+    inverses = []
+    for symmetry in obtem_simetrias(lines, columns):
+        inverse = [0] * len(symmetry)
+        for pos, transformed in enumerate(symmetry):
+            inverse[transformed] = pos
+        inverses.append(tuple(inverse))
+    return tuple(inverses)
+
+def estado_chave_canonica(estado, jog):
+    """ Obtem a chave canónica da posição de um estado de jogo, com jog a jogar
+    
+        Args:
+            estado (dict): Estado de jogo
+            jog (int): Jogador a jogar
+            
+        Returns:
+            canonica (tuple): Tuplo com a chave canónica e o índice da simetria que a produz (ver obtem_simetrias)
+        
+    
+    """
+    tm = estado_tabuleiro_mutavel(estado)
+    cells = tm["celulas"]
+    zobrist = estado["zobrist"]
+    stones = tuple((pos, cells[pos]) for pos in range(1, len(cells)) if cells[pos] != 0)
+    best = None
+    for index, symmetry in enumerate(obtem_simetrias(tm["linhas"], tm["colunas"])):
+        key = zobrist["lado"] if jog == -1 else 0
+        for pos, value in stones:
+            key ^= zobrist[value][symmetry[pos]]
+        if best is None or key < best[0]:
+            best = (key, index)
+    return best
+
+def guarda_livro_aberturas(ficheiro, lines, columns, k, jogadas, entradas):
+    """ Guarda um livro de aberturas num ficheiro binário
+    
+        Args:
+            ficheiro (string): Caminho do ficheiro a escrever
+            lines (int): Número de linhas do tabuleiro
+            columns (int): Número de colunas do tabuleiro
+            k (int): Número de posições seguidas para ganhar o jogo
+            jogadas (int): O livro cobre as posições com menos peças do que este número
+            entradas (dict): Dicionário de chave canónica para jogada, já transformada pela simetria da chave
+            
+        Returns:
+            None
+        
+    
+    """
+    # A tabela fica no máximo meio cheia, para que as consultas terminem ao fim de poucas entradas
+    capacity = 1
+    while capacity < 2 * len(entradas) + 1:
+        capacity *= 2
+    table = bytearray(capacity * ENTRADA_LIVRO.size)
+    for key, pos in entradas.items():
+        slot = key & (capacity - 1)
+        while ENTRADA_LIVRO.unpack_from(table, slot * ENTRADA_LIVRO.size)[1] != 0:
+            slot = (slot + 1) & (capacity - 1)
+        ENTRADA_LIVRO.pack_into(table, slot * ENTRADA_LIVRO.size, key, pos)
+    with open(ficheiro, "wb") as file:
+        file.write(FORMATO_LIVRO.pack(ASSINATURA_LIVRO, VERSAO_LIVRO, lines, columns, k, jogadas, capacity,
+                                      len(entradas)))
+        file.write(table)
+
+def abre_livro_aberturas(ficheiro):
+    """ Abre um livro de aberturas, mapeando o ficheiro em memória sem o ler por inteiro
+    
+        Args:
+            ficheiro (string): Caminho do ficheiro do livro
+            
+        Returns:
+            livro (dict): Livro com as dimensões, k, o número de jogadas coberto, a capacidade, o número de entradas
+            e o mapeamento do ficheiro ("dados")
+        
+    
+    """
+    with open(ficheiro, "rb") as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(data) < FORMATO_LIVRO.size:
+        data.close()
+        raise ValueError("abre_livro_aberturas: argumentos invalidos")
+    signature, version, lines, columns, k, jogadas, capacity, count = FORMATO_LIVRO.unpack_from(data, 0)
+    if signature != ASSINATURA_LIVRO or version != VERSAO_LIVRO \
+            or len(data) != FORMATO_LIVRO.size + capacity * ENTRADA_LIVRO.size:
+        data.close()
+        raise ValueError("abre_livro_aberturas: argumentos invalidos")
+    return {"linhas": lines, "colunas": columns, "k": k, "jogadas": jogadas, "capacidade": capacity,
+            "entradas": count, "dados": data}
+
+# Função auxiliar à função escolhe_posicao_auto, mantém abertos os livros indicados pelo caminho do ficheiro
+@functools.lru_cache(maxsize=8)
+def obtem_livro_aberturas(ficheiro):
+    return abre_livro_aberturas(ficheiro)
+
+def consulta_livro_aberturas(livro, estado, jog):
+    """ Obtem a jogada do livro de aberturas para a posição de um estado de jogo
+    
+        Args:
+            livro (dict): Livro de aberturas (ver abre_livro_aberturas)
+            estado (dict): Estado de jogo
+            jog (int): Jogador a jogar
+            
+        Returns:
+            pos (int): Posição a jogar, ou None se a posição não está no livro
+        
+    
+    """
+    tm = estado_tabuleiro_mutavel(estado)
+    size = tm["linhas"] * tm["colunas"]
+    if (livro["linhas"], livro["colunas"], livro["k"]) != (tm["linhas"], tm["colunas"], estado["k"]) \
+            or size - estado_numero_livres(estado) >= livro["jogadas"]:
+        return None
+    key, index = estado_chave_canonica(estado, jog)
+    data = livro["dados"]
+    capacity = livro["capacidade"]
+    slot = key & (capacity - 1)
+    while True:
+        stored, pos = ENTRADA_LIVRO.unpack_from(data, FORMATO_LIVRO.size + slot * ENTRADA_LIVRO.size)
+        if pos == 0:
+            return None
+        if stored == key:
+            # A jogada guardada está na orientação canónica, é desfeita a simetria da posição atual
+            pos = obtem_simetrias_inversas(tm["linhas"], tm["colunas"])[index][pos]
+            return pos if tm["celulas"][pos] == 0 else None
+        slot = (slot + 1) & (capacity - 1)
+
+def constroi_livro_aberturas(ficheiro, lines, columns, k, jogadas, lvl="dificil", ramos=2, profundidade=None,
+                             tempo=None):
+    """ Constrói um livro de aberturas jogando o computador contra si próprio a partir do tabuleiro vazio
+    
+        Args:
+            ficheiro (string): Caminho do ficheiro a escrever
+            lines (int): Número de linhas do tabuleiro
+            columns (int): Número de colunas do tabuleiro
+            k (int): Número de posições seguidas para ganhar o jogo
+            jogadas (int): Número de jogadas a partir do tabuleiro vazio cobertas pelo livro
+            lvl (string): Nível do computador usado para escolher as jogadas
+            ramos (int): Número de respostas exploradas em cada posição: a do computador e as ramos - 1 posições
+            livres mais próximas do centro junto às peças
+            profundidade (int): Profundidade do nível "dificil", ou None
+            tempo (float): Tempo por jogada dos níveis "dificil" e "mcts", ou None
+            
+        Returns:
+            entradas (int): Número de posições guardadas no livro
+        
+    
+    """
+    if not (type(lines) == int and type(columns) == int and 0 < lines * columns < 2 ** 16 and type(k) == int
+            and k > 0 and type(jogadas) == int and 0 < jogadas < 2 ** 16 and lvl in NIVEIS
+            and type(ramos) == int and ramos > 0):
+        raise ValueError("constroi_livro_aberturas: argumentos invalidos")
+    tab = ()
+    for num in range(lines):
+        tab += ((0,) * columns,)
+    estado = cria_estado_jogo(cria_tabuleiro_confiavel(tab), k)
+    symmetries = obtem_simetrias(lines, columns)
+    tabela = cria_tabela_transposicao()
+    entradas = {}
+    
+    # Percorre as aberturas em profundidade, sem repetir posições equivalentes por simetria
+    def expande(jog):
+        if estado_eh_fim_jogo(estado) or lines * columns - estado_numero_livres(estado) >= jogadas:
+            return
+        key, index = estado_chave_canonica(estado, jog)
+        if key in entradas:
+            return
+        pos = escolhe_posicao_auto(estado_tabuleiro(estado), jog, k, lvl, profundidade=profundidade, tabela=tabela,
+                                   tempo=tempo, processos=1, semente=key)
+        entradas[key] = symmetries[index][pos]
+        base = estado_fronteira(estado, 0) or conjunto_posicoes(estado_conjunto(estado, 0))
+        replies = (pos,) + tuple(num for num in ordena_posicoes(lines, columns, base) if num != pos)[:ramos - 1]
+        for num in replies:
+            estado_marca_posicao(estado, num, jog)
+            expande(-jog)
+            estado_desfaz_jogada(estado)
+    
+    expande(1)
+    guarda_livro_aberturas(ficheiro, lines, columns, k, jogadas, entradas)
+    return len(entradas)
+
+# Cache de jogadas: as mesmas posições repetem-se de jogo para jogo (o tabuleiro vazio, as aberturas mais comuns,
+# as respostas forçadas), por isso a jogada escolhida por um nível pode ser guardada e reaproveitada. Cada entrada é
+# identificada pelas dimensões, k, o jogador, o nível e os parâmetros que mudam a escolha (profundidade e simulações)
+# e pela chave canónica da posição (ver estado_chave_canonica), com a jogada guardada na orientação canónica. Por
+# omissão a chave inclui também o índice da simetria e só são reaproveitadas posições exatamente iguais, porque os
+# níveis desempatam pela ordem das posições e pela distância a um centro que, nos tabuleiros de lado par, não é
+# simétrico: a imagem da jogada de uma posição simétrica muitas vezes não é a que o nível escolheria. Mesmo sem
+# simetrias, o nível "dificil" com uma tabela de transposição partilhada pode escolher, entre jogadas de igual valor,
+# uma jogada diferente da guardada, porque desempata pelas melhores jogadas que a tabela já tem. Com simetrias,
+# as posições simétricas partilham a entrada, o que só é correto se qualquer jogada simétrica servir. A cache
+# tem um número máximo de entradas e, quando está cheia, sai a entrada usada há mais tempo (os dicionários mantêm a
+# ordem de inserção, por isso cada acerto volta a inserir a entrada no fim). Só são guardados os níveis indicados na
+# criação da cache, por omissão os deterministas. A cache pode ser guardada num ficheiro e lida na criação.
+
+NIVEIS_DETERMINISTAS = ("facil", "normal", "dificil")
+CACHE_JOGADAS_MAXIMO = 100000
+FORMATO_CACHE = struct.Struct("<4sHI")
+ENTRADA_CACHE = struct.Struct("<HHHbBHIQBH")
+ASSINATURA_CACHE = b"MNKC"
+VERSAO_CACHE = 1
+# Índice de simetria das entradas de uma cache com simetrias, no ficheiro
+SEM_SIMETRIA = 255
+
+def cria_cache_jogadas(maximo=CACHE_JOGADAS_MAXIMO, niveis=NIVEIS_DETERMINISTAS, ficheiro=None, simetrias=False):
+    """ Cria uma cache das jogadas escolhidas pelos níveis do computador
+    
+        Args:
+            maximo (int): Número máximo de entradas
+            niveis (tuplo): Níveis cujas jogadas são guardadas, os restantes são sempre calculados
+            ficheiro (string): Caminho do ficheiro de onde a cache é lida, se existir, e onde é guardada por omissão
+            (ver escreve_cache_jogadas), ou None
+            simetrias (boolean): True para reaproveitar também as posições equivalentes por simetria, devolvendo a imagem
+            da jogada guardada, que pode não ser a que o nível escolheria; False (por omissão) para devolver a jogada
+            que o nível escolheu na mesma posição (no nível "dificil" com uma tabela partilhada pode ser outra de igual
+            valor)
+            
+        Returns:
+            cache (dict): Cache vazia ou com as entradas do ficheiro, com os contadores de consultas, acertos e saídas
+        
+    
+    """
+    if not (type(maximo) == int and maximo > 0 and all(lvl in NIVEIS for lvl in niveis)):
+        raise ValueError("cria_cache_jogadas: argumentos invalidos")
+    cache = {"entradas": {}, "maximo": maximo, "niveis": tuple(niveis), "ficheiro": ficheiro,
+             "simetrias": simetrias, "consultas": 0, "acertos": 0, "saidas": 0}
+    if ficheiro is not None and os.path.exists(ficheiro):
+        with open(ficheiro, "rb") as file:
+            data = file.read()
+        if len(data) < FORMATO_CACHE.size:
+            raise ValueError("cria_cache_jogadas: argumentos invalidos")
+        signature, version, count = FORMATO_CACHE.unpack_from(data, 0)
+        if signature != ASSINATURA_CACHE or version != VERSAO_CACHE \
+                or len(data) != FORMATO_CACHE.size + count * ENTRADA_CACHE.size:
+            raise ValueError("cria_cache_jogadas: argumentos invalidos")
+        # As entradas estão da usada há mais tempo para a mais recente, por isso a ordem é mantida
+        for fields in ENTRADA_CACHE.iter_unpack(data[FORMATO_CACHE.size:]):
+            lines, columns, k, jog, lvl, depth, simulations, key, index, pos = fields
+            if (index == SEM_SIMETRIA) == simetrias:
+                guarda_entrada_cache(cache, (lines, columns, k, jog, NIVEIS[lvl], depth or None, simulations or None,
+                                             key, None if index == SEM_SIMETRIA else index), pos)
+    return cache
+
+# Função auxiliar às funções de cache de jogadas, obtém a chave da posição de um estado e o índice da sua simetria
+def chave_cache_jogadas(cache, estado, jog, lvl, profundidade, simulacoes):
+    tm = estado_tabuleiro_mutavel(estado)
+    key, index = estado_chave_canonica(estado, jog)
+    return (tm["linhas"], tm["colunas"], estado["k"], jog, lvl, profundidade, simulacoes, key,
+            None if cache["simetrias"] else index), index
+
+# Função auxiliar às funções de cache de jogadas, insere uma entrada no fim da ordem de uso, retirando a usada há mais
+# tempo se a cache ficar acima do máximo
+def guarda_entrada_cache(cache, key, pos):
+    entradas = cache["entradas"]
+    entradas.pop(key, None)
+    entradas[key] = pos
+    if len(entradas) > cache["maximo"]:
+        del entradas[next(iter(entradas))]
+        cache["saidas"] += 1
+
+def consulta_cache_jogadas(cache, estado, jog, lvl, profundidade=None, simulacoes=None):
+    """ Obtem a jogada guardada na cache para a posição de um estado de jogo
+    
+        Args:
+            cache (dict): Cache de jogadas (ver cria_cache_jogadas)
+            estado (dict): Estado de jogo
+            jog (int): Jogador a jogar
+            lvl (string): Nível do computador
+            profundidade (int): Profundidade do nível "dificil", ou None
+            simulacoes (int): Número de simulações do nível "mcts", ou None
+            
+        Returns:
+            pos (int): Posição a jogar, ou None se a posição não está na cache
+        
+    
+    """
+    if lvl not in cache["niveis"]:
+        return None
+    cache["consultas"] += 1
+    key, index = chave_cache_jogadas(cache, estado, jog, lvl, profundidade, simulacoes)
+    pos = cache["entradas"].get(key)
+    if pos is None:
+        return None
+    tm = estado_tabuleiro_mutavel(estado)
+    # A jogada guardada está na orientação canónica, é desfeita a simetria da posição atual
+    pos = obtem_simetrias_inversas(tm["linhas"], tm["colunas"])[index][pos]
+    if tm["celulas"][pos] != 0:
+        return None
+    cache["acertos"] += 1
+    guarda_entrada_cache(cache, key, cache["entradas"][key])
+    return pos
+
+def guarda_cache_jogadas(cache, estado, jog, lvl, pos, profundidade=None, simulacoes=None):
+    """ Guarda na cache a jogada escolhida para a posição de um estado de jogo
+    
+        Args:
+            cache (dict): Cache de jogadas (ver cria_cache_jogadas)
+            estado (dict): Estado de jogo
+            jog (int): Jogador a jogar
+            lvl (string): Nível do computador
+            pos (int): Posição escolhida
+            profundidade (int): Profundidade do nível "dificil", ou None
+            simulacoes (int): Número de simulações do nível "mcts", ou None
+            
+        Returns:
+            None
+        
+    
+    """
+    if lvl in cache["niveis"]:
+        tm = estado_tabuleiro_mutavel(estado)
+        key, index = chave_cache_jogadas(cache, estado, jog, lvl, profundidade, simulacoes)
+        guarda_entrada_cache(cache, key, obtem_simetrias(tm["linhas"], tm["colunas"])[index][pos])
+
+def estatisticas_cache_jogadas(cache):
+    """ Obtem as estatísticas de uso de uma cache de jogadas
+    
+        Args:
+            cache (dict): Cache de jogadas (ver cria_cache_jogadas)
+            
+        Returns:
+            estatisticas (dict): Número de entradas e máximo, consultas, acertos, falhas, saídas de entradas usadas há
+            mais tempo e taxa de acertos (None sem consultas)
+        
+    
+    """
+    queries = cache["consultas"]
+    return {"entradas": len(cache["entradas"]), "maximo": cache["maximo"], "consultas": queries,
+            "acertos": cache["acertos"], "falhas": queries - cache["acertos"], "saidas": cache["saidas"],
+            "taxa": cache["acertos"] / queries if queries else None}
+
+def escreve_cache_jogadas(cache, ficheiro=None):
+    """ Guarda as entradas de uma cache de jogadas num ficheiro binário, substituindo-o por inteiro
+    
+        Args:
+            cache (dict): Cache de jogadas (ver cria_cache_jogadas)
+            ficheiro (string): Caminho do ficheiro, ou None para o ficheiro da cache
+            
+        Returns:
+            entradas (int): Número de entradas guardadas
+        
+    
+    """
+    if ficheiro is None:
+        ficheiro = cache["ficheiro"]
+    if ficheiro is None:
+        raise ValueError("escreve_cache_jogadas: argumentos invalidos")
+    data = bytearray()
+    count = 0
+    for (lines, columns, k, jog, lvl, depth, simulations, key, index), pos in cache["entradas"].items():
+        # Entradas que não cabem no formato do ficheiro ficam só em memória
+        if lines * columns < 2 ** 16 and k < 2 ** 16 and (depth or 0) < 2 ** 16 and (simulations or 0) < 2 ** 32:
+            data += ENTRADA_CACHE.pack(lines, columns, k, jog, NIVEIS.index(lvl), depth or 0, simulations or 0, key,
+                                       SEM_SIMETRIA if index is None else index, pos)
+            count += 1
+    # O ficheiro é escrito ao lado e depois trocado, para que uma escrita interrompida não estrague a cache anterior
+    with open(ficheiro + ".tmp", "wb") as file:
+        file.write(FORMATO_CACHE.pack(ASSINATURA_CACHE, VERSAO_CACHE, count))
+        file.write(data)
+    os.replace(ficheiro + ".tmp", ficheiro)
+    return count
+
+def escolhe_posicao_auto(tab, jog, k, lvl, motor="tuplo", profundidade=None, tabela=None, estatisticas=None,
+                         simulacoes=None, tempo=None, processos=None, executor=None, arvore=None, semente=None,
+                         nos=None, cancelar=None, livro=None, cache=None):
+    """ Retorna posição escolhida pelo pc
+    
+        Args:
+            tab (tuplo): Tabuleiro para marcar a posicao
+            jog(int): jogador do pc
+            k(int): quantos em sequencia pra ganhar
+            lvl(string): nivel de dificuldade
+            motor(string): "tuplo" ou "bitboard", implementação usada para procurar um vencedor no tabuleiro recebido
+            profundidade(int): profundidade da procura do nivel "dificil", ou None para a profundidade por omissão
+            tabela(dict): tabela de transposição do nivel "dificil" (ver cria_tabela_transposicao), ou None para uma nova
+            estatisticas(dict): dicionario onde os niveis "dificil" e "mcts" guardam os nós explorados ou as simulações
+            e o tempo da jogada, ou None
+            simulacoes(int): número de simulações do nivel "mcts", ou None
+            tempo(float): tempo máximo em segundos dos niveis "dificil" e "mcts", ou None
+            processos(int): número de processos dos niveis "dificil" e "mcts", ou None para usar um só no "dificil" e
+            todos os processadores no "mcts"
+            executor(concurrent.futures.Executor): conjunto de processos já criado para os niveis "dificil" e "mcts",
+            ou None
+            arvore(dict): dicionario onde o nivel "mcts" guarda a árvore entre jogadas, ou None
+            semente(int): semente do gerador aleatório do nivel "mcts", ou None
+            nos(int): número máximo de nós do nivel "dificil", ou None
+            cancelar(threading.Event): objeto cujo método is_set indica, por exemplo a partir de outra thread, que os
+            niveis "dificil" e "mcts" devem devolver já a melhor jogada encontrada, ou None
+            livro(dict ou string): livro de aberturas (ver abre_livro_aberturas) ou caminho do seu ficheiro, consultado
+            antes de qualquer nivel, ou None
+            cache(dict): cache de jogadas (ver cria_cache_jogadas) consultada antes dos niveis que guarda, e onde fica a
+            jogada escolhida, ou None
+            
+        Returns:
+            pos(int): posição escolhida pelo pc
+        
+    
+    """
+    if motor not in MOTORES or not (profundidade is None or (type(profundidade) == int and profundidade > 0)) \
+            or not (simulacoes is None or (type(simulacoes) == int and simulacoes > 0)) \
+            or not (processos is None or (type(processos) == int and processos > 0)) \
+            or not (nos is None or (type(nos) == int and nos > 0)) \
+            or not (livro is None or type(livro) in (str, dict)) \
+            or not (cache is None or type(cache) == dict):
+        raise ValueError("escolhe_posicao_auto: argumentos invalidos")
+    if eh_tabuleiro(tab):
+        # O tabuleiro é validado apenas aqui, os níveis trabalham sobre um estado de jogo com tabuleiro mutável
+        cria_tabuleiro_confiavel(tab)
+        estado = cria_estado_jogo(tab, k, motor, lvl == "dificil")
+        
+        if not estado_eh_fim_jogo(estado) and jog in [-1, 1]:
+            if livro is not None:
+                if type(livro) == str:
+                    livro = obtem_livro_aberturas(livro)
+                pos = consulta_livro_aberturas(livro, estado, jog)
+                if pos is not None:
+                    return pos
+            # Jogadas com limite de tempo, de nós ou cancelamento dependem do momento e nunca passam pela cache
+            if cache is not None and (tempo is not None or nos is not None or cancelar is not None):
+                cache = None
+            if cache is not None:
+                pos = consulta_cache_jogadas(cache, estado, jog, lvl, profundidade, simulacoes)
+                if pos is not None:
+                    return pos
+            pos = None
+            if lvl == "facil":
+                pos = escolhe_posicao_facil(estado, jog)
+            elif lvl == "normal":
+                pos = escolhe_posicao_normal(estado, jog)
+            elif lvl == "dificil":
+                pos = escolhe_posicao_dificil(estado, jog, profundidade, tabela, estatisticas, tempo, nos, cancelar,
+                                              processos, executor)
+            elif lvl == "mcts":
+                if processos is None:
+                    processos = os.cpu_count() or 1
+                pos = escolhe_posicao_mcts(estado, jog, simulacoes, tempo, processos, executor, arvore, estatisticas,
+                                           semente, cancelar)
+            if cache is not None and pos is not None:
+                guarda_cache_jogadas(cache, estado, jog, lvl, pos, profundidade, simulacoes)
+            return pos
+
+# Função auxiliar às funções jogo_mnk e simula_jogo, joga até ao fim do jogo a partir do estado recebido, começando
+# pelo jogador 1 (que joga sempre que o número de peças é par). Cada jogador é uma função (estado, jog) que devolve
+# a posição a marcar, e depois, se existir, é chamada com (estado, jog, pos) após cada jogada
+def ciclo_jogo(estado, jogadores, depois=None):
+    lines, columns = tabuleiro_mutavel_dimensao(estado_tabuleiro_mutavel(estado))
+    jog = 1 if (lines * columns - estado_numero_livres(estado)) % 2 == 0 else -1
+    while not estado_eh_fim_jogo(estado):
+        pos = jogadores[jog](estado, jog)
+        estado_marca_posicao(estado, pos, jog)
+        if depois is not None:
+            depois(estado, jog, pos)
+        jog = -jog
+    return estado_vencedor(estado)
+
+def jogo_mnk(cfg, jog, lvl, motor="tuplo", livro=None):
+    """ Retorna posição escolhida pelo pc
+    
+        Args:
+            cfg (tuplo): tamanho do tabuleiro, k pra ganhar
+            jog(int): jogador 
+            lvl(string): nivel de dificuldade
+            motor(string): "tuplo" ou "bitboard", implementação usada para procurar um vencedor no tabuleiro inicial
+            livro(dict ou string): livro de aberturas do computador ou caminho do seu ficheiro, ou None
+            
+        Returns:
+            winner (int): vencedor
+        
+    
+    """
+    if len(cfg) == 3 and type(cfg[0]) == int and type(cfg[1]) == int and type(cfg[2]) == int and jog in [-1, 1]:
+        if lvl in NIVEIS and motor in MOTORES:
+            print("Bem-vindo ao JOGO MNK.")
+            rows = cfg[0]
+            columns = cfg[1]
+            k = cfg[2]
+            
+            if jog == 1:
+                jogador = "X"
+            
+            else:
+                jogador = "0"
+                
+            print(f"O jogador joga com '{jogador}'.")
+            
+            # Define o tab
+            tab = ()
+            row = ()
+            for num in range(1, columns + 1):
+                row += (0,)
+            for num in range(1, rows + 1):
+                tab += (row,)
+            limpa_tabuleiros_confiaveis()
+            tab = cria_tabuleiro_confiavel(tab)
+            
+            estado = cria_estado_jogo(tab, k, motor)
+            
+            # A tabela de transposição do nivel "dificil" e a árvore do nivel "mcts" são mantidas durante todo o jogo,
+            # tal como o conjunto de processos das simulações do nivel "mcts". O nivel "dificil" procura num só
+            # processo, porque os processos da procura paralela começam cada jogada com tabelas vazias
+            tabela = cria_tabela_transposicao()
+            arvore = {}
+            processos = None
+            executor = None
+            if lvl == "mcts":
+                processos = os.cpu_count() or 1
+                if processos > 1:
+                    executor = concurrent.futures.ProcessPoolExecutor(processos)
+            # O tabuleiro é mostrado no início de cada ronda e antes e depois da jogada do jogador. O desenho é
+            # atualizado a cada jogada, em vez de ser desenhado de novo sempre que é mostrado
+            desenho = cria_desenho(tab)
+            
+            def humano(estado, jogada):
+                print(desenho["texto"])
+                return escolhe_posicao_manual(estado_tabuleiro(estado))
+            
+            def computador(estado, jogada):
+                if jogada == 1:
+                    print(desenho["texto"])
+                print(f"Turno do computador ({lvl}):")
+                return escolhe_posicao_auto(estado_tabuleiro(estado), jogada, k, lvl, motor, tabela=tabela,
+                                            processos=processos, executor=executor, arvore=arvore, livro=livro)
+            
+            def depois(estado, jogada, pos):
+                desenho_marca_posicao(desenho, pos, jogada)
+                if jogada == jog:
+                    print(desenho["texto"])
+            
+            try:
+                winner = ciclo_jogo(estado, {jog: humano, -jog: computador}, depois)
+                print(desenho["texto"])
+                if winner == jog:
+                    print("VITORIA")
+                elif winner == -jog:
+                    print("DERROTA")
+                else:
+                    print("EMPATE")
+                return winner
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+
+        else:                
             raise ValueError("jogo_mnk: argumentos invalidos")
     else:           
-        raise ValueError("jogo_mnk: argumentos invalidos")
\ No newline at end of file
+        raise ValueError("jogo_mnk: argumentos invalidos")
+
+# Simulação: partidas entre dois níveis do computador, sem input nem print, usando o mesmo ciclo de jogo que jogo_mnk.
+# Cada partida depende apenas da semente e do seu índice, por isso os resultados são os mesmos com qualquer número de
+# processos. As primeiras jogadas de cada partida podem ser aleatórias, para que as partidas não sejam todas iguais.
+
+# Função auxiliar à função simula_jogos, obtém o percentil p (entre 0 e 100) de uma lista ordenada, pelo
+# método do posto mais próximo
+def percentil(valores, p):
+    if valores == []:
+        return None
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+def simula_jogo(dados):
+    """ Joga uma partida entre dois níveis do computador
+    
+        Args:
+            dados (tuple): Tuplo com a configuração (m, n, k), os níveis dos jogadores 1 e -1, o número de jogadas
+            aleatórias no início, a semente, a profundidade do nível "dificil" e as simulações do nível "mcts"
+            
+        Returns:
+            resultado (dict): Dicionário com o vencedor ("vencedor", 0 no empate), o número de jogadas ("jogadas"),
+            as posições jogadas por ordem ("historico") e, para cada jogador, a lista dos tempos em segundos das suas
+            jogadas escolhidas pelo computador ("tempos")
+        
+    
+    """
+    cfg, niveis, aleatorias, semente, profundidade, simulacoes = dados
+    lines, columns, k = cfg
+    generator = random.Random(semente)
+    # Os tabuleiros dos jogos anteriores deste processo já não são usados
+    limpa_tabuleiros_confiaveis()
+    tab = ()
+    for num in range(lines):
+        tab += ((0,) * columns,)
+    estado = cria_estado_jogo(cria_tabuleiro_confiavel(tab), k)
+    tabelas = {1: cria_tabela_transposicao(), -1: cria_tabela_transposicao()}
+    arvores = {1: {}, -1: {}}
+    tempos = {1: [], -1: []}
+    
+    def computador(estado, jog):
+        if lines * columns - estado_numero_livres(estado) < aleatorias:
+            return generator.choice(conjunto_posicoes(estado_conjunto(estado, 0)))
+        start = time.perf_counter()
+        pos = escolhe_posicao_auto(estado_tabuleiro(estado), jog, k, niveis[jog], profundidade=profundidade,
+                                   tabela=tabelas[jog], simulacoes=simulacoes, processos=1, arvore=arvores[jog],
+                                   semente=generator.getrandbits(64))
+        tempos[jog].append(time.perf_counter() - start)
+        return pos
+    
+    winner = ciclo_jogo(estado, {1: computador, -1: computador})
+    return {"vencedor": winner, "jogadas": lines * columns - estado_numero_livres(estado),
+            "historico": tuple(estado_tabuleiro_mutavel(estado)["historico"]), "tempos": tempos}
+
+def simula_jogos(cfg, niveis, jogos, semente=0, processos=None, aleatorias=2, profundidade=None, simulacoes=None,
+                 registos=None):
+    """ Joga várias partidas entre dois níveis do computador, alternando o jogador que começa
+    
+        Args:
+            cfg (tuplo): Número de linhas, de colunas e k
+            niveis (tuplo): Os dois níveis a comparar; nas partidas de índice par o primeiro é o jogador 1
+            jogos (int): Número de partidas
+            semente (int): Semente das jogadas aleatórias e do nível "mcts"
+            processos (int): Número de processos, ou None para usar todos os processadores
+            aleatorias (int): Número de jogadas aleatórias no início de cada partida
+            profundidade (int): Profundidade do nível "dificil", ou None
+            simulacoes (int): Número de simulações do nível "mcts", ou None
+            registos (string): Caminho de um ficheiro de registos onde são acrescentadas as partidas, com o índice de
+            cada partida como semente (ver escreve_registos), ou None
+            
+        Returns:
+            relatorio (dict): Vitórias, empates e derrotas do primeiro nível, número de jogadas por partida (mínimo,
+            média e máximo), percentis 50, 90 e 99 do tempo por jogada de cada nível, tempo total e partidas por segundo
+        
+    
+    """
+    if not (len(cfg) == 3 and all(type(num) == int and num > 0 for num in cfg) and len(niveis) == 2
+            and niveis[0] in NIVEIS and niveis[1] in NIVEIS and type(jogos) == int and jogos > 0
+            and type(aleatorias) == int and aleatorias >= 0
+            and (processos is None or (type(processos) == int and processos > 0))):
+        raise ValueError("simula_jogos: argumentos invalidos")
+    if processos is None:
+        processos = os.cpu_count() or 1
+    dados = []
+    for index in range(jogos):
+        levels = {1: niveis[index % 2], -1: niveis[1 - index % 2]}
+        dados.append((cfg, levels, aleatorias, "%s-%d" % (semente, index), profundidade, simulacoes))
+    
+    start = time.perf_counter()
+    if processos == 1:
+        resultados = [simula_jogo(game) for game in dados]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processos) as executor:
+            resultados = list(executor.map(simula_jogo, dados, chunksize=max(1, jogos // (4 * processos))))
+    total = time.perf_counter() - start
+    if registos is not None:
+        escreve_registos(registos, ({"linhas": cfg[0], "colunas": cfg[1], "k": cfg[2],
+                                     "niveis": (dados[index][1][1], dados[index][1][-1]), "semente": index,
+                                     "vencedor": resultado["vencedor"], "jogadas": resultado["historico"],
+                                     "fotografias": None} for index, resultado in enumerate(resultados)), True)
+    
+    report = {"vitorias": 0, "empates": 0, "derrotas": 0}
+    tempos = {niveis[0]: [], niveis[1]: []}
+    lengths = []
+    for index, resultado in enumerate(resultados):
+        # O primeiro nível é o jogador 1 nas partidas de índice par
+        first = 1 if index % 2 == 0 else -1
+        if resultado["vencedor"] == 0:
+            report["empates"] += 1
+        elif resultado["vencedor"] == first:
+            report["vitorias"] += 1
+        else:
+            report["derrotas"] += 1
+        lengths.append(resultado["jogadas"])
+        tempos[dados[index][1][1]] += resultado["tempos"][1]
+        tempos[dados[index][1][-1]] += resultado["tempos"][-1]
+    
+    report["jogadas"] = {"minimo": min(lengths), "media": sum(lengths) / len(lengths), "maximo": max(lengths)}
+    report["tempos"] = {}
+    for lvl in tempos:
+        values = sorted(tempos[lvl])
+        report["tempos"][lvl] = {"jogadas": len(values), "p50": percentil(values, 50), "p90": percentil(values, 90),
+                                 "p99": percentil(values, 99)}
+    report["tempo"] = total
+    report["jogos_por_segundo"] = jogos / total
+    return report
+
+# Instrumentação: quando ativada, as funções deste módulo são substituídas por versões que contam as chamadas e o
+# tempo acumulado (o tempo de uma função recursiva conta apenas a chamada exterior). As chamadas entre funções passam
+# pelos nomes globais do módulo, por isso também são contadas. Quando desativada as funções originais são repostas e
+# o custo é nulo. Cada chamada a escolhe_posicao_auto produz um relatório da jogada e cada chamada a jogo_mnk um
+# relatório do jogo. As simulações feitas noutros processos não são contadas.
+
+INSTRUMENTACAO = None
+
+# Função auxiliar à função ativa_instrumentacao, obtém a versão de uma função que conta as chamadas e o tempo
+def instrumenta_funcao(funcao, contador):
+    @functools.wraps(funcao)
+    def instrumentada(*args, **kwargs):
+        contador["chamadas"] += 1
+        if contador["ativas"]:
+            return funcao(*args, **kwargs)
+        contador["ativas"] = 1
+        start = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            contador["tempo"] += time.perf_counter() - start
+            contador["ativas"] = 0
+    return instrumentada
+
+# Função auxiliar às funções de instrumentação, obtém as chamadas e o tempo de cada função e os acertos e falhas
+# de cada cache
+def fotografia_instrumentacao():
+    functions = {}
+    for name, contador in INSTRUMENTACAO["contadores"].items():
+        functions[name] = (contador["chamadas"], contador["tempo"])
+    caches = {}
+    for name, funcao in INSTRUMENTACAO["originais"].items():
+        if hasattr(funcao, "cache_info"):
+            info = funcao.cache_info()
+            caches[name] = (info.hits, info.misses)
+    return {"funcoes": functions, "caches": caches}
+
+# Função auxiliar às funções de instrumentação, obtém as chamadas e o tempo de cada função (da que gastou mais tempo
+# para a que gastou menos) e a taxa de acertos de cada cache entre duas fotografias
+def diferenca_instrumentacao(antes, depois):
+    functions = {}
+    for name, (calls, elapsed) in depois["funcoes"].items():
+        calls -= antes["funcoes"][name][0]
+        if calls:
+            functions[name] = {"chamadas": calls, "tempo": elapsed - antes["funcoes"][name][1]}
+    caches = {}
+    for name, (hits, misses) in depois["caches"].items():
+        hits -= antes["caches"][name][0]
+        misses -= antes["caches"][name][1]
+        if hits + misses:
+            caches[name] = {"acertos": hits, "falhas": misses, "taxa": hits / (hits + misses)}
+    functions = dict(sorted(functions.items(), key=lambda item: -item[1]["tempo"]))
+    return {"funcoes": functions, "caches": caches}
+
+def ativa_instrumentacao(funcoes=None):
+    """ Ativa a instrumentação das funções do módulo
+    
+        Args:
+            funcoes (tuplo): Nomes das funções a instrumentar, ou None para todas as funções do módulo
+            
+        Returns:
+            instrumentacao (dict): Dicionário onde são guardadas as funções originais ("originais"), os contadores
+            ("contadores") e os relatórios das jogadas ("jogadas") e dos jogos ("jogos")
+        
+    
+    """
+    global INSTRUMENTACAO
+    if INSTRUMENTACAO is not None:
+        desativa_instrumentacao()
+    excluded = ("instrumenta_funcao", "fotografia_instrumentacao", "diferenca_instrumentacao", "ativa_instrumentacao",
+                "desativa_instrumentacao", "relatorio_instrumentacao", "instrumenta_jogada", "instrumenta_jogo")
+    if funcoes is None:
+        funcoes = tuple(name for name, value in globals().items() if callable(value) and name not in excluded
+                        and getattr(value, "__module__", None) == __name__ and not isinstance(value, type))
+    elif not all(name in globals() and callable(globals()[name]) and name not in excluded for name in funcoes):
+        raise ValueError("ativa_instrumentacao: argumentos invalidos")
+    
+    INSTRUMENTACAO = {"originais": {}, "contadores": {}, "jogadas": [], "jogos": []}
+    for name in funcoes:
+        INSTRUMENTACAO["originais"][name] = globals()[name]
+        INSTRUMENTACAO["contadores"][name] = {"chamadas": 0, "tempo": 0.0, "ativas": 0}
+        globals()[name] = instrumenta_funcao(globals()[name], INSTRUMENTACAO["contadores"][name])
+    # As caches são sempre observadas, mesmo que as suas funções não sejam instrumentadas
+    for name, value in tuple(globals().items()):
+        if hasattr(value, "cache_info") and name not in INSTRUMENTACAO["originais"]:
+            INSTRUMENTACAO["originais"][name] = value
+    # Os relatórios de jogada e de jogo ficam por fora das versões que contam as chamadas
+    globals()["escolhe_posicao_auto"] = instrumenta_jogada(globals()["escolhe_posicao_auto"])
+    globals()["jogo_mnk"] = instrumenta_jogo(globals()["jogo_mnk"])
+    INSTRUMENTACAO["inicio"] = fotografia_instrumentacao()
+    return INSTRUMENTACAO
+
+def desativa_instrumentacao():
+    """ Desativa a instrumentação, repondo as funções originais
+    
+        Returns:
+            relatorio (dict): Relatório final da instrumentação (ver relatorio_instrumentacao), ou None se não estava
+            ativa
+        
+    
+    """
+    global INSTRUMENTACAO
+    if INSTRUMENTACAO is None:
+        return None
+    report = relatorio_instrumentacao()
+    globals()["escolhe_posicao_auto"] = INSTRUMENTACAO["escolhe_posicao_auto"]
+    globals()["jogo_mnk"] = INSTRUMENTACAO["jogo_mnk"]
+    for name, funcao in INSTRUMENTACAO["originais"].items():
+        globals()[name] = funcao
+    INSTRUMENTACAO = None
+    return report
+
+def relatorio_instrumentacao():
+    """ Obtem o relatório da instrumentação desde que foi ativada
+    
+        Returns:
+            relatorio (dict): Dicionário com as chamadas e o tempo de cada função chamada, ordenadas pelo tempo
+            ("funcoes"), os acertos, falhas e taxa de acertos de cada cache usada ("caches") e os relatórios de cada
+            jogada ("jogadas") e de cada jogo ("jogos"), ou None se a instrumentação não está ativa
+        
+    
+    """
+    if INSTRUMENTACAO is None:
+        return None
+    totals = diferenca_instrumentacao(INSTRUMENTACAO["inicio"], fotografia_instrumentacao())
+    totals["jogadas"] = list(INSTRUMENTACAO["jogadas"])
+    totals["jogos"] = list(INSTRUMENTACAO["jogos"])
+    return totals
+
+# Função auxiliar à função ativa_instrumentacao, obtém a versão de escolhe_posicao_auto que guarda o relatório de
+# cada jogada: o nível, o jogador, a posição, o tempo, os nós explorados e as consultas à tabela de transposição,
+# as chamadas e o tempo de cada função e os acertos de cada cache
+def instrumenta_jogada(funcao):
+    INSTRUMENTACAO["escolhe_posicao_auto"] = funcao
+    
+    @functools.wraps(funcao)
+    def instrumentada(tab, jog, k, lvl, *args, **kwargs):
+        estatisticas = kwargs.get("estatisticas")
+        if estatisticas is None and len(args) < 4:
+            estatisticas = kwargs["estatisticas"] = {}
+        before = fotografia_instrumentacao()
+        start = time.perf_counter()
+        pos = funcao(tab, jog, k, lvl, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+        report = diferenca_instrumentacao(before, fotografia_instrumentacao())
+        estatisticas = estatisticas if estatisticas is not None else args[3]
+        report.update({"nivel": lvl, "jogador": jog, "jogada": pos, "tempo": elapsed,
+                       "nos": estatisticas.get("nos", estatisticas.get("simulacoes")) if estatisticas else None})
+        if estatisticas and "consultas_tabela" in estatisticas:
+            queries = estatisticas["consultas_tabela"]
+            report["tabela"] = {"consultas": queries, "acertos": estatisticas["acertos_tabela"],
+                                "taxa": estatisticas["acertos_tabela"] / queries if queries else None}
+        INSTRUMENTACAO["jogadas"].append(report)
+        return pos
+    return instrumentada
+
+# Função auxiliar à função ativa_instrumentacao, obtém a versão de jogo_mnk que guarda o relatório de cada jogo: o
+# vencedor, o tempo, os relatórios das jogadas do computador, as chamadas e o tempo de cada função e os acertos de
+# cada cache
+def instrumenta_jogo(funcao):
+    INSTRUMENTACAO["jogo_mnk"] = funcao
+    
+    @functools.wraps(funcao)
+    def instrumentada(*args, **kwargs):
+        before = fotografia_instrumentacao()
+        first = len(INSTRUMENTACAO["jogadas"])
+        start = time.perf_counter()
+        winner = funcao(*args, **kwargs)
+        report = diferenca_instrumentacao(before, fotografia_instrumentacao())
+        report.update({"vencedor": winner, "tempo": time.perf_counter() - start,
+                       "jogadas": INSTRUMENTACAO["jogadas"][first:]})
+        INSTRUMENTACAO["jogos"].append(report)
+        return winner
+    return instrumentada
+
+# Registos de jogos: um ficheiro de registos começa por uma assinatura e tem depois os jogos, um a seguir ao outro.
+# Cada registo começa pelo seu tamanho, para que possa ser saltado, seguido do cabeçalho (dimensões, k, níveis dos
+# jogadores 1 e -1, semente, vencedor e número de jogadas), das jogadas (16 bits cada) e, opcionalmente, de uma
+# fotografia do tabuleiro depois de cada jogada, com 2 bits por posição (0 livre, 1 e 2 para os jogadores 1 e -1).
+# Os registos são escritos e lidos um de cada vez, para que ficheiros muito grandes possam ser percorridos sem os
+# carregar para a memória.
+
+ASSINATURA_REGISTOS = b"MNKR\x01"
+CABECALHO_REGISTO = struct.Struct("<IBBBBBQbBH")
+SEM_NIVEL = 255
+COM_FOTOGRAFIAS = 1
+
+def cria_registo(estado, niveis=(None, None), semente=0, fotografias=False):
+    """ Cria o registo de um jogo a partir do seu estado, jogado a partir do tabuleiro vazio e começado pelo jogador 1
+    
+        Args:
+            estado (dict): Estado de jogo
+            niveis (tuple): Níveis dos jogadores 1 e -1, None para um jogador humano
+            semente (int): Semente do jogo
+            fotografias (boolean): True para guardar o tabuleiro depois de cada jogada
+            
+        Returns:
+            registo (dict): Registo com as dimensões ("linhas", "colunas"), "k", "niveis", "semente", "vencedor",
+            as jogadas ("jogadas") e as fotografias ("fotografias", None se não foram pedidas)
+        
+    
+    """
+    tm = estado_tabuleiro_mutavel(estado)
+    registo = {"linhas": tm["linhas"], "colunas": tm["colunas"], "k": estado["k"], "niveis": tuple(niveis),
+               "semente": semente, "vencedor": estado_vencedor(estado), "jogadas": tuple(tm["historico"]),
+               "fotografias": None}
+    if fotografias:
+        registo["fotografias"] = tuple(registo_fotografias(registo))
+    return registo
+
+# Função auxiliar às funções de registos, codifica um tabuleiro dado por uma sequência de valores por posição
+# com 2 bits por posição
+def codifica_fotografia(cells):
+    data = bytearray((len(cells) + 3) // 4)
+    for index, value in enumerate(cells):
+        if value != 0:
+            data[index >> 2] |= (1 if value == 1 else 2) << ((index & 3) * 2)
+    return bytes(data)
+
+# Função auxiliar às funções de registos, obtém o tabuleiro em formato de tuplo guardado numa fotografia
+def descodifica_fotografia(data, lines, columns):
+    values = (0, 1, -1, 0)
+    cells = tuple(values[(data[index >> 2] >> ((index & 3) * 2)) & 3] for index in range(lines * columns))
+    tab = ()
+    for row in range(lines):
+        tab += (cells[row * columns:(row + 1) * columns],)
+    return tab
+
+# Função auxiliar às funções cria_registo e codifica_registo, obtém as fotografias de um registo refazendo as jogadas
+def registo_fotografias(registo):
+    cells = [0] * (registo["linhas"] * registo["colunas"])
+    jog = 1
+    for pos in registo["jogadas"]:
+        cells[pos - 1] = jog
+        jog = -jog
+        yield codifica_fotografia(cells)
+
+def codifica_registo(registo):
+    """ Codifica um registo de jogo no formato binário
+    
+        Args:
+            registo (dict): Registo de jogo (ver cria_registo)
+            
+        Returns:
+            dados (bytes): Registo codificado, começado pelo seu tamanho
+        
+    
+    """
+    lines = registo["linhas"]
+    columns = registo["colunas"]
+    moves = registo["jogadas"]
+    levels = tuple(SEM_NIVEL if lvl is None else NIVEIS.index(lvl) for lvl in registo["niveis"])
+    if not (0 < lines < 256 and 0 < columns < 256 and 0 < registo["k"] < 256 and len(moves) <= lines * columns
+            and all(1 <= pos <= lines * columns for pos in moves) and registo["vencedor"] in (-1, 0, 1)):
+        raise ValueError("codifica_registo: argumentos invalidos")
+    snapshots = registo["fotografias"]
+    if snapshots is not None and len(snapshots) != len(moves):
+        raise ValueError("codifica_registo: argumentos invalidos")
+    body = array.array("H", moves)
+    if sys.byteorder != "little":
+        body.byteswap()
+    data = body.tobytes()
+    if snapshots is not None:
+        data += b"".join(snapshots)
+    header = CABECALHO_REGISTO.pack(CABECALHO_REGISTO.size - 4 + len(data), lines, columns, registo["k"], levels[0],
+                                    levels[1], registo["semente"], registo["vencedor"],
+                                    COM_FOTOGRAFIAS if snapshots is not None else 0, len(moves))
+    return header + data
+
+def descodifica_registo(dados, inicio=0):
+    """ Descodifica um registo de jogo no formato binário
+    
+        Args:
+            dados (bytes): Dados com o registo (bytes, memoryview ou mmap)
+            inicio (int): Índice onde começa o registo
+            
+        Returns:
+            registo (dict): Registo de jogo (ver cria_registo)
+        
+    
+    """
+    size, lines, columns, k, level_x, level_o, seed, winner, flags, count = CABECALHO_REGISTO.unpack_from(dados, inicio)
+    start = inicio + CABECALHO_REGISTO.size
+    moves = array.array("H")
+    moves.frombytes(dados[start:start + 2 * count])
+    if sys.byteorder != "little":
+        moves.byteswap()
+    snapshots = None
+    if flags & COM_FOTOGRAFIAS:
+        step = (lines * columns + 3) // 4
+        start += 2 * count
+        snapshots = tuple(bytes(dados[start + num * step:start + (num + 1) * step]) for num in range(count))
+    levels = tuple(None if level == SEM_NIVEL else NIVEIS[level] for level in (level_x, level_o))
+    return {"linhas": lines, "colunas": columns, "k": k, "niveis": levels, "semente": seed, "vencedor": winner,
+            "jogadas": tuple(moves), "fotografias": snapshots}
+
+def escreve_registos(ficheiro, registos, acrescentar=False):
+    """ Escreve registos de jogos num ficheiro, um de cada vez, à medida que são produzidos
+    
+        Args:
+            ficheiro (string): Caminho do ficheiro
+            registos (iterable): Registos a escrever (ver cria_registo), por exemplo um gerador
+            acrescentar (boolean): True para acrescentar a um ficheiro de registos já existente
+            
+        Returns:
+            total (int): Número de registos escritos
+        
+    
+    """
+    total = 0
+    with open(ficheiro, "ab" if acrescentar else "wb") as file:
+        if file.tell() == 0:
+            file.write(ASSINATURA_REGISTOS)
+        for registo in registos:
+            file.write(codifica_registo(registo))
+            total += 1
+    return total
+
+def le_registos(ficheiro, mapear=False):
+    """ Lê os registos de jogos de um ficheiro, um de cada vez
+    
+        Args:
+            ficheiro (string): Caminho do ficheiro
+            mapear (boolean): True para mapear o ficheiro em memória com mmap em vez de o ler
+            
+        Returns:
+            registos (generator): Gerador dos registos do ficheiro (ver cria_registo)
+        
+    
+    """
+    with open(ficheiro, "rb") as file:
+        if file.read(len(ASSINATURA_REGISTOS)) != ASSINATURA_REGISTOS:
+            raise ValueError("le_registos: argumentos invalidos")
+        if mapear:
+            if os.fstat(file.fileno()).st_size == len(ASSINATURA_REGISTOS):
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                index = len(ASSINATURA_REGISTOS)
+                while index < len(data):
+                    yield descodifica_registo(data, index)
+                    index += 4 + struct.unpack_from("<I", data, index)[0]
+        else:
+            while True:
+                size = file.read(4)
+                if size == b"":
+                    return
+                yield descodifica_registo(size + file.read(struct.unpack("<I", size)[0]))
+
+def registo_tabuleiros(registo):
+    """ Obtem os tabuleiros de um jogo registado, depois de cada jogada
+    
+        Args:
+            registo (dict): Registo de jogo (ver cria_registo)
+            
+        Returns:
+            tabuleiros (generator): Gerador dos tabuleiros em formato de tuplo depois de cada jogada, obtidos das
+            fotografias se existirem ou refazendo as jogadas
+        
+    
+    """
+    lines = registo["linhas"]
+    columns = registo["colunas"]
+    if registo["fotografias"] is not None:
+        for data in registo["fotografias"]:
+            yield cria_tabuleiro_confiavel(descodifica_fotografia(data, lines, columns))
+    else:
+        tab = ()
+        for row in range(lines):
+            tab += ((0,) * columns,)
+        tab = cria_tabuleiro_confiavel(tab)
+        jog = 1
+        for pos in registo["jogadas"]:
+            tab = marca_posicao(tab, pos, jog)
+            jog = -jog
+            yield tab
+
+# Análise de jogos: as jogadas dos registos de jogos são avaliadas com o motor do nível "dificil". Para cada posição
+# antes de uma jogada obtém-se a melhor jogada e o seu valor, e o valor da jogada feita à mesma profundidade; a jogada
+# é um erro se muda o resultado forçado da posição (de vitória para empate ou derrota, ou de empate para derrota) ou,
+# sem resultado forçado, se perde pelo menos o limiar recebido. Os jogos são lidos em lotes e as posições de cada
+# lote são agrupadas pela sua chave canónica, para que as posições repetidas (entre jogos ou por simetria) sejam
+# analisadas uma só vez, num conjunto de processos. A análise de cada jogo é escrita numa linha JSON logo que o seu
+# lote termina, por isso uma análise interrompida pode ser retomada a partir do último jogo escrito. As posições já
+# analisadas ficam guardadas até um número máximo; no fim de cada lote saem as usadas há mais tempo, que voltam a ser
+# analisadas se aparecerem de novo (com a mesma profundidade o resultado é o mesmo, com tempo máximo pode não ser).
+
+ANALISE_LOTE = 64
+ANALISE_MAXIMO = 200000
+
+def analisa_posicao(dados):
+    """ Analisa uma posição com o motor do nível "dificil"
+    
+        Args:
+            dados (tuple): Tuplo com o tabuleiro, k, o jogador a jogar, a profundidade (None para a do nível
+            "dificil"), o tempo máximo em segundos da procura da melhor jogada (None para profundidade fixa), True
+            para procurar a melhor jogada e as jogadas cujo valor é pedido
+            
+        Returns:
+            analise (tuple): Tuplo com a melhor jogada (None se não foi procurada), o seu valor, a profundidade usada
+            e um dicionário com o valor de cada jogada pedida, todos do ponto de vista do jogador a jogar
+        
+    
+    """
+    tab, k, jog, profundidade, tempo, procura, jogadas = dados
+    estado = cria_estado_jogo(cria_tabuleiro_confiavel(tab), k, avaliacao=True)
+    size = len(tab) * len(tab[0])
+    depth = profundidade
+    if depth is None:
+        depth = PROFUNDIDADE_DIFICIL
+        if estado_numero_livres(estado) <= PROCURA_COMPLETA_DIFICIL:
+            depth = estado_numero_livres(estado)
+    tabela = cria_tabela_transposicao()
+    best = None
+    value = None
+    if procura:
+        # Com tempo, como no nível "dificil", a profundidade recebida passa a ser a máxima
+        if tempo is not None:
+            result = procura_iterativa(estado, jog, profundidade, tempo, tabela=tabela)
+            depth = result["profundidade"]
+        else:
+            result = procura_negamax(estado, jog, depth, tabela)
+        best = result["jogada"]
+        value = result["valor"]
+    
+    valores = {}
+    for pos in jogadas:
+        if pos == best:
+            valores[pos] = value
+            continue
+        # O valor de uma jogada é o que a raiz da procura lhe daria: o simétrico do valor do adversário a seguir
+        estado_marca_posicao(estado, pos, jog)
+        if estado_vencedor(estado) != 0:
+            valores[pos] = VITORIA - (size - estado_numero_livres(estado))
+        elif estado_numero_livres(estado) == 0:
+            valores[pos] = 0
+        elif depth == 1:
+            valores[pos] = -avalia_estado(estado, -jog)
+        else:
+            valores[pos] = -procura_negamax(estado, -jog, depth - 1, tabela)["valor"]
+        estado_desfaz_jogada(estado)
+    return best, value, depth, valores
+
+# Função auxiliar à função analisa_registos, obtém o resultado forçado de um valor do motor: 1 vitória, -1 derrota
+# e 0 sem resultado forçado
+def resultado_valor(value, size):
+    if value > VITORIA - size - 1:
+        return 1
+    if value < -(VITORIA - size - 1):
+        return -1
+    return 0
+
+# Função auxiliar à função analisa_registos, percorre as posições de um jogo registado, devolvendo para cada jogada
+# a chave da posição antes da jogada (dimensões, k e chave canónica), o índice da simetria, o jogador, a jogada e
+# o tabuleiro, se pedido
+def posicoes_registo(registo, tabuleiros=False):
+    lines = registo["linhas"]
+    columns = registo["colunas"]
+    tab = ()
+    for row in range(lines):
+        tab += ((0,) * columns,)
+    estado = cria_estado_jogo(cria_tabuleiro_confiavel(tab), registo["k"], fronteira=False)
+    jog = 1
+    for pos in registo["jogadas"]:
+        key, index = estado_chave_canonica(estado, jog)
+        yield (lines, columns, registo["k"], key), index, jog, pos, estado_tabuleiro(estado) if tabuleiros else None
+        estado_marca_posicao(estado, pos, jog)
+        jog = -jog
+
+# Função auxiliar à função analisa_registos, obtém o número de jogos já analisados num ficheiro de análise,
+# cortando uma última linha incompleta deixada por uma análise interrompida
+def retoma_analise(ficheiro):
+    analises = []
+    with open(ficheiro, "r+b") as file:
+        end = 0
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                analises.append(json.loads(line))
+            except ValueError:
+                break
+            end += len(line)
+        file.truncate(end)
+    return analises
+
+# Função auxiliar à função analisa_registos, retira as posições usadas há mais tempo até ficarem no máximo maximo.
+# Só é chamada entre lotes, para que as posições de um lote não saiam antes de serem escritas
+def limita_analise(cache, maximo):
+    while len(cache) > maximo:
+        del cache[next(iter(cache))]
+
+def analisa_registos(entrada, saida, profundidade=None, tempo=None, processos=None, limiar=None, lote=ANALISE_LOTE,
+                     retomar=True, maximo=ANALISE_MAXIMO):
+    """ Analisa os jogos de um ficheiro de registos, escrevendo a análise de cada jogo à medida que termina
+    
+        Args:
+            entrada (string): Caminho do ficheiro de registos (ver le_registos)
+            saida (string): Caminho do ficheiro de análise, com uma linha JSON por jogo com o índice do jogo ("jogo"),
+            o vencedor e a lista das jogadas ("analise"), cada uma com a posição ("jogada"), o jogador, a melhor
+            jogada ("melhor"), o seu valor ("valor"), o valor da jogada feita ("valor_jogada"), a profundidade e
+            se a jogada foi um erro ("erro")
+            profundidade (int): Profundidade da procura, ou None para a do nível "dificil"
+            tempo (float): Tempo máximo em segundos da procura de cada posição (aprofundamento iterativo), ou None
+            processos (int): Número de processos, ou None para usar todos os processadores
+            limiar (int): Perda de valor a partir da qual uma jogada sem resultado forçado é um erro, ou None para
+            10 ** (k - 1), o peso de uma janela com k - 1 peças
+            lote (int): Número de jogos lidos e analisados de cada vez
+            retomar (boolean): True para continuar uma análise já existente em saida, False para a recomeçar
+            maximo (int): Número máximo de posições analisadas guardadas entre lotes, que limita a memória usada
+            
+        Returns:
+            relatorio (dict): Número de jogos analisados ("jogos") e já analisados antes ("retomados"), número de
+            jogadas ("jogadas"), de posições analisadas ("posicoes") e de erros ("erros"), e tempo total
+        
+    
+    """
+    if not ((profundidade is None or (type(profundidade) == int and profundidade > 0))
+            and (processos is None or (type(processos) == int and processos > 0))
+            and type(lote) == int and lote > 0 and type(maximo) == int and maximo > 0):
+        raise ValueError("analisa_registos: argumentos invalidos")
+    if processos is None:
+        processos = os.cpu_count() or 1
+    start = time.perf_counter()
+    report = {"jogos": 0, "retomados": 0, "jogadas": 0, "posicoes": 0, "erros": 0}
+    # Cada posição analisada guarda a melhor jogada e as jogadas feitas na numeração da sua forma canónica, pela ordem
+    # de uso (os dicionários mantêm a ordem de inserção)
+    cache = {}
+    games = le_registos(entrada)
+    
+    if retomar and os.path.exists(saida):
+        for analise in retoma_analise(saida):
+            registo = next(games, None)
+            if registo is None:
+                raise ValueError("analisa_registos: argumentos invalidos")
+            symmetries = obtem_simetrias(registo["linhas"], registo["colunas"])
+            for (key, index, jog, pos, tab), move in zip(posicoes_registo(registo), analise["analise"]):
+                symmetry = symmetries[index]
+                entry = cache.setdefault(key, {"melhor": symmetry[move["melhor"]], "valor": move["valor"],
+                                               "profundidade": move["profundidade"], "jogadas": {}})
+                entry["jogadas"][symmetry[pos]] = move["valor_jogada"]
+            report["retomados"] += 1
+            limita_analise(cache, maximo)
+    else:
+        open(saida, "w").close()
+    
+    executor = concurrent.futures.ProcessPoolExecutor(processos) if processos > 1 else None
+    try:
+        with open(saida, "a") as file:
+            number = report["retomados"]
+            while True:
+                registos = list(itertools.islice(games, lote))
+                if registos == []:
+                    break
+                positions = [list(posicoes_registo(registo, True)) for registo in registos]
+                
+                # Agrupa as posições do lote que faltam analisar, numa das suas formas, com as jogadas pedidas
+                pedidos = {}
+                for game in positions:
+                    for key, index, jog, pos, tab in game:
+                        symmetry = obtem_simetrias(key[0], key[1])[index]
+                        if key in cache and symmetry[pos] in cache[key]["jogadas"]:
+                            continue
+                        if key not in pedidos:
+                            pedidos[key] = [tab, key[2], jog, index, key not in cache, set()]
+                        pedidos[key][5].add(symmetry[pos])
+                
+                dados = []
+                for key, (tab, k, jog, index, procura, canonical) in pedidos.items():
+                    inverse = obtem_simetrias_inversas(key[0], key[1])[index]
+                    depth = cache[key]["profundidade"] if key in cache else profundidade
+                    dados.append((tab, k, jog, depth, tempo, procura, tuple(inverse[move] for move in sorted(canonical))))
+                if executor is None:
+                    resultados = map(analisa_posicao, dados)
+                else:
+                    resultados = executor.map(analisa_posicao, dados, chunksize=max(1, len(dados) // (4 * processos)))
+                for key, (best, value, depth, valores) in zip(pedidos, resultados):
+                    symmetry = obtem_simetrias(key[0], key[1])[pedidos[key][3]]
+                    if key not in cache:
+                        cache[key] = {"melhor": symmetry[best], "valor": value, "profundidade": depth, "jogadas": {}}
+                        report["posicoes"] += 1
+                    for pos in valores:
+                        cache[key]["jogadas"][symmetry[pos]] = valores[pos]
+                
+                for registo, game in zip(registos, positions):
+                    size = registo["linhas"] * registo["colunas"]
+                    threshold = limiar if limiar is not None else 10 ** (registo["k"] - 1)
+                    analise = []
+                    for key, index, jog, pos, tab in game:
+                        symmetry = obtem_simetrias(key[0], key[1])[index]
+                        # A posição passa para o fim da ordem de uso
+                        entry = cache.pop(key)
+                        cache[key] = entry
+                        value = entry["valor"]
+                        played = entry["jogadas"][symmetry[pos]]
+                        outcome = resultado_valor(value, size)
+                        erro = resultado_valor(played, size) < outcome or \
+                            (outcome == 0 and resultado_valor(played, size) == 0 and value - played >= threshold)
+                        report["erros"] += erro
+                        inverse = obtem_simetrias_inversas(key[0], key[1])[index]
+                        analise.append({"jogada": pos, "jogador": jog, "melhor": inverse[entry["melhor"]],
+                                        "valor": value, "valor_jogada": played, "profundidade": entry["profundidade"],
+                                        "erro": erro})
+                    file.write(json.dumps({"jogo": number, "vencedor": registo["vencedor"], "analise": analise}) + "\n")
+                    number += 1
+                    report["jogos"] += 1
+                    report["jogadas"] += len(analise)
+                file.flush()
+                limita_analise(cache, maximo)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    report["tempo"] = time.perf_counter() - start
+    return report
+
+# Tabuleiro esparso: para tabuleiros muito grandes (por exemplo 1000x1000) ou sem limites, as peças são guardadas
+# num dicionário indexado pela coordenada (linha, coluna), por isso a memória é proporcional ao número de peças e não
+# ao tamanho do tabuleiro. Num tabuleiro limitado as coordenadas começam em 1, como as posições; num tabuleiro sem
+# limites (linhas ou colunas None) qualquer par de inteiros é uma coordenada. As linhas, colunas e diagonais são
+# obtidas como segmentos de raio recebido à volta da coordenada, e a verificação das k linhas só olha para as k - 1
+# coordenadas de cada lado. Os níveis do computador jogam sobre um tabuleiro em formato de tuplo recortado à volta
+# das peças, com uma margem de k posições (até JANELA_ESPARSO linhas e colunas, centrado na última jogada quando as
+# peças estão mais espalhadas); as peças fora do recorte são ignoradas e o centro usado para desempatar as jogadas é
+# o do recorte.
+
+JANELA_ESPARSO = 100
+DIRECOES_ESPARSO = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+def esparso_eh_coordenada_valida(te, coord):
+    """ Verifica se uma coordenada pertence a um tabuleiro esparso
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            coord (tuplo): Coordenada (linha, coluna)
+            
+        Returns:
+            Booleano (boolean): True se a coordenada é um par de inteiros dentro dos limites do tabuleiro
+        
+    
+    """
+    if not (type(coord) == tuple and len(coord) == 2 and type(coord[0]) == int and type(coord[1]) == int):
+        return False
+    return (te["linhas"] is None or 1 <= coord[0] <= te["linhas"]) and \
+        (te["colunas"] is None or 1 <= coord[1] <= te["colunas"])
+
+def cria_tabuleiro_esparso(lines=None, columns=None, pecas=()):
+    """ Cria um tabuleiro esparso
+    
+        Args:
+            lines (int): Número de linhas, ou None para um tabuleiro sem limite de linhas
+            columns (int): Número de colunas, ou None para um tabuleiro sem limite de colunas
+            pecas (dict ou iterable): Peças iniciais, um dicionário ou pares (coordenada, jogador)
+            
+        Returns:
+            te (dict): Tabuleiro esparso com as dimensões, as peças ("pecas") e a última jogada ("ultima", None)
+        
+    
+    """
+    if not ((lines is None or (type(lines) == int and lines >= 2))
+            and (columns is None or (type(columns) == int and columns >= 2))):
+        raise ValueError("cria_tabuleiro_esparso: argumentos invalidos")
+    te = {"linhas": lines, "colunas": columns, "pecas": {}, "ultima": None}
+    for coord, jog in (pecas.items() if type(pecas) == dict else pecas):
+        if not esparso_eh_coordenada_valida(te, coord) or jog not in (-1, 1) or coord in te["pecas"]:
+            raise ValueError("cria_tabuleiro_esparso: argumentos invalidos")
+        te["pecas"][coord] = jog
+    return te
+
+def eh_tabuleiro_esparso(arg):
+    """ Verifica se o argumento é um tabuleiro esparso
+    
+        Args:
+            arg (universal): Argumento a verificar
+            
+        Returns:
+            Booleano (boolean): True se o argumento é um tabuleiro esparso, False caso contrário
+        
+    
+    """
+    return type(arg) == dict and set(arg) == {"linhas", "colunas", "pecas", "ultima"} and type(arg["pecas"]) == dict \
+        and (arg["linhas"] is None or (type(arg["linhas"]) == int and arg["linhas"] >= 2)) \
+        and (arg["colunas"] is None or (type(arg["colunas"]) == int and arg["colunas"] >= 2))
+
+def tabuleiro_para_esparso(tab):
+    """ Obtem o tabuleiro esparso correspondente a um tabuleiro em formato de tuplo
+    
+        Args:
+            tab (tuplo): Tabuleiro
+            
+        Returns:
+            te (dict): Tabuleiro esparso com as mesmas dimensões e peças, a posição pos na coordenada
+            ((pos - 1) // colunas + 1, (pos - 1) % colunas + 1)
+        
+    
+    """
+    if eh_tabuleiro(tab):
+        pecas = {}
+        for row in range(len(tab)):
+            for col in range(len(tab[0])):
+                if tab[row][col] != 0:
+                    pecas[(row + 1, col + 1)] = tab[row][col]
+        return cria_tabuleiro_esparso(len(tab), len(tab[0]), pecas)
+    raise ValueError("tabuleiro_para_esparso: argumentos invalidos")
+
+def esparso_para_tabuleiro(te):
+    """ Obtem o tabuleiro em formato de tuplo correspondente a um tabuleiro esparso limitado
+    
+        Args:
+            te (dict): Tabuleiro esparso com linhas e colunas limitadas
+            
+        Returns:
+            tab (tuplo): Tabuleiro em formato de tuplo
+        
+    
+    """
+    if eh_tabuleiro_esparso(te) and te["linhas"] is not None and te["colunas"] is not None:
+        pecas = te["pecas"]
+        return tuple(tuple(pecas.get((row, col), 0) for col in range(1, te["colunas"] + 1))
+                     for row in range(1, te["linhas"] + 1))
+    raise ValueError("esparso_para_tabuleiro: argumentos invalidos")
+
+def esparso_dimensao(te):
+    """ Obtem as dimensões de um tabuleiro esparso
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            
+        Returns:
+            dimensao (tuplo): Número de linhas e de colunas, None nas dimensões sem limite
+        
+    
+    """
+    return te["linhas"], te["colunas"]
+
+def esparso_obtem_valor(te, coord):
+    """ Obtem o valor de uma coordenada de um tabuleiro esparso
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            coord (tuplo): Coordenada (linha, coluna)
+            
+        Returns:
+            value (int): 1 ou -1 se a coordenada tem uma peça desse jogador, 0 se está livre
+        
+    
+    """
+    if eh_tabuleiro_esparso(te) and esparso_eh_coordenada_valida(te, coord):
+        return te["pecas"].get(coord, 0)
+    raise ValueError("esparso_obtem_valor: argumentos invalidos")
+
+def esparso_eh_posicao_livre(te, coord):
+    """ Verifica se uma coordenada de um tabuleiro esparso está livre
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            coord (tuplo): Coordenada (linha, coluna)
+            
+        Returns:
+            Booleano (boolean): True se a coordenada está livre, False se tem uma peça
+        
+    
+    """
+    return esparso_obtem_valor(te, coord) == 0
+
+def esparso_numero_livres(te):
+    """ Obtem o número de coordenadas livres de um tabuleiro esparso
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            
+        Returns:
+            livres (int): Número de coordenadas livres, ou None num tabuleiro sem limites
+        
+    
+    """
+    if te["linhas"] is None or te["colunas"] is None:
+        return None
+    return te["linhas"] * te["colunas"] - len(te["pecas"])
+
+def esparso_posicoes_jogador(te, jog):
+    """ Obtem as coordenadas das peças de um jogador num tabuleiro esparso
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            jog (int): Jogador
+            
+        Returns:
+            coordenadas (tuplo): Coordenadas das peças do jogador, por ordem de linha e coluna
+        
+    
+    """
+    if eh_tabuleiro_esparso(te) and jog in (-1, 1):
+        return tuple(sorted(coord for coord, value in te["pecas"].items() if value == jog))
+    raise ValueError("esparso_posicoes_jogador: argumentos invalidos")
+
+def esparso_marca_posicao(te, coord, jog):
+    """ Obtem o tabuleiro esparso com uma coordenada livre marcada
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            coord (tuplo): Coordenada a marcar
+            jog (int): Jogador a marcar
+            
+        Returns:
+            final_te (dict): Novo tabuleiro esparso com a coordenada marcada, que passa a ser a última jogada
+        
+    
+    """
+    if eh_tabuleiro_esparso(te) and esparso_eh_coordenada_valida(te, coord) and coord not in te["pecas"] \
+            and jog in (-1, 1):
+        pecas = dict(te["pecas"])
+        pecas[coord] = jog
+        return {"linhas": te["linhas"], "colunas": te["colunas"], "pecas": pecas, "ultima": coord}
+    raise ValueError("esparso_marca_posicao: argumentos invalidos")
+
+# Função auxiliar às funções de segmentos do tabuleiro esparso, obtém as coordenadas válidas a distância até raio
+# de coord na direção (drow, dcol), de um extremo ao outro
+def esparso_segmento(te, coord, drow, dcol, raio):
+    if not (eh_tabuleiro_esparso(te) and esparso_eh_coordenada_valida(te, coord) and type(raio) == int and raio >= 0):
+        raise ValueError("esparso_segmento: argumentos invalidos")
+    return tuple((coord[0] + step * drow, coord[1] + step * dcol) for step in range(-raio, raio + 1)
+                 if esparso_eh_coordenada_valida(te, (coord[0] + step * drow, coord[1] + step * dcol)))
+
+def esparso_obtem_linha(te, coord, raio):
+    """ Obtem as coordenadas da linha de uma coordenada, até à distância raio
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            coord (tuplo): Coordenada
+            raio (int): Distância máxima à coordenada
+            
+        Returns:
+            coordenadas (tuplo): Coordenadas válidas da linha, por ordem de coluna
+        
+    
+    """
+    return esparso_segmento(te, coord, 0, 1, raio)
+
+def esparso_obtem_coluna(te, coord, raio):
+    """ Obtem as coordenadas da coluna de uma coordenada, até à distância raio
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            coord (tuplo): Coordenada
+            raio (int): Distância máxima à coordenada
+            
+        Returns:
+            coordenadas (tuplo): Coordenadas válidas da coluna, por ordem de linha
+        
+    
+    """
+    return esparso_segmento(te, coord, 1, 0, raio)
+
+def esparso_obtem_diagonais(te, coord, raio):
+    """ Obtem as coordenadas da diagonal e da antidiagonal de uma coordenada, até à distância raio
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            coord (tuplo): Coordenada
+            raio (int): Distância máxima à coordenada
+            
+        Returns:
+            diagonais (tuplo): Tuplo com as coordenadas válidas da diagonal (de cima à esquerda para baixo à direita)
+            e da antidiagonal (de baixo à esquerda para cima à direita)
+        
+    
+    """
+    return esparso_segmento(te, coord, 1, 1, raio), esparso_segmento(te, coord, -1, 1, raio)
+
+def esparso_obtem_posicoes_adjacentes(te, coord):
+    """ Obtem as coordenadas adjacentes a uma coordenada de um tabuleiro esparso
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            coord (tuplo): Coordenada
+            
+        Returns:
+            adjacentes (tuplo): Coordenadas válidas adjacentes, por ordem de linha e coluna
+        
+    
+    """
+    if eh_tabuleiro_esparso(te) and esparso_eh_coordenada_valida(te, coord):
+        return tuple((coord[0] + drow, coord[1] + dcol) for drow in (-1, 0, 1) for dcol in (-1, 0, 1)
+                     if (drow, dcol) != (0, 0) and esparso_eh_coordenada_valida(te, (coord[0] + drow, coord[1] + dcol)))
+    raise ValueError("esparso_obtem_posicoes_adjacentes: argumentos invalidos")
+
+def esparso_fronteira(te):
+    """ Obtem as coordenadas livres adjacentes a alguma peça de um tabuleiro esparso
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            
+        Returns:
+            fronteira (tuplo): Coordenadas livres adjacentes às peças, por ordem de linha e coluna
+        
+    
+    """
+    if eh_tabuleiro_esparso(te):
+        pecas = te["pecas"]
+        return tuple(sorted({near for coord in pecas for near in esparso_obtem_posicoes_adjacentes(te, coord)
+                             if near not in pecas}))
+    raise ValueError("esparso_fronteira: argumentos invalidos")
+
+# Função auxiliar às funções esparso_verifica_k_linhas e esparso_eh_fim_jogo, conta as peças do jogador seguidas
+# a partir de coord (sem a contar) na direção (drow, dcol), parando ao fim de limit peças
+def esparso_conta_seguidas(pecas, coord, jog, drow, dcol, limit):
+    row, col = coord[0] + drow, coord[1] + dcol
+    count = 0
+    while count < limit and pecas.get((row, col)) == jog:
+        count += 1
+        row += drow
+        col += dcol
+    return count
+
+def esparso_verifica_k_linhas(te, coord, jog, k):
+    """ Verifica se a peça de jog em coord faz parte de uma sequência de k peças seguidas
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            coord (tuplo): Coordenada a verificar
+            jog (int): Jogador a verificar
+            k (int): Número de peças seguidas para ganhar
+            
+        Returns:
+            Booleano (boolean): True se coord tem uma peça de jog numa sequência de pelo menos k peças na linha, na
+            coluna ou numa diagonal, False caso contrário
+        
+    
+    """
+    if eh_tabuleiro_esparso(te) and esparso_eh_coordenada_valida(te, coord) and type(k) == int and k > 0:
+        pecas = te["pecas"]
+        if pecas.get(coord) != jog:
+            return False
+        for drow, dcol in DIRECOES_ESPARSO:
+            if 1 + esparso_conta_seguidas(pecas, coord, jog, drow, dcol, k - 1) \
+                    + esparso_conta_seguidas(pecas, coord, jog, -drow, -dcol, k - 1) >= k:
+                return True
+        return False
+    raise ValueError("esparso_verifica_k_linhas: argumentos invalidos")
+
+def esparso_vencedor(te, k):
+    """ Obtem o vencedor de um tabuleiro esparso
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            k (int): Número de peças seguidas para ganhar
+            
+        Returns:
+            vencedor (int): 1 ou -1 se um dos jogadores tem k peças seguidas, 0 caso contrário
+        
+    
+    """
+    if eh_tabuleiro_esparso(te) and type(k) == int and k > 0:
+        pecas = te["pecas"]
+        # Cada sequência é contada apenas a partir da sua primeira peça em cada direção
+        for coord, jog in pecas.items():
+            for drow, dcol in DIRECOES_ESPARSO:
+                if pecas.get((coord[0] - drow, coord[1] - dcol)) != jog \
+                        and 1 + esparso_conta_seguidas(pecas, coord, jog, drow, dcol, k - 1) >= k:
+                    return jog
+        return 0
+    raise ValueError("esparso_vencedor: argumentos invalidos")
+
+def esparso_eh_fim_jogo(te, k):
+    """ Verifica se o jogo num tabuleiro esparso chegou ao fim
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            k (int): Número de peças seguidas para ganhar
+            
+        Returns:
+            Booleano (boolean): True se um dos jogadores tem k peças seguidas ou se um tabuleiro limitado está cheio
+        
+    
+    """
+    return esparso_vencedor(te, k) != 0 or esparso_numero_livres(te) == 0
+
+# Função auxiliar à função escolhe_posicao_esparso, obtém o primeiro e o último índice de um recorte de uma
+# dimensão com as peças entre low e high, uma margem e no máximo JANELA_ESPARSO índices à volta de centre, dentro
+# dos limites 1 a size (size None sem limites) e com pelo menos 2 índices
+def esparso_recorte(low, high, margin, centre, size):
+    first, last = low - margin, high + margin
+    if last - first + 1 > JANELA_ESPARSO:
+        first = min(max(first, centre - JANELA_ESPARSO // 2), last - JANELA_ESPARSO + 1)
+        last = first + JANELA_ESPARSO - 1
+    if size is not None:
+        first, last = max(first, 1), min(last, size)
+        if last == first:
+            first, last = (first - 1, last) if last == size else (first, last + 1)
+    return first, last
+
+def escolhe_posicao_esparso(te, jog, k, lvl, **opcoes):
+    """ Escolhe a coordenada do computador num tabuleiro esparso
+    
+        Args:
+            te (dict): Tabuleiro esparso
+            jog (int): Jogador do computador
+            k (int): Número de peças seguidas para ganhar
+            lvl (string): Nível do computador
+            opcoes (dict): Argumentos de escolhe_posicao_auto (profundidade, tempo, tabela, cache, ...)
+            
+        Returns:
+            coord (tuplo): Coordenada escolhida, ou None se o jogo já terminou
+        
+    
+    """
+    if not (eh_tabuleiro_esparso(te) and jog in (-1, 1) and type(k) == int and k > 0 and lvl in NIVEIS):
+        raise ValueError("escolhe_posicao_esparso: argumentos invalidos")
+    if esparso_eh_fim_jogo(te, k):
+        return None
+    pecas = te["pecas"]
+    lines, columns = te["linhas"], te["colunas"]
+    # Num tabuleiro vazio o recorte fica à volta do centro, o mesmo de obtem_ordem_centro (a origem se não tem limites)
+    if pecas == {}:
+        rows = [lines // 2 + 1 if lines is not None else 0]
+        cols = [columns // 2 + 1 if columns is not None else 0]
+    else:
+        rows = [coord[0] for coord in pecas]
+        cols = [coord[1] for coord in pecas]
+    centre = te["ultima"] if te["ultima"] is not None else ((min(rows) + max(rows)) // 2, (min(cols) + max(cols)) // 2)
+    top, bottom = esparso_recorte(min(rows), max(rows), k, centre[0], lines)
+    left, right = esparso_recorte(min(cols), max(cols), k, centre[1], columns)
+    tab = tuple(tuple(pecas.get((row, col), 0) for col in range(left, right + 1)) for row in range(top, bottom + 1))
+    pos = escolhe_posicao_auto(cria_tabuleiro_confiavel(tab), jog, k, lvl, **opcoes)
+    if pos is None:
+        # O recorte pode estar cheio (ou já ter uma sequência) sem que o tabuleiro esteja
+        frontier = esparso_fronteira(te)
+        return frontier[0] if frontier else None
+    return top + (pos - 1) // (right - left + 1), left + (pos - 1) % (right - left + 1)
@@ -0,0 +1,231 @@
+# Benchmarks do jogo MNK: mede o tempo das funções públicas de FP2425P1 e dos níveis do computador em tabuleiros de
+# 3x3 a 100x100, gerados a partir de uma semente fixa, para que as medições sejam comparáveis entre versões.
+# Os resultados podem ser guardados num ficheiro de referência; numa execução seguinte cada caso é comparado com a
+# referência e os que ficarem mais lentos do que o limite indicado são assinalados como regressões.
+#
+# Utilização:
+#     python benchmark_mnk.py                     compara com a referência, ou cria-a se ainda não existir
+#     python benchmark_mnk.py --guardar           mede e substitui a referência
+#     python benchmark_mnk.py --tamanhos 3,10 --filtro eh_fim_jogo
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import FP2425P1
+
+TAMANHOS = (3, 10, 30, 60, 100)
+OCUPACOES = (0.1, 0.5, 0.9)
+PECAS_ABERTURA = 12
+LIMITE_REGRESSAO = 0.25
+# Diferenças abaixo deste tempo (em segundos) são ruído de medição e nunca contam como regressão
+TEMPO_MINIMO_REGRESSAO = 1e-4
+REFERENCIA = "benchmark_mnk.json"
+
+def cria_tabuleiro_teste(lines, columns, ocupacao, semente):
+    """ Cria um tabuleiro com uma fração das posições ocupadas, alternadamente pelos jogadores 1 e -1
+    
+        Args:
+            lines (int): Número de linhas
+            columns (int): Número de colunas
+            ocupacao (float): Fração das posições ocupadas
+            semente (string): Semente do gerador aleatório
+            
+        Returns:
+            tab (tuplo): Tabuleiro gerado
+        
+    
+    """
+    generator = random.Random(semente)
+    cells = [0] * (lines * columns)
+    # Há sempre pelo menos uma peça do jogador 1
+    count = max(1, int(ocupacao * lines * columns))
+    for index, cell in enumerate(generator.sample(range(lines * columns), count)):
+        cells[cell] = 1 if index % 2 == 0 else -1
+    return tuple(tuple(cells[row * columns:(row + 1) * columns]) for row in range(lines))
+
+def cria_abertura_teste(lines, columns, pecas, semente):
+    """ Cria um tabuleiro de abertura, com as peças espalhadas perto do centro, como nas primeiras jogadas de um jogo
+    
+        Args:
+            lines (int): Número de linhas
+            columns (int): Número de colunas
+            pecas (int): Número de peças, limitado ao número de posições perto do centro
+            semente (string): Semente do gerador aleatório
+            
+        Returns:
+            tab (tuplo): Tabuleiro gerado
+        
+    
+    """
+    generator = random.Random(semente)
+    near = [row * columns + col for row in range(max(0, lines // 2 - 3), min(lines, lines // 2 + 4))
+            for col in range(max(0, columns // 2 - 3), min(columns, columns // 2 + 4))]
+    cells = [0] * (lines * columns)
+    # Deixa sempre posições livres, para que o computador tenha onde jogar
+    for index, cell in enumerate(generator.sample(near, min(pecas, len(near) // 2))):
+        cells[cell] = 1 if index % 2 == 0 else -1
+    return tuple(tuple(cells[row * columns:(row + 1) * columns]) for row in range(lines))
+
+def mede(funcao, prepara, tempo_maximo):
+    """ Mede o tempo de uma função, repetindo-a enquanto não passar o tempo máximo
+    
+        Args:
+            funcao (function): Função a medir
+            prepara (function): Função sem argumentos que devolve o tuplo de argumentos de cada chamada (não medida)
+            tempo_maximo (float): Tempo máximo em segundos gasto nas repetições (é feita sempre pelo menos uma)
+            
+        Returns:
+            tempo (float): Menor tempo de uma chamada, em segundos
+        
+    
+    """
+    best = None
+    total = 0
+    while best is None or total < tempo_maximo:
+        args = prepara()
+        start = time.perf_counter()
+        funcao(*args)
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+# Função auxiliar à função obtem_casos, obtém uma cópia do tabuleiro que ainda não foi validada
+def copia_tabuleiro(tab):
+    return tuple(tuple(row) for row in tab)
+
+def obtem_casos(tamanhos=TAMANHOS, ocupacoes=OCUPACOES):
+    """ Obtem os casos do benchmark
+    
+        Args:
+            tamanhos (tuplo): Lados dos tabuleiros quadrados a usar
+            ocupacoes (tuplo): Frações de posições ocupadas dos tabuleiros das funções do tabuleiro
+            
+        Returns:
+            casos (list): Lista de tuplos (nome, função, prepara), ver mede
+        
+    
+    """
+    casos = []
+    for size in tamanhos:
+        k = min(5, size)
+        center = size // 2 * size + size // 2 + 1
+        for ocupacao in ocupacoes:
+            tab = FP2425P1.cria_tabuleiro_confiavel(cria_tabuleiro_teste(size, size, ocupacao,
+                                                                         "%dx%d-%s" % (size, size, ocupacao)))
+            free = FP2425P1.obtem_posicoes_livres(tab)
+            stone = FP2425P1.obtem_posicoes_jogador(tab, 1)[0]
+            name = "%dx%d/%s" % (size, size, ocupacao)
+            casos += [
+                ("eh_tabuleiro/" + name, FP2425P1.eh_tabuleiro, lambda tab=tab: (copia_tabuleiro(tab),)),
+                ("obtem_valor/" + name, FP2425P1.obtem_valor, lambda tab=tab, center=center: (tab, center)),
+                ("obtem_linha/" + name, FP2425P1.obtem_linha, lambda tab=tab, center=center: (tab, center)),
+                ("obtem_coluna/" + name, FP2425P1.obtem_coluna, lambda tab=tab, center=center: (tab, center)),
+                ("obtem_diagonais/" + name, FP2425P1.obtem_diagonais, lambda tab=tab, center=center: (tab, center)),
+                ("obtem_posicoes_adjacentes/" + name, FP2425P1.obtem_posicoes_adjacentes,
+                 lambda tab=tab, center=center: (tab, center)),
+                ("obtem_posicoes_livres/" + name, FP2425P1.obtem_posicoes_livres, lambda tab=tab: (tab,)),
+                ("obtem_posicoes_jogador/" + name, FP2425P1.obtem_posicoes_jogador, lambda tab=tab: (tab, 1)),
+                ("ordena_posicoes_tabuleiro/" + name, FP2425P1.ordena_posicoes_tabuleiro,
+                 lambda tab=tab, free=free: (tab, free)),
+                ("marca_posicao/" + name, FP2425P1.marca_posicao, lambda tab=tab, free=free: (tab, free[0], 1)),
+                ("verifica_k_linhas/" + name, FP2425P1.verifica_k_linhas,
+                 lambda tab=tab, stone=stone, k=k: (tab, stone, 1, k)),
+                ("eh_fim_jogo/" + name, FP2425P1.eh_fim_jogo, lambda tab=tab, k=k: (tab, k)),
+                ("tabuleiro_para_str/" + name, FP2425P1.tabuleiro_para_str, lambda tab=tab: (tab,)),
+            ]
+
+        # Os níveis do computador são medidos numa abertura, onde a procura se concentra perto das peças
+        tab = FP2425P1.cria_tabuleiro_confiavel(cria_abertura_teste(size, size, PECAS_ABERTURA,
+                                                                    "%dx%d-abertura" % (size, size)))
+        for lvl in FP2425P1.NIVEIS:
+            casos.append(("escolhe_posicao_auto/%s/%dx%d/abertura" % (lvl, size, size),
+                          lambda tab, lvl, k=k: FP2425P1.escolhe_posicao_auto(tab, 1, k, lvl, profundidade=2,
+                                                                              simulacoes=100, processos=1, semente=0),
+                          lambda tab=tab, lvl=lvl: (tab, lvl)))
+    return casos
+
+def corre_benchmark(casos, tempo_maximo=0.2, filtro=None, saida=sys.stdout):
+    """ Mede todos os casos, escrevendo o tempo de cada um
+    
+        Args:
+            casos (list): Casos a medir (ver obtem_casos)
+            tempo_maximo (float): Tempo máximo das repetições de cada caso
+            filtro (string): Só são medidos os casos cujo nome contém este texto, ou None para todos
+            saida (file): Ficheiro onde são escritos os tempos, ou None
+            
+        Returns:
+            resultados (dict): Dicionário do nome de cada caso para o seu tempo em segundos
+        
+    
+    """
+    resultados = {}
+    for name, funcao, prepara in casos:
+        if filtro is None or filtro in name:
+            resultados[name] = mede(funcao, prepara, tempo_maximo)
+            if saida is not None:
+                print("%-60s %12.6f s" % (name, resultados[name]), file=saida)
+    return resultados
+
+def compara_benchmark(resultados, referencia, limite=LIMITE_REGRESSAO):
+    """ Compara os resultados com a referência
+    
+        Args:
+            resultados (dict): Resultados atuais (ver corre_benchmark)
+            referencia (dict): Resultados de referência
+            limite (float): Aumento relativo do tempo a partir do qual um caso é uma regressão
+            
+        Returns:
+            regressoes (list): Lista de tuplos (nome, tempo de referência, tempo atual) dos casos mais lentos
+        
+    
+    """
+    regressoes = []
+    for name in resultados:
+        if name in referencia:
+            before = referencia[name]
+            after = resultados[name]
+            if after > before * (1 + limite) and after - before > TEMPO_MINIMO_REGRESSAO:
+                regressoes.append((name, before, after))
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do jogo MNK")
+    parser.add_argument("--referencia", default=REFERENCIA, help="ficheiro de referência")
+    parser.add_argument("--guardar", action="store_true", help="guarda os resultados como nova referência")
+    parser.add_argument("--limite", type=float, default=LIMITE_REGRESSAO, help="aumento relativo que é regressão")
+    parser.add_argument("--tamanhos", default=",".join(map(str, TAMANHOS)), help="lados dos tabuleiros")
+    parser.add_argument("--tempo", type=float, default=0.2, help="tempo máximo de repetições por caso")
+    parser.add_argument("--filtro", default=None, help="mede só os casos cujo nome contém este texto")
+    args = parser.parse_args(argv)
+
+    tamanhos = tuple(int(size) for size in args.tamanhos.split(","))
+    resultados = corre_benchmark(obtem_casos(tamanhos), args.tempo, args.filtro)
+
+    if args.guardar or not os.path.exists(args.referencia):
+        referencia = {}
+        if os.path.exists(args.referencia):
+            with open(args.referencia) as file:
+                referencia = json.load(file)["resultados"]
+        # Os casos não medidos nesta execução mantêm o valor anterior
+        referencia.update(resultados)
+        with open(args.referencia, "w") as file:
+            json.dump({"python": sys.version.split()[0], "resultados": referencia}, file, indent=1, sort_keys=True)
+        print("Referência guardada em %s" % args.referencia)
+        return 0
+
+    with open(args.referencia) as file:
+        referencia = json.load(file)["resultados"]
+    regressoes = compara_benchmark(resultados, referencia, args.limite)
+    for name, before, after in regressoes:
+        print("REGRESSAO %-50s %12.6f s -> %12.6f s (%+.0f%%)" % (name, before, after, (after / before - 1) * 100))
+    print("%d casos, %d regressões" % (len(resultados), len(regressoes)))
+    return 1 if regressoes else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,381 @@
+# Servidor do jogo MNK: um servidor TCP local com asyncio em que cada ligação é uma sessão de jogo independente,
+# com as regras e os níveis do computador de FP2425P1. As jogadas do computador são calculadas num conjunto limitado
+# de processos, para que uma jogada demorada de uma sessão não atrase as restantes. O número de sessões e de jogadas
+# do computador pendentes é limitado (as sessões em excesso são recusadas e as jogadas em excesso esperam pela sua
+# vez, deixando entretanto de ler comandos dessa ligação), cada sessão termina se ficar parada demasiado tempo e as
+# jogadas dos níveis "dificil" e "mcts" têm um tempo máximo.
+#
+# Protocolo (uma linha de texto por comando e por resposta):
+#     NOVO m n k jog nivel     começa um jogo em que o cliente é o jogador jog (1 começa) -> OK [JOGADA pos]
+#     JOGA pos                 marca uma posição -> JOGADA pos, seguido de FIM VITORIA|DERROTA|EMPATE no fim do jogo
+#     TABULEIRO                desenho do tabuleiro (tabuleiro_para_str), terminado por uma linha vazia
+#     SAIR                     termina a sessão -> ADEUS
+# Os erros são respondidos com ERRO e uma descrição.
+#
+# Utilização:
+#     python servidor_mnk.py servidor --porta 8765 --processos 4
+#     python servidor_mnk.py carga --porta 8765 --sessoes 200 --concorrencia 50 --nivel normal
+
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import os
+import random
+import sys
+import time
+
+import FP2425P1
+
+ENDERECO = "127.0.0.1"
+PORTA = 8765
+MAX_SESSOES = 256
+MAX_PENDENTES = 64
+TEMPO_ESPERA = 60.0
+# Por omissão as jogadas dos níveis "dificil" e "mcts" têm um tempo máximo, para que um tabuleiro grande não ocupe um
+# processo sem limite
+TEMPO_JOGADA = 10.0
+
+def cria_servidor(processos=None, max_sessoes=MAX_SESSOES, max_pendentes=MAX_PENDENTES, tempo_espera=TEMPO_ESPERA,
+                  tempo_jogada=TEMPO_JOGADA, cache=None, ficheiro_cache=None):
+    """ Cria o estado do servidor
+    
+        Args:
+            processos (int): Número de processos das jogadas do computador, ou None para todos os processadores
+            max_sessoes (int): Número máximo de sessões ao mesmo tempo
+            max_pendentes (int): Número máximo de jogadas do computador a calcular ou à espera de um processo
+            tempo_espera (float): Tempo máximo em segundos à espera de um comando de uma sessão
+            tempo_jogada (float): Tempo máximo em segundos de cada jogada dos níveis "dificil" e "mcts", ou None sem
+            limite
+            cache (int): Número máximo de entradas da cache de jogadas partilhada pelas sessões, ou None sem cache
+            ficheiro_cache (string): Ficheiro de onde a cache é lida e onde é guardada no fim, ou None
+            
+        Returns:
+            servidor (dict): Estado do servidor, com o conjunto de processos, os limites e os contadores de sessões
+        
+    
+    """
+    return {"executor": concurrent.futures.ProcessPoolExecutor(processos or os.cpu_count() or 1),
+            "pendentes": asyncio.Semaphore(max_pendentes), "max_sessoes": max_sessoes, "tempo_espera": tempo_espera,
+            "tempo_jogada": tempo_jogada, "ativas": 0, "atendidas": 0, "recusadas": 0,
+            "cache": None if cache is None else FP2425P1.cria_cache_jogadas(cache, ficheiro=ficheiro_cache)}
+
+# Função auxiliar às funções do servidor, envia uma ou mais linhas, esperando que o cliente as receba se o buffer
+# de escrita estiver cheio
+async def envia(writer, *linhas):
+    writer.write("".join(linha + "\n" for linha in linhas).encode())
+    await writer.drain()
+
+# Função auxiliar à função atende_sessao, obtém o resultado do jogo do ponto de vista do cliente
+def resultado_sessao(sessao):
+    winner = FP2425P1.estado_vencedor(sessao["estado"])
+    if winner == sessao["jog"]:
+        return "FIM VITORIA"
+    elif winner == -sessao["jog"]:
+        return "FIM DERROTA"
+    return "FIM EMPATE"
+
+# Função auxiliar às funções cria_sessao e joga_sessao_carga, verifica as dimensões e k de um jogo antes de criar o
+# tabuleiro, para que um pedido com dimensões enormes não chegue a reservar memória
+def eh_configuracao_valida(lines, columns, k):
+    return 2 <= lines <= 100 and 2 <= columns <= 100 and k > 0
+
+def cria_sessao(palavras):
+    """ Cria uma sessão de jogo a partir dos argumentos do comando NOVO
+    
+        Args:
+            palavras (list): Argumentos m, n, k, jog e nivel, em texto
+            
+        Returns:
+            sessao (dict): Sessão com o estado de jogo, k, o jogador do cliente e o nível do computador
+        
+    
+    """
+    if len(palavras) != 5 or not all(palavra.lstrip("-").isdigit() for palavra in palavras[:4]):
+        raise ValueError("cria_sessao: argumentos invalidos")
+    lines, columns, k, jog = (int(palavra) for palavra in palavras[:4])
+    if not eh_configuracao_valida(lines, columns, k) or jog not in (-1, 1) or palavras[4] not in FP2425P1.NIVEIS:
+        raise ValueError("cria_sessao: argumentos invalidos")
+    # O registo de tabuleiros confiáveis do servidor só precisa dos tabuleiros dos jogos em curso
+    FP2425P1.limpa_tabuleiros_confiaveis()
+    tab = FP2425P1.cria_tabuleiro_confiavel(tuple((0,) * columns for row in range(lines)))
+    return {"estado": FP2425P1.cria_estado_jogo(tab, k), "k": k, "jog": jog, "nivel": palavras[4]}
+
+async def joga_computador(servidor, sessao):
+    """ Calcula e marca a jogada do computador numa sessão, num dos processos do servidor
+    
+        Args:
+            servidor (dict): Estado do servidor
+            sessao (dict): Sessão de jogo
+            
+        Returns:
+            pos (int): Posição jogada pelo computador
+        
+    
+    """
+    estado = sessao["estado"]
+    # O tempo máximo só se aplica aos níveis que o usam, os restantes continuam a poder usar a cache
+    tempo = servidor["tempo_jogada"] if sessao["nivel"] in ("dificil", "mcts") else None
+    # A cache é consultada e atualizada no processo do servidor, as jogadas guardadas nem chegam aos processos
+    cache = servidor["cache"] if tempo is None else None
+    if cache is not None:
+        # As tabelas de simetrias da chave canónica são construídas numa thread na primeira consulta de cada dimensão,
+        # para que um tabuleiro grande não pare as outras sessões; a consulta fica no ciclo de eventos, como as
+        # restantes operações sobre a cache
+        tm = FP2425P1.estado_tabuleiro_mutavel(estado)
+        await asyncio.get_running_loop().run_in_executor(None, FP2425P1.obtem_simetrias_inversas, tm["linhas"],
+                                                         tm["colunas"])
+        pos = FP2425P1.consulta_cache_jogadas(cache, estado, -sessao["jog"], sessao["nivel"])
+        if pos is not None:
+            FP2425P1.estado_marca_posicao(estado, pos, -sessao["jog"])
+            return pos
+    funcao = functools.partial(FP2425P1.escolhe_posicao_auto, FP2425P1.estado_tabuleiro(estado), -sessao["jog"],
+                               sessao["k"], sessao["nivel"], tempo=tempo, processos=1)
+    # Com muitas jogadas pendentes a sessão espera aqui, sem ler mais comandos do cliente
+    async with servidor["pendentes"]:
+        pos = await asyncio.get_running_loop().run_in_executor(servidor["executor"], funcao)
+    if cache is not None:
+        FP2425P1.guarda_cache_jogadas(cache, estado, -sessao["jog"], sessao["nivel"], pos)
+    FP2425P1.estado_marca_posicao(estado, pos, -sessao["jog"])
+    return pos
+
+async def processa_comando(servidor, sessao, palavras):
+    """ Processa um comando de uma sessão
+    
+        Args:
+            servidor (dict): Estado do servidor
+            sessao (dict): Sessão de jogo atual, ou None se ainda não há jogo
+            palavras (list): Comando e argumentos
+            
+        Returns:
+            resposta (tuple): Tuplo com a sessão depois do comando e a lista de linhas da resposta
+        
+    
+    """
+    if palavras == []:
+        return sessao, ["ERRO comando vazio"]
+    command = palavras[0].upper()
+    if command == "NOVO":
+        try:
+            sessao = cria_sessao(palavras[1:])
+        except ValueError:
+            return sessao, ["ERRO argumentos invalidos"]
+        if sessao["jog"] == -1:
+            return sessao, ["OK", "JOGADA %d" % await joga_computador(servidor, sessao)]
+        return sessao, ["OK"]
+    if command == "TABULEIRO" and sessao is not None:
+        return sessao, [FP2425P1.tabuleiro_para_str(FP2425P1.estado_tabuleiro(sessao["estado"])), ""]
+    if command == "JOGA" and sessao is not None:
+        estado = sessao["estado"]
+        if FP2425P1.estado_eh_fim_jogo(estado):
+            return sessao, ["ERRO jogo terminado"]
+        if len(palavras) != 2 or not palavras[1].isdigit() \
+                or not FP2425P1.conjunto_contem(FP2425P1.estado_conjunto(estado, 0), int(palavras[1])):
+            return sessao, ["ERRO posicao invalida"]
+        FP2425P1.estado_marca_posicao(estado, int(palavras[1]), sessao["jog"])
+        if FP2425P1.estado_eh_fim_jogo(estado):
+            return sessao, [resultado_sessao(sessao)]
+        answer = ["JOGADA %d" % await joga_computador(servidor, sessao)]
+        if FP2425P1.estado_eh_fim_jogo(estado):
+            answer.append(resultado_sessao(sessao))
+        return sessao, answer
+    if command in ("TABULEIRO", "JOGA"):
+        return sessao, ["ERRO sem jogo"]
+    return sessao, ["ERRO comando desconhecido"]
+
+async def atende_sessao(servidor, reader, writer):
+    """ Atende uma ligação ao servidor até o cliente sair, a ligação fechar ou o tempo de espera acabar
+    
+        Args:
+            servidor (dict): Estado do servidor
+            reader (asyncio.StreamReader): Leitura da ligação
+            writer (asyncio.StreamWriter): Escrita da ligação
+            
+        Returns:
+            None
+        
+    
+    """
+    if servidor["ativas"] >= servidor["max_sessoes"]:
+        servidor["recusadas"] += 1
+        try:
+            await envia(writer, "OCUPADO")
+        finally:
+            writer.close()
+        return
+    servidor["ativas"] += 1
+    sessao = None
+    try:
+        while True:
+            try:
+                line = await asyncio.wait_for(reader.readline(), servidor["tempo_espera"])
+            except asyncio.TimeoutError:
+                await envia(writer, "ERRO tempo esgotado")
+                break
+            if line == b"":
+                break
+            palavras = line.decode(errors="replace").split()
+            if palavras and palavras[0].upper() == "SAIR":
+                await envia(writer, "ADEUS")
+                break
+            sessao, answer = await processa_comando(servidor, sessao, palavras)
+            await envia(writer, *answer)
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        servidor["ativas"] -= 1
+        servidor["atendidas"] += 1
+        writer.close()
+
+async def corre_servidor(endereco=ENDERECO, porta=PORTA, **limites):
+    """ Corre o servidor até ser interrompido
+    
+        Args:
+            endereco (string): Endereço onde o servidor espera ligações
+            porta (int): Porta do servidor
+            limites (dict): Argumentos de cria_servidor
+            
+        Returns:
+            None
+        
+    
+    """
+    servidor = cria_servidor(**limites)
+    server = await asyncio.start_server(functools.partial(atende_sessao, servidor), endereco, porta)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        servidor["executor"].shutdown(cancel_futures=True)
+        if servidor["cache"] is not None and servidor["cache"]["ficheiro"] is not None:
+            FP2425P1.escreve_cache_jogadas(servidor["cache"])
+
+# Teste de carga: várias sessões jogam ao mesmo tempo contra o servidor, escolhendo jogadas livres ao acaso, e mede-se
+# o tempo entre o envio de cada jogada e a resposta do servidor.
+
+async def joga_sessao_carga(endereco, porta, cfg, nivel, semente, latencias):
+    """ Joga uma sessão completa contra o servidor com jogadas ao acaso
+    
+        Args:
+            endereco (string): Endereço do servidor
+            porta (int): Porta do servidor
+            cfg (tuplo): Número de linhas, de colunas e k
+            nivel (string): Nível do computador
+            semente (string): Semente das jogadas
+            latencias (list): Lista onde é acrescentado o tempo de resposta de cada jogada
+            
+        Returns:
+            terminou (boolean): True se o jogo chegou ao fim
+        
+    
+    """
+    lines, columns, k = cfg
+    if not eh_configuracao_valida(lines, columns, k):
+        raise ValueError("joga_sessao_carga: argumentos invalidos")
+    generator = random.Random(semente)
+    # O cliente acompanha o jogo com as mesmas regras, para saber quando o servidor envia ainda o resultado
+    tab = FP2425P1.cria_tabuleiro_confiavel(tuple((0,) * columns for row in range(lines)))
+    estado = FP2425P1.cria_estado_jogo(tab, k)
+    reader, writer = await asyncio.open_connection(endereco, porta)
+    try:
+        await envia(writer, "NOVO %d %d %d 1 %s" % (lines, columns, k, nivel))
+        if await reader.readline() != b"OK\n":
+            return False
+        while True:
+            pos = generator.choice(FP2425P1.conjunto_posicoes(FP2425P1.estado_conjunto(estado, 0)))
+            FP2425P1.estado_marca_posicao(estado, pos, 1)
+            start = time.perf_counter()
+            await envia(writer, "JOGA %d" % pos)
+            answer = (await reader.readline()).split()
+            latencias.append(time.perf_counter() - start)
+            if answer[:1] == [b"JOGADA"]:
+                FP2425P1.estado_marca_posicao(estado, int(answer[1]), -1)
+                if not FP2425P1.estado_eh_fim_jogo(estado):
+                    continue
+                answer = (await reader.readline()).split()
+            if answer[:1] == [b"FIM"]:
+                await envia(writer, "SAIR")
+                await reader.readline()
+                return True
+            return False
+    except (ConnectionError, ValueError):
+        return False
+    finally:
+        writer.close()
+
+async def corre_carga(endereco=ENDERECO, porta=PORTA, sessoes=100, concorrencia=20, cfg=(3, 3, 3), nivel="normal",
+                      semente=0):
+    """ Corre um teste de carga contra um servidor
+    
+        Args:
+            endereco (string): Endereço do servidor
+            porta (int): Porta do servidor
+            sessoes (int): Número total de sessões
+            concorrencia (int): Número máximo de sessões abertas ao mesmo tempo
+            cfg (tuplo): Número de linhas, de colunas e k de cada jogo
+            nivel (string): Nível do computador
+            semente (int): Semente das jogadas das sessões
+            
+        Returns:
+            relatorio (dict): Dicionário com as sessões terminadas e falhadas, o número de jogadas, os percentis 50,
+            90 e 99 do tempo de resposta das jogadas em segundos, o tempo total e as sessões por segundo
+        
+    
+    """
+    latencias = []
+    limite = asyncio.Semaphore(concorrencia)
+
+    async def sessao(num):
+        async with limite:
+            return await joga_sessao_carga(endereco, porta, cfg, nivel, "%d-%d" % (semente, num), latencias)
+
+    start = time.perf_counter()
+    resultados = await asyncio.gather(*(sessao(num) for num in range(sessoes)))
+    elapsed = time.perf_counter() - start
+    latencias.sort()
+    return {"terminadas": resultados.count(True), "falhadas": resultados.count(False), "jogadas": len(latencias),
+            "latencia": {p: FP2425P1.percentil(latencias, p) for p in (50, 90, 99)}, "tempo": elapsed,
+            "sessoes_por_segundo": sessoes / elapsed if elapsed > 0 else None}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor do jogo MNK e teste de carga")
+    parser.add_argument("modo", choices=("servidor", "carga"), help="corre o servidor ou o teste de carga")
+    parser.add_argument("--endereco", default=ENDERECO, help="endereço do servidor")
+    parser.add_argument("--porta", type=int, default=PORTA, help="porta do servidor")
+    parser.add_argument("--processos", type=int, default=None, help="processos das jogadas do computador")
+    parser.add_argument("--max-sessoes", type=int, default=MAX_SESSOES, help="sessões ao mesmo tempo")
+    parser.add_argument("--max-pendentes", type=int, default=MAX_PENDENTES, help="jogadas do computador pendentes")
+    parser.add_argument("--tempo-espera", type=float, default=TEMPO_ESPERA, help="segundos à espera de um comando")
+    parser.add_argument("--tempo-jogada", type=float, default=TEMPO_JOGADA,
+                        help="segundos de cada jogada dificil ou mcts (0 sem limite)")
+    parser.add_argument("--cache", type=int, default=None, help="entradas da cache de jogadas partilhada")
+    parser.add_argument("--ficheiro-cache", default=None, help="ficheiro onde a cache de jogadas é guardada")
+    parser.add_argument("--sessoes", type=int, default=100, help="sessões do teste de carga")
+    parser.add_argument("--concorrencia", type=int, default=20, help="sessões do teste de carga ao mesmo tempo")
+    parser.add_argument("--jogo", default="3,3,3", help="m,n,k dos jogos do teste de carga")
+    parser.add_argument("--nivel", choices=FP2425P1.NIVEIS, default="normal", help="nível do computador")
+    args = parser.parse_args(argv)
+
+    if args.modo == "servidor":
+        try:
+            asyncio.run(corre_servidor(args.endereco, args.porta, processos=args.processos,
+                                       max_sessoes=args.max_sessoes, max_pendentes=args.max_pendentes,
+                                       tempo_espera=args.tempo_espera,
+                                       tempo_jogada=args.tempo_jogada if args.tempo_jogada > 0 else None,
+                                       cache=args.cache, ficheiro_cache=args.ficheiro_cache))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    cfg = tuple(int(num) for num in args.jogo.split(","))
+    relatorio = asyncio.run(corre_carga(args.endereco, args.porta, args.sessoes, args.concorrencia, cfg, args.nivel))
+    print("%d sessões terminadas, %d falhadas, %d jogadas em %.2f s (%.1f sessões/s)"
+          % (relatorio["terminadas"], relatorio["falhadas"], relatorio["jogadas"], relatorio["tempo"],
+             relatorio["sessoes_por_segundo"]))
+    if relatorio["jogadas"] > 0:
+        print("latência das jogadas: p50 %.4f s, p90 %.4f s, p99 %.4f s"
+              % tuple(relatorio["latencia"][p] for p in (50, 90, 99)))
+    return 0 if relatorio["falhadas"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
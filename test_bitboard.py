@@ -0,0 +1,64 @@
+# Testes do motor bitboard: em tabuleiros aleatórios, gerados a partir de sementes fixas, as funções bitboard têm de
+# dar sempre o mesmo resultado que as funções correspondentes sobre tabuleiros em formato de tuplo.
+#
+# Utilização:
+#     python -m pytest test_bitboard.py
+
+import random
+
+import FP2425P1
+
+TABULEIROS = 300
+
+# Função auxiliar aos testes, gera os tabuleiros aleatórios, com dimensões, k e ocupação variados
+def gera_tabuleiros(semente, quantidade=TABULEIROS):
+    generator = random.Random(semente)
+    for num in range(quantidade):
+        lines, columns = generator.randint(2, 8), generator.randint(2, 8)
+        k = generator.randint(1, 5)
+        ocupacao = generator.random()
+        tab = tuple(tuple(generator.choice((1, -1)) if generator.random() < ocupacao else 0 for column in range(columns))
+                    for row in range(lines))
+        yield tab, k
+
+def test_conversao():
+    for tab, k in gera_tabuleiros("conversao"):
+        bb = FP2425P1.tabuleiro_para_bitboard(tab)
+        assert FP2425P1.bitboard_para_tabuleiro(bb) == tab
+        for pos in range(1, len(tab) * len(tab[0]) + 1):
+            assert FP2425P1.bitboard_obtem_valor(bb, pos) == FP2425P1.obtem_valor(tab, pos)
+
+def test_posicoes():
+    for tab, k in gera_tabuleiros("posicoes"):
+        bb = FP2425P1.tabuleiro_para_bitboard(tab)
+        assert FP2425P1.bitboard_posicoes_livres(bb) == FP2425P1.obtem_posicoes_livres(tab)
+        for jog in (1, -1):
+            assert FP2425P1.bitboard_posicoes_jogador(bb, jog) == FP2425P1.obtem_posicoes_jogador(tab, jog)
+
+def test_marca_posicao():
+    for tab, k in gera_tabuleiros("marca_posicao"):
+        bb = FP2425P1.tabuleiro_para_bitboard(tab)
+        for pos in FP2425P1.obtem_posicoes_livres(tab)[:3]:
+            for jog in (1, -1):
+                assert FP2425P1.bitboard_para_tabuleiro(FP2425P1.bitboard_marca_posicao(bb, pos, jog)) \
+                    == FP2425P1.marca_posicao(tab, pos, jog)
+
+def test_verifica_k_linhas():
+    for tab, k in gera_tabuleiros("verifica_k_linhas"):
+        bb = FP2425P1.tabuleiro_para_bitboard(tab)
+        for pos in range(1, len(tab) * len(tab[0]) + 1):
+            for jog in (1, -1):
+                assert FP2425P1.bitboard_verifica_k_linhas(bb, pos, jog, k) \
+                    == FP2425P1.verifica_k_linhas(tab, pos, jog, k), (tab, pos, jog, k)
+
+def test_eh_fim_jogo():
+    for tab, k in gera_tabuleiros("eh_fim_jogo"):
+        bb = FP2425P1.tabuleiro_para_bitboard(tab)
+        assert FP2425P1.bitboard_eh_fim_jogo(bb, k) == FP2425P1.eh_fim_jogo(tab, k), (tab, k)
+
+def test_vencedor_estado():
+    # Com os dois motores, o estado de jogo tem de encontrar o mesmo vencedor no tabuleiro inicial, mesmo quando os
+    # dois jogadores têm k peças seguidas
+    for tab, k in gera_tabuleiros("vencedor"):
+        assert FP2425P1.cria_estado_jogo(tab, k, "bitboard")["vencedor"] \
+            == FP2425P1.cria_estado_jogo(tab, k, "tuplo")["vencedor"], (tab, k)
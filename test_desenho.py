@@ -0,0 +1,60 @@
+# Testes do desenho do tabuleiro: em tabuleiros aleatórios, gerados a partir de sementes fixas, tabuleiro_para_str tem
+# de dar o mesmo texto que o desenho original, reproduzido aqui símbolo a símbolo, e o desenho atualizado jogada a
+# jogada (cria_desenho, desenho_marca_posicao e desenho_atualiza) tem de ficar sempre igual ao do tabuleiro atual.
+#
+# Utilização:
+#     python -m pytest test_desenho.py
+
+import random
+
+import FP2425P1
+
+TABULEIROS = 300
+
+# Função auxiliar aos testes, obtém o texto do desenho original
+def tabuleiro_para_str_referencia(tab):
+    tab_str = ""
+    for x, row in enumerate(tab):
+        for i, element in enumerate(row):
+            tab_str += "O" if element == -1 else "+" if element == 0 else "X"
+            if i < len(row) - 1:
+                tab_str += "---"
+        if x < len(tab) - 1:
+            tab_str += "\n" + "   ".join("|" * len(row)) + "\n"
+    return tab_str
+
+# Função auxiliar aos testes, gera os tabuleiros aleatórios, com dimensões e ocupação variadas
+def gera_tabuleiros(semente, quantidade=TABULEIROS):
+    generator = random.Random(semente)
+    for num in range(quantidade):
+        lines, columns = generator.randint(2, 12), generator.randint(2, 12)
+        ocupacao = generator.random()
+        tab = tuple(tuple(generator.choice((1, -1)) if generator.random() < ocupacao else 0 for column in range(columns))
+                    for row in range(lines))
+        yield tab, generator
+
+def test_tabuleiro_para_str():
+    for tab, generator in gera_tabuleiros("tabuleiro_para_str"):
+        assert FP2425P1.tabuleiro_para_str(tab) == tabuleiro_para_str_referencia(tab), tab
+        # Linhas em listas não são guardadas, mas são desenhadas da mesma forma
+        rows = [list(row) for row in tab]
+        assert FP2425P1.tabuleiro_para_str(rows) == tabuleiro_para_str_referencia(tab), tab
+
+def test_desenho_jogada_a_jogada():
+    for tab, generator in gera_tabuleiros("desenho"):
+        desenho = FP2425P1.cria_desenho(tab)
+        assert desenho["texto"] == tabuleiro_para_str_referencia(tab), tab
+        free = list(FP2425P1.obtem_posicoes_livres(tab))
+        generator.shuffle(free)
+        for pos in free:
+            jog = generator.choice((1, -1))
+            tab = FP2425P1.marca_posicao(tab, pos, jog)
+            # As jogadas alternam entre marcar a posição no desenho e voltar a desenhar as linhas diferentes
+            if generator.random() < 0.5:
+                texto = FP2425P1.desenho_marca_posicao(desenho, pos, jog)
+            else:
+                texto = FP2425P1.desenho_atualiza(desenho, tab)
+            assert texto == tabuleiro_para_str_referencia(tab), (tab, pos, jog)
+        # Um tabuleiro com várias posições diferentes e um com outro número de linhas também são desenhados
+        other = next(gera_tabuleiros(generator.random(), 1))[0]
+        assert FP2425P1.desenho_atualiza(desenho, other) == tabuleiro_para_str_referencia(other), other
@@ -0,0 +1,63 @@
+# Testes das verificações em lote: em grupos de tabuleiros aleatórios com as mesmas dimensões, gerados a partir de
+# sementes fixas, os resultados em lote têm de ser iguais aos das funções correspondentes aplicadas a cada tabuleiro.
+# Os testes são ignorados quando o numpy não está instalado.
+#
+# Utilização:
+#     python -m pytest test_lote.py
+
+import random
+
+import pytest
+
+import FP2425P1
+
+numpy = pytest.importorskip("numpy")
+
+GRUPOS = 40
+TABULEIROS = 20
+
+# Função auxiliar aos testes, gera os grupos de tabuleiros aleatórios, cada um com as suas dimensões e k
+def gera_grupos(semente, quantidade=GRUPOS):
+    generator = random.Random(semente)
+    for num in range(quantidade):
+        lines, columns = generator.randint(2, 8), generator.randint(2, 8)
+        k = generator.randint(1, 5)
+        tabs = []
+        for board in range(TABULEIROS):
+            ocupacao = generator.random()
+            tabs.append(tuple(tuple(generator.choice((1, -1)) if generator.random() < ocupacao else 0
+                                    for column in range(columns)) for row in range(lines)))
+        yield tabs, k, generator
+
+def test_eh_fim_jogo_lote():
+    for tabs, k, generator in gera_grupos("eh_fim_jogo_lote"):
+        resultado = FP2425P1.eh_fim_jogo_lote(tabs, k)
+        for num, tab in enumerate(tabs):
+            assert bool(resultado["fim"][num]) == FP2425P1.eh_fim_jogo(tab, k), (tab, k)
+            assert int(resultado["vencedor"][num]) == FP2425P1.cria_estado_jogo(tab, k)["vencedor"], (tab, k)
+            assert bool(resultado["cheio"][num]) == (FP2425P1.obtem_posicoes_livres(tab) == ()), (tab, k)
+
+def test_verifica_k_linhas_lote():
+    for tabs, k, generator in gera_grupos("verifica_k_linhas_lote"):
+        size = len(tabs[0]) * len(tabs[0][0])
+        # Uma posição e um jogador por tabuleiro, e a mesma posição e jogador em todos
+        positions = [generator.randint(1, size) for tab in tabs]
+        players = [generator.choice((1, -1)) for tab in tabs]
+        resultado = FP2425P1.verifica_k_linhas_lote(tabs, positions, players, k)
+        for num, tab in enumerate(tabs):
+            assert bool(resultado[num]) == FP2425P1.verifica_k_linhas(tab, positions[num], players[num], k), \
+                (tab, positions[num], players[num], k)
+        resultado = FP2425P1.verifica_k_linhas_lote(tabs, positions[0], players[0], k)
+        for num, tab in enumerate(tabs):
+            assert bool(resultado[num]) == FP2425P1.verifica_k_linhas(tab, positions[0], players[0], k)
+
+def test_lote_grande():
+    # Um array pode ter mais de 100 linhas e colunas, ao contrário dos tabuleiros em formato de tuplo
+    lote = numpy.zeros((2, 150, 120), dtype=numpy.int8)
+    for num in range(5):
+        lote[1, 140 - num, 110 + num] = -1
+    resultado = FP2425P1.eh_fim_jogo_lote(lote, 5)
+    assert resultado["fim"].tolist() == [False, True]
+    assert resultado["vencedor"].tolist() == [0, -1]
+    pos = 140 * 120 + 110 + 1
+    assert FP2425P1.verifica_k_linhas_lote(lote, pos, -1, 5).tolist() == [False, True]
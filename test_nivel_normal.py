@@ -0,0 +1,73 @@
+# Testes do nível "normal": em tabuleiros aleatórios, gerados a partir de sementes fixas, escolhe_posicao_auto tem de
+# escolher a mesma posição que a regra original do nível, reproduzida aqui sobre os tabuleiros em formato de tuplo.
+# A regra original não escolhe nenhuma posição quando só um dos jogadores tem peças ou quando nenhuma posição a
+# satisfaz; nesses casos só se verifica que a posição escolhida está livre.
+#
+# Utilização:
+#     python -m pytest test_nivel_normal.py
+
+import random
+
+import FP2425P1
+
+TABULEIROS = 1500
+
+# Função auxiliar aos testes, obtém a posição da regra original do nível "normal", ou None se a regra não escolhe
+def escolhe_posicao_referencia(tab, jog, k):
+    size = len(tab) * len(tab[0])
+    free = FP2425P1.obtem_posicoes_livres(tab)
+    if FP2425P1.obtem_posicoes_jogador(tab, 1) == () and FP2425P1.obtem_posicoes_jogador(tab, -1) == ():
+        return FP2425P1.ordena_posicoes_tabuleiro(tab, free)[0]
+
+    # Para cada peça, L desce até haver uma sequência de L peças numa das suas linhas, e sobe um para a peça seguinte
+    possible_in_row = {1: [], -1: []}
+    for chosen_jog in (jog, -jog):
+        L = k
+        for pos in range(1, size + 1):
+            if FP2425P1.obtem_valor(tab, pos) == chosen_jog:
+                while L > 0:
+                    if FP2425P1.verifica_k_linhas(tab, pos, chosen_jog, L):
+                        L += 1
+                        possible_in_row[chosen_jog].append(L)
+                        break
+                    L -= 1
+    if possible_in_row[1] == [] or possible_in_row[-1] == []:
+        return None
+
+    best_play = -1 if max(possible_in_row[-1]) >= max(possible_in_row[1]) else jog
+    for pos in range(1, size + 1):
+        if FP2425P1.verifica_k_linhas(tab, pos, best_play, L - 1):
+            for num in FP2425P1.obtem_linha(tab, pos):
+                if num in free:
+                    tentativa = FP2425P1.marca_posicao(tab, num, jog)
+                    if FP2425P1.verifica_k_linhas(tentativa, num, jog, L) \
+                            or FP2425P1.verifica_k_linhas(tentativa, num, jog, k):
+                        return num
+            for line in (FP2425P1.obtem_coluna(tab, pos),) + FP2425P1.obtem_diagonais(tab, pos):
+                for num in line:
+                    if num in free:
+                        tentativa = FP2425P1.marca_posicao(tab, num, best_play)
+                        if FP2425P1.verifica_k_linhas(tentativa, num, best_play, L):
+                            return num
+    return None
+
+def test_escolhe_posicao_normal():
+    generator = random.Random("normal")
+    compared = 0
+    for num in range(TABULEIROS):
+        lines, columns = generator.randint(2, 6), generator.randint(2, 6)
+        k = generator.randint(2, min(5, max(lines, columns)))
+        ocupacao = generator.random() * 0.7
+        tab = tuple(tuple(generator.choice((1, -1)) if generator.random() < ocupacao else 0 for column in range(columns))
+                    for row in range(lines))
+        if FP2425P1.eh_fim_jogo(tab, k):
+            continue
+        jog = generator.choice((1, -1))
+        pos = FP2425P1.escolhe_posicao_auto(tab, jog, k, "normal")
+        assert FP2425P1.eh_posicao_livre(tab, pos), (tab, jog, k, pos)
+        expected = escolhe_posicao_referencia(tab, jog, k)
+        if expected is not None:
+            assert pos == expected, (tab, jog, k, pos, expected)
+            compared += 1
+    # Pelo menos um terço dos tabuleiros tem de ser comparado com a regra original
+    assert compared > TABULEIROS // 3
@@ -0,0 +1,48 @@
+# Testes da procura negamax em paralelo: em tabuleiros aleatórios, gerados a partir de sementes fixas, a procura com
+# as jogadas da raiz distribuídas por processos tem de dar a mesma jogada e o mesmo valor que a procura sequencial.
+#
+# Utilização:
+#     python -m pytest test_procura_paralela.py
+
+import concurrent.futures
+import multiprocessing
+import random
+
+import FP2425P1
+
+TABULEIROS = 30
+PROCESSOS = 2
+
+# Função auxiliar aos testes, gera os estados de jogo aleatórios que ainda não acabaram, com o jogador a jogar
+def gera_estados(semente, quantidade=TABULEIROS):
+    generator = random.Random(semente)
+    while quantidade > 0:
+        lines, columns = generator.randint(3, 5), generator.randint(3, 5)
+        k = generator.randint(3, min(4, max(lines, columns)))
+        ocupacao = generator.random() * 0.5
+        tab = tuple(tuple(generator.choice((1, -1)) if generator.random() < ocupacao else 0 for column in range(columns))
+                    for row in range(lines))
+        estado = FP2425P1.cria_estado_jogo(tab, k, avaliacao=True)
+        if not FP2425P1.estado_eh_fim_jogo(estado):
+            quantidade -= 1
+            yield estado, generator.choice((1, -1)), generator.randint(2, 3)
+
+def test_procura_paralela():
+    # Os processos são criados uma vez, com o evento de cancelamento, e usados em todas as procuras
+    evento = multiprocessing.Event()
+    with concurrent.futures.ProcessPoolExecutor(PROCESSOS, initializer=FP2425P1.inicia_processo_raiz,
+                                                initargs=(evento,)) as executor:
+        for estado, jog, depth in gera_estados("procura_paralela"):
+            tab = FP2425P1.estado_tabuleiro(estado)
+            serial = FP2425P1.procura_negamax(estado, jog, depth)
+            parallel = FP2425P1.procura_negamax_paralela(estado, jog, depth, processos=PROCESSOS, executor=executor,
+                                                         evento=evento)
+            assert (parallel["jogada"], parallel["valor"]) == (serial["jogada"], serial["valor"]), (tab, jog, depth)
+            assert FP2425P1.estado_tabuleiro(estado) == tab
+
+def test_procura_paralela_sem_executor():
+    # Sem executor, a procura cria os seus próprios processos
+    for estado, jog, depth in gera_estados("sem_executor", 3):
+        serial = FP2425P1.procura_negamax(estado, jog, depth)
+        parallel = FP2425P1.procura_negamax_paralela(estado, jog, depth, processos=PROCESSOS)
+        assert (parallel["jogada"], parallel["valor"]) == (serial["jogada"], serial["valor"])
@@ -0,0 +1,47 @@
+# Testes de verifica_k_linhas: em tabuleiros aleatórios, gerados a partir de sementes fixas, a verificação tem de dar
+# sempre o mesmo resultado que a verificação original, reproduzida aqui posição a posição com obtem_valor sobre as
+# linhas, colunas e diagonais obtidas das funções do tabuleiro.
+#
+# Utilização:
+#     python -m pytest test_verifica_k_linhas.py
+
+import random
+
+import pytest
+
+import FP2425P1
+
+TABULEIROS = 300
+
+# Função auxiliar aos testes, obtém o resultado da verificação original
+def verifica_k_linhas_referencia(tab, pos, jog, k):
+    if FP2425P1.obtem_valor(tab, pos) != jog:
+        return False
+    for tup in (FP2425P1.obtem_linha(tab, pos), FP2425P1.obtem_coluna(tab, pos)) + FP2425P1.obtem_diagonais(tab, pos):
+        count = 0
+        for num in tup:
+            count = count + 1 if FP2425P1.obtem_valor(tab, num) == jog else 0
+            if count == k:
+                return True
+    return False
+
+def test_verifica_k_linhas():
+    generator = random.Random("verifica_k_linhas")
+    for num in range(TABULEIROS):
+        lines, columns = generator.randint(2, 8), generator.randint(2, 8)
+        ocupacao = generator.random()
+        tab = tuple(tuple(generator.choice((1, -1)) if generator.random() < ocupacao else 0 for column in range(columns))
+                    for row in range(lines))
+        k = generator.randint(1, 5)
+        for pos in range(1, lines * columns + 1):
+            for jog in (1, -1, 0):
+                assert FP2425P1.verifica_k_linhas(tab, pos, jog, k) == verifica_k_linhas_referencia(tab, pos, jog, k), \
+                    (tab, pos, jog, k)
+
+def test_argumentos():
+    tab = ((1, 1, 0), (0, -1, 0))
+    # Os argumentos inválidos, incluindo uma posição fora do tabuleiro, levantam ValueError
+    assert FP2425P1.verifica_k_linhas(tab, 2, 1, 2) is True
+    for args in ((((1, 2),), 1, 1, 1), (tab, 0, 1, 1), (tab, 7, 1, 1), (tab, 2.0, 1, 1), (tab, 1, 1, 0)):
+        with pytest.raises(ValueError):
+            FP2425P1.verifica_k_linhas(*args)